@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Curve异步数据收集器
+基于aiohttp并发获取多个池子的实时数据，支持按主机限流、单请求超时和整体截止时间
+"""
+
+import asyncio
+import copy
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from circuit_breaker import Deadline, SOURCE_CURVE_API, get_circuit_breaker
+from curve_registry import get_curve_registry
+from http_cache import OfflineCacheMiss, get_http_cache
+from rate_limiter import backoff_delay, get_rate_limiter
+from request_hedging import HEDGE_ENABLED, hedged_call_async
+from single_flight import AsyncSingleFlight
+from real_data_collector import (
+    CurveRealDataCollector, CurvePoolData,
+    DEFAULT_TIMEOUT, DEFAULT_VERIFY_SSL, MAX_RETRIES, RETRY_DELAY
+)
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    print("aiohttp not available. Install with: pip install aiohttp")
+
+# 并发配置
+ASYNC_MAX_PER_HOST = 8          # 每个主机的最大并发请求数
+ASYNC_SWEEP_DEADLINE = 30       # 一次批量收集的整体截止时间 (秒)
+
+
+class AsyncCurveRealDataCollector:
+    """Curve异步数据收集器 - CurveRealDataCollector的asyncio版本"""
+
+    def __init__(self, web3_provider_url: Optional[str] = None,
+                 max_per_host: int = ASYNC_MAX_PER_HOST,
+                 request_timeout: float = DEFAULT_TIMEOUT,
+                 hedged: bool = HEDGE_ENABLED):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp is required for AsyncCurveRealDataCollector")
+
+        self.max_per_host = max_per_host
+        self.request_timeout = request_timeout
+        self.verify_ssl = DEFAULT_VERIFY_SSL
+        self.max_retries = MAX_RETRIES
+
+        # 同步收集器负责链上读取和合成数据兜底
+        self.sync_collector = CurveRealDataCollector(web3_provider_url, hedged=hedged)
+        self.registry = get_curve_registry()
+        self.rate_limiter = get_rate_limiter()
+
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._registry_task: Optional[asyncio.Task] = None
+        self._flight = AsyncSingleFlight()      # 合并同一URL/同一池子的并发请求
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.max_per_host,
+            ssl=None if self.verify_ssl else False
+        )
+        self._session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_semaphores[host]
+
+    async def _fetch_json(self, url: str, params: Optional[Dict] = None,
+                          parse: Optional[Callable[[bytes], Any]] = json.loads) -> Optional[Any]:
+        """
+        带主机并发限制、令牌桶限流、单请求超时和重试的GET请求，parse=None 时返回原始响应体
+        同一URL的并发请求只发送一次，调用方共享解析结果 (只读)
+        """
+
+        key = ('http', url, tuple(sorted(params.items())) if params else (), parse)
+        result, _ = await self._flight.do(key, lambda: self._fetch(url, params, parse))
+        return result
+
+    async def _fetch(self, url: str, params: Optional[Dict],
+                     parse: Optional[Callable[[bytes], Any]]) -> Optional[Any]:
+        parse = parse or (lambda content: content)
+
+        if self._session is None:
+            raise RuntimeError("AsyncCurveRealDataCollector must be used as an async context manager")
+
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+
+        # 与同步请求共享磁盘缓存: 未过期直接使用，过期时带验证器请求
+        cache = get_http_cache()
+        entry, headers = None, {}
+        if cache is not None:
+            cache_url = requests.Request('GET', url, params=params).prepare().url
+            try:
+                entry, usable = cache.lookup(cache_url)
+            except OfflineCacheMiss as e:
+                print(f"📴 {e}")
+                return None
+            if usable:
+                return parse(entry.body())
+            if entry is not None:
+                headers = entry.validators()
+
+        for attempt in range(self.max_retries):
+            try:
+                async with self._semaphore(url):
+                    await self.rate_limiter.acquire_async(url)
+                    async with self._session.get(url, params=params, headers=headers, timeout=timeout) as response:
+                        if response.status == 304 and entry is not None:
+                            cache.touch(entry, response.headers)
+                            cache.revalidated += 1
+                            return parse(entry.body())
+                        if response.status == 200:
+                            content = await response.read()
+                            if cache is not None:
+                                cache.misses += 1
+                                cache.store(cache_url, response.status, response.headers, content)
+                            return parse(content)
+                        if self.rate_limiter.observe(url, response.status, response.headers.get('Retry-After')):
+                            # 限流: 下一次acquire会等待到Retry-After之后，不再额外退避
+                            continue
+                        print(f"⚠️  HTTP {response.status} from {url}")
+
+            except asyncio.TimeoutError:
+                print(f"⏰ 超时错误 (尝试 {attempt + 1}/{self.max_retries}): {self.request_timeout}s")
+            except aiohttp.ClientError as e:
+                print(f"🔌 连接错误 (尝试 {attempt + 1}/{self.max_retries}): {str(e)[:100]}...")
+
+            if attempt < self.max_retries - 1:
+                await asyncio.sleep(backoff_delay(attempt, base=RETRY_DELAY))
+
+        return None
+
+    async def _fetch_registry(self, breaker) -> bool:
+        """
+        下载并载入注册表快照，结果记录到Curve API熔断器 (每次下载只记录一次)
+        响应体无法解析 (格式错误、HTML错误页等) 同样记为失败
+        """
+
+        payload = await self._fetch_json(self.registry.url, parse=None)
+        if not payload:
+            breaker.record_failure()
+            return False
+
+        try:
+            self.registry.load_bytes(payload)
+        except (KeyError, ValueError) as e:
+            print(f"❌ Curve API数据格式错误: {str(e)[:100]}")
+            breaker.record_failure()
+            return False
+
+        breaker.record_success()
+        return True
+
+    async def refresh_registry(self) -> bool:
+        """刷新共享注册表快照，并发调用只会触发一次下载"""
+
+        if self.registry.is_fresh():
+            return True
+
+        if self._registry_task is None or self._registry_task.done():
+            breaker = get_circuit_breaker(SOURCE_CURVE_API)
+            if not breaker.allow():
+                # 熔断期间不下载，继续使用旧快照 (如果有)
+                return bool(self.registry.pools())
+            self._registry_task = asyncio.ensure_future(self._fetch_registry(breaker))
+
+        # shield: 单个调用方被取消不影响其他等待同一下载的调用方
+        if await asyncio.shield(self._registry_task):
+            return True
+        # 下载或解析失败时继续使用旧快照 (如果有)
+        return bool(self.registry.pools())
+
+    async def get_curve_api_data(self, pool_name: str = '3pool') -> Optional[CurvePoolData]:
+        """从Curve官方API获取数据 (异步)"""
+
+        if not await self.refresh_registry():
+            print(f"❌ 无法连接到Curve API")
+            return None
+
+        target_pool = self.registry.find(pool_name, self.sync_collector.pool_addresses.get(pool_name))
+        if not target_pool:
+            print(f"❌ 池子 {pool_name} 未在Curve API中找到")
+            return None
+
+        try:
+            return CurveRealDataCollector._parse_registry_pool(target_pool)
+        except (KeyError, ValueError) as e:
+            print(f"❌ Curve API数据格式错误: {e}")
+            return None
+
+    async def _timed_curve_api_data(self, pool_name: str) -> Optional[CurvePoolData]:
+        """获取Curve API数据，并记录需要下载注册表时的延迟"""
+
+        refreshing = not self.registry.is_fresh()
+        start_time = time.perf_counter()
+        data = await self.get_curve_api_data(pool_name)
+        if data and refreshing:
+            self.sync_collector.latency.record(SOURCE_CURVE_API, time.perf_counter() - start_time)
+        return data
+
+    def _onchain_future(self, pool_address: str) -> asyncio.Future:
+        """链上直读 (同步JSON-RPC调用，放到线程池执行)"""
+
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(None, self.sync_collector._timed_onchain_data, pool_address, Deadline(None))
+
+    async def get_real_time_data(self, pool_name: str = '3pool') -> Optional[CurvePoolData]:
+        """获取实时数据 (异步)，数据源顺序与同步版本一致；同一池子的并发调用合并为一次获取"""
+
+        data, shared = await self._flight.do(('real_time_data', pool_name),
+                                             lambda: self._get_real_time_data(pool_name))
+        return copy.deepcopy(data) if shared else data
+
+    async def _get_real_time_data(self, pool_name: str) -> Optional[CurvePoolData]:
+
+        pool_address = self.sync_collector.pool_addresses.get(pool_name)
+        can_read_onchain = bool(self.sync_collector.onchain_reader and pool_address)
+
+        # 对冲模式: 注册表需要下载且Curve API超过其分位延迟仍未返回时，并发直读链上并取消落后的任务
+        if self.sync_collector.hedged and can_read_onchain and not self.registry.is_fresh():
+            delay = self.sync_collector.latency.hedge_delay(SOURCE_CURVE_API)
+            data, _ = await hedged_call_async(
+                lambda: self._timed_curve_api_data(pool_name),
+                lambda: self._onchain_future(pool_address),
+                delay
+            )
+            if data:
+                return data
+
+        else:
+            # 方法1: Curve官方API
+            data = await self._timed_curve_api_data(pool_name)
+            if data:
+                return data
+
+            # 方法2: 区块链直读
+            if can_read_onchain:
+                try:
+                    data = await self._onchain_future(pool_address)
+                    if data:
+                        return data
+                except Exception as e:
+                    print(f"❌ On-chain data failed: {str(e)[:50]}...")
+
+        # 方法3: 合成数据
+        print(f"⚠️  {pool_name} 所有真实数据源失败，生成合成数据...")
+        return self.sync_collector._generate_synthetic_pool_data(pool_name)
+
+    async def get_real_time_data_many(self, pool_names: List[str],
+                                      deadline: float = ASYNC_SWEEP_DEADLINE) -> Dict[str, Optional[CurvePoolData]]:
+        """并发获取多个池子的实时数据，超过截止时间的请求会被取消"""
+
+        tasks = {name: asyncio.ensure_future(self.get_real_time_data(name)) for name in pool_names}
+
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = {}
+        for name, task in tasks.items():
+            if task in done and task.exception() is None:
+                results[name] = task.result()
+            else:
+                if task in pending:
+                    print(f"⏰ {name} 超过截止时间 {deadline}s，已取消")
+                else:
+                    print(f"❌ {name} 获取失败: {str(task.exception())[:100]}...")
+                results[name] = None
+
+        return results
+
+
+def collect_real_time_data(pool_names: List[str], web3_provider_url: Optional[str] = None,
+                           deadline: float = ASYNC_SWEEP_DEADLINE) -> Dict[str, Optional[CurvePoolData]]:
+    """同步包装: 并发获取多个池子的实时数据，返回 {pool_name: CurvePoolData}"""
+
+    if not AIOHTTP_AVAILABLE:
+        # 没有aiohttp时退回顺序获取
+        collector = CurveRealDataCollector(web3_provider_url)
+        # 所有池子代币的并集先发一次批量价格请求，逐池查询命中缓存
+        collector.prefetch_prices(pool_names)
+        return {name: collector.get_real_time_data(name) for name in pool_names}
+
+    async def _run():
+        async with AsyncCurveRealDataCollector(web3_provider_url) as collector:
+            return await collector.get_real_time_data_many(pool_names, deadline)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_run())
+
+    # 已在事件循环中 (如Jupyter)，在独立线程中运行
+    result = {}
+
+    def _runner():
+        result.update(asyncio.run(_run()))
+
+    thread = threading.Thread(target=_runner)
+    thread.start()
+    thread.join()
+    return result
+
+
+async def _demo():
+    async with AsyncCurveRealDataCollector() as collector:
+        results = await collector.get_real_time_data_many(['3pool', 'frax', 'lusd', 'mim'])
+
+    for name, data in results.items():
+        if data:
+            print(f"{name:8}: {data.pool_name} | VP {data.virtual_price:.6f} | APY {data.apy:.2%}")
+        else:
+            print(f"{name:8}: ❌ 无数据")
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+历史数据缓存存储
+列式存储 (Parquet) + 固定schema，旧CSV缓存在首次读取时透明迁移
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    print("pyarrow not available, historical cache falls back to CSV. Install with: pip install pyarrow")
+
+# 跨进程文件锁 (POSIX: fcntl, Windows: msvcrt)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# 缓存schema
+TIMESTAMP_COLUMN = 'timestamp'     # 存储为int64纳秒时间戳 (epoch)
+CATEGORICAL_COLUMNS = ('pool_address', 'pool_name', 'source', 'pool_type')
+INTEGER_COLUMNS = ('priority', 'block_number', 'last_block', 'trades', 'liquidity_events')
+
+# 缓存清单文件
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_VERSION = 1
+MANIFEST_LOCK_SUFFIX = '.lock'
+COVERAGE_MAX_GAP_HOURS = 48        # 相邻数据点间隔超过此值视为覆盖范围中断
+
+# pandas>=2.0 需要显式声明混合格式
+_MIXED_FORMAT = 'mixed' if int(pd.__version__.split('.')[0]) >= 2 else None
+
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    """将任意格式的时间戳列统一为无时区datetime64[ns]"""
+
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_datetime(series, unit='ns')
+
+    try:
+        ts = pd.to_datetime(series)
+    except (TypeError, ValueError):
+        # 混合时区或混合格式 (如DefiLlama的UTC时间与本地时间拼接)
+        ts = pd.to_datetime(series, utc=True, format=_MIXED_FORMAT)
+
+    if getattr(ts.dt, 'tz', None) is not None:
+        ts = ts.dt.tz_convert(None)
+
+    return ts.astype('datetime64[ns]')
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """按缓存schema规范化列类型: 时间戳/分类列/float64数值列"""
+
+    df = df.copy()
+
+    for column in df.columns:
+        series = df[column]
+
+        if column == TIMESTAMP_COLUMN:
+            df[column] = _to_datetime(series)
+        elif column in CATEGORICAL_COLUMNS:
+            df[column] = series.astype('category')
+        elif column in INTEGER_COLUMNS and pd.api.types.is_numeric_dtype(series) and not series.isna().any():
+            df[column] = series.astype('int64')
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_numeric_dtype(series):
+            df[column] = series.astype('float64')
+
+    return df
+
+
+def _to_storage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """写入前将时间戳转换为int64 epoch"""
+
+    df = normalize_frame(df)
+    if TIMESTAMP_COLUMN in df.columns:
+        df[TIMESTAMP_COLUMN] = df[TIMESTAMP_COLUMN].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    return df
+
+
+def _from_storage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    if TIMESTAMP_COLUMN in df.columns:
+        df[TIMESTAMP_COLUMN] = _to_datetime(df[TIMESTAMP_COLUMN])
+    return df
+
+
+def read_historical_file(path: Union[str, Path], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """读取单个历史数据文件 (Parquet或CSV)，返回规范化后的DataFrame"""
+
+    path = Path(path)
+
+    if path.suffix == '.parquet':
+        return _from_storage_frame(pd.read_parquet(path, columns=columns))
+
+    df = pd.read_csv(path, usecols=columns)
+    return normalize_frame(df)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _split_key(key: str):
+    """数据集key拆分为 (池子, 数据集)，如 '3pool_batch_historical_365d' -> ('3pool', 'batch_historical_365d')"""
+
+    name = key.replace('\\', '/').rsplit('/', 1)[-1]
+    pool, _, dataset = name.partition('_')
+    return pool, dataset or name
+
+
+def _coverage_ranges(timestamps: pd.Series) -> List[List[str]]:
+    """将时间戳序列拆分为连续覆盖区间 [[start, end], ...]"""
+
+    values = np.sort(timestamps.dropna().to_numpy(dtype='datetime64[ns]'))
+    if len(values) == 0:
+        return []
+
+    breaks = np.flatnonzero(np.diff(values) > np.timedelta64(COVERAGE_MAX_GAP_HOURS, 'h'))
+    starts = np.concatenate([[0], breaks + 1])
+    ends = np.concatenate([breaks, [len(values) - 1]])
+
+    return [[pd.Timestamp(values[i]).isoformat(), pd.Timestamp(values[j]).isoformat()]
+            for i, j in zip(starts, ends)]
+
+
+@contextmanager
+def _interprocess_lock(path: Path):
+    """独占的跨进程文件锁 (阻塞直到获得)，平台不支持时只依赖进程内锁"""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK 重试约10秒后放弃，继续等待
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            yield
+
+
+class CacheManifest:
+    """
+    缓存清单 - 记录每个数据集的时间范围、行数、schema、数据来源、内容哈希和写入时间
+    每次写入都以临时文件+替换的方式原子更新，查询时无需打开数据文件
+    多个进程 (调度器、回填/事件采集CLI) 可以同时写入: 重新载入→修改→替换 在跨进程文件锁内完成
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / MANIFEST_FILENAME
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._loaded_mtime: Optional[float] = None
+
+    def _reload_if_changed(self, force: bool = False):
+        """清单文件被其他进程更新时重新载入 (force: 不比较修改时间，持有文件锁时使用)"""
+
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return
+
+        if mtime == self._loaded_mtime and not force:
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            self._entries = payload.get('datasets', {})
+            self._loaded_mtime = mtime
+        except (OSError, ValueError) as e:
+            print(f"⚠️  缓存清单读取失败: {str(e)[:100]}...")
+
+    def _save(self):
+        payload = {
+            'version': MANIFEST_VERSION,
+            'updated_at': datetime.now().isoformat(),
+            'datasets': self._entries
+        }
+
+        tmp_path = self.path.with_name(self.path.name + f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+        self._loaded_mtime = self.path.stat().st_mtime
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            self._reload_if_changed()
+            return self._entries.get(key)
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._lock:
+            self._reload_if_changed()
+            return dict(self._entries)
+
+    def record(self, key: str, df: pd.DataFrame, path: Union[str, Path]) -> Dict:
+        """记录一次数据集写入"""
+
+        path = Path(path)
+        pool, dataset = _split_key(key)
+        df = normalize_frame(df)
+
+        entry = {
+            'pool': pool,
+            'dataset': dataset,
+            'file': path.name,
+            'format': path.suffix.lstrip('.'),
+            'rows': int(len(df)),
+            'start': None,
+            'end': None,
+            'ranges': [],
+            'schema': {column: str(dtype) for column, dtype in df.dtypes.items()},
+            'sources': {},
+            'content_hash': _file_sha256(path),
+            'written_at': datetime.now().isoformat()
+        }
+
+        if TIMESTAMP_COLUMN in df.columns and len(df) > 0:
+            entry['start'] = df[TIMESTAMP_COLUMN].min().isoformat()
+            entry['end'] = df[TIMESTAMP_COLUMN].max().isoformat()
+            entry['ranges'] = _coverage_ranges(df[TIMESTAMP_COLUMN])
+
+        if 'source' in df.columns:
+            counts = df['source'].astype(str).value_counts()
+            entry['sources'] = {source: int(count) for source, count in counts.items()}
+
+        with self._locked():
+            self._entries[key] = entry
+            self._save()
+
+        return entry
+
+    def remove(self, key: str):
+        with self._locked():
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    @contextmanager
+    def _locked(self):
+        """进程内锁 + 跨进程文件锁，进入时重新载入最新的清单"""
+
+        with self._lock, _interprocess_lock(self.path.with_name(self.path.name + MANIFEST_LOCK_SUFFIX)):
+            self._reload_if_changed(force=True)
+            yield
+
+
+class HistoricalCacheStore:
+    """历史数据缓存存储 - 按数据集key读写，优先使用Parquet"""
+
+    def __init__(self, cache_dir: Union[str, Path] = "free_historical_cache", use_parquet: bool = PARQUET_AVAILABLE):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.use_parquet = use_parquet and PARQUET_AVAILABLE
+        self.manifest = CacheManifest(self.cache_dir)
+
+    def parquet_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def csv_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.csv"
+
+    def path_for(self, key: str) -> Path:
+        """数据集当前使用的存储文件"""
+        return self.parquet_path(key) if self.use_parquet else self.csv_path(key)
+
+    def exists(self, key: str) -> bool:
+        """数据集是否存在 (优先查询清单，未登记的旧文件再检查磁盘)"""
+
+        if self.manifest.get(key) is not None:
+            return True
+        return (self.use_parquet and self.parquet_path(key).exists()) or self.csv_path(key).exists()
+
+    def describe(self, key: str) -> Optional[Dict]:
+        """数据集的清单条目 (时间范围/行数/schema/来源等)"""
+        return self.manifest.get(key)
+
+    def _needs_migration(self, key: str) -> bool:
+        """存在比Parquet更新的CSV时需要 (重新) 迁移"""
+
+        if not self.use_parquet:
+            return False
+
+        csv_path = self.csv_path(key)
+        parquet_path = self.parquet_path(key)
+
+        if not csv_path.exists():
+            return False
+        if not parquet_path.exists():
+            return True
+        return csv_path.stat().st_mtime > parquet_path.stat().st_mtime
+
+    def migrate(self, key: str) -> bool:
+        """将旧CSV缓存迁移为Parquet"""
+
+        if not self._needs_migration(key):
+            return False
+
+        df = read_historical_file(self.csv_path(key))
+        path = self._write_parquet(key, df)
+        self.manifest.record(key, df, path)
+        print(f"🗜️  缓存已迁移为Parquet: {self.parquet_path(key).name}")
+        return True
+
+    def migrate_all(self) -> int:
+        """迁移缓存目录下所有CSV，返回迁移数量"""
+
+        migrated = 0
+        for csv_file in sorted(self.cache_dir.glob("*.csv")):
+            try:
+                if self.migrate(csv_file.stem):
+                    migrated += 1
+            except Exception as e:
+                print(f"⚠️  迁移失败 {csv_file.name}: {str(e)[:100]}...")
+        return migrated
+
+    def read(self, key: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取数据集，columns为列投影 (只读取需要的列)；不存在时返回空DataFrame"""
+
+        if self._needs_migration(key):
+            try:
+                self.migrate(key)
+            except Exception as e:
+                print(f"⚠️  缓存迁移失败，直接读取CSV: {str(e)[:100]}...")
+                return read_historical_file(self.csv_path(key), columns)
+
+        if self.use_parquet and self.parquet_path(key).exists():
+            return read_historical_file(self.parquet_path(key), columns)
+
+        if self.csv_path(key).exists():
+            return read_historical_file(self.csv_path(key), columns)
+
+        # 数据文件已被删除，清理过期的清单条目
+        self.manifest.remove(key)
+        return pd.DataFrame(columns=columns or [])
+
+    def row_count(self, key: str) -> int:
+        """数据集行数 (优先查询清单，其次Parquet元数据)"""
+
+        entry = self.manifest.get(key)
+        if entry is not None:
+            return entry['rows']
+
+        if self.use_parquet and not self._needs_migration(key) and self.parquet_path(key).exists():
+            return pq.ParquetFile(self.parquet_path(key)).metadata.num_rows
+
+        if self.exists(key):
+            return len(self.read(key, columns=[TIMESTAMP_COLUMN]))
+
+        return 0
+
+    def coverage(self, key: str) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """数据集的连续覆盖区间 (来自清单)，未登记或无时间戳时返回空列表"""
+
+        entry = self.manifest.get(key)
+        if entry is None:
+            return []
+        return [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in entry.get('ranges', [])]
+
+    def read_range(self, key: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取 [start, end] 时间范围内的数据 (Parquet按行组过滤，不载入范围外数据)"""
+
+        bounds = [(op, pd.Timestamp(value)) for op, value in (('>=', start), ('<=', end)) if value is not None]
+
+        if self.use_parquet and not self._needs_migration(key) and self.parquet_path(key).exists():
+            filters = [(TIMESTAMP_COLUMN, op, value.value) for op, value in bounds]
+            df = pd.read_parquet(self.parquet_path(key), columns=columns, filters=filters or None)
+            return _from_storage_frame(df).reset_index(drop=True)
+
+        df = self.read(key, columns)
+        if TIMESTAMP_COLUMN not in df.columns:
+            return df
+
+        mask = pd.Series(True, index=df.index)
+        for op, value in bounds:
+            mask &= (df[TIMESTAMP_COLUMN] >= value) if op == '>=' else (df[TIMESTAMP_COLUMN] <= value)
+        return df[mask].reset_index(drop=True)
+
+    def upsert(self, key: str, df: pd.DataFrame) -> pd.DataFrame:
+        """将新数据合并进数据集 (按时间戳去重，新数据优先)，返回合并后的完整数据"""
+
+        frames = [normalize_frame(df)]
+        if self.exists(key):
+            frames.insert(0, self.read(key))
+
+        combined = pd.concat(frames, ignore_index=True)
+        if TIMESTAMP_COLUMN in combined.columns:
+            combined = (combined.drop_duplicates(subset=[TIMESTAMP_COLUMN], keep='last')
+                                .sort_values(TIMESTAMP_COLUMN)
+                                .reset_index(drop=True))
+
+        self.write(key, combined)
+        return combined
+
+    def consolidate(self, key: str) -> int:
+        """
+        将旧的按天数分文件缓存 ({key}_7d, {key}_365d ...) 合并为按时间范围的单一数据集
+        返回合并的旧数据集数量，合并成功后删除旧文件
+        """
+
+        pattern = re.compile(rf"{re.escape(key)}_\d+d")
+        legacy_keys = sorted({path.stem for path in self.cache_dir.glob(f"{key}_*d.*")
+                              if pattern.fullmatch(path.stem)})
+        if not legacy_keys:
+            return 0
+
+        for legacy_key in legacy_keys:
+            self.upsert(key, self.read(legacy_key))
+
+        for legacy_key in legacy_keys:
+            for path in (self.parquet_path(legacy_key), self.csv_path(legacy_key)):
+                if path.exists():
+                    path.unlink()
+            self.manifest.remove(legacy_key)
+
+        print(f"🗂️  已合并 {len(legacy_keys)} 个旧缓存为 {key}")
+        return len(legacy_keys)
+
+    def write(self, key: str, df: pd.DataFrame) -> Path:
+        """写入数据集 (原子替换)，返回文件路径"""
+
+        if self.use_parquet:
+            path = self._write_parquet(key, df)
+        else:
+            path = self.csv_path(key)
+            tmp_path = path.with_name(path.name + '.tmp')
+            normalize_frame(df).to_csv(tmp_path, index=False, encoding='utf-8')
+            os.replace(tmp_path, path)
+
+        self.manifest.record(key, df, path)
+        return path
+
+    def _write_parquet(self, key: str, df: pd.DataFrame) -> Path:
+        path = self.parquet_path(key)
+        tmp_path = path.with_name(path.name + '.tmp')
+        _to_storage_frame(df).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+
+# 追加式分区存储配置
+PARTITION_FORMATS = {'D': '%Y-%m-%d', 'M': '%Y-%m'}   # 按天/按月分区
+DEFAULT_PARTITION_FREQ = 'M'
+DEDUPE_COLUMNS = ('pool_name', TIMESTAMP_COLUMN)
+COMPACTION_STATE_FILENAME = 'last_compaction.json'   # 记录最近一次定期压缩的月份
+COMPACTION_PERIOD_FORMAT = '%Y-%m'
+
+
+class PartitionedCollectionStore:
+    """
+    追加式时间分区存储 - 用于每日数据收集
+    每次追加只写入新行 (每个分区一个新part文件)，读取和压缩时按 (池子, 时间戳) 去重
+    目录结构: {root}/period=2024-01/part-{纳秒时间戳}-{pid}.parquet
+    """
+
+    def __init__(self, root: Union[str, Path], partition_freq: str = DEFAULT_PARTITION_FREQ,
+                 use_parquet: bool = PARQUET_AVAILABLE):
+        if partition_freq not in PARTITION_FORMATS:
+            raise ValueError(f"Unsupported partition_freq: {partition_freq}")
+
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.partition_freq = partition_freq
+        self.use_parquet = use_parquet and PARQUET_AVAILABLE
+
+    @property
+    def suffix(self) -> str:
+        return '.parquet' if self.use_parquet else '.csv'
+
+    def _partition_dir(self, period: str) -> Path:
+        return self.root / f"period={period}"
+
+    def partitions(self) -> List[str]:
+        """已有的分区 (按时间排序)"""
+        return sorted(path.name.split('=', 1)[1] for path in self.root.glob("period=*") if path.is_dir())
+
+    @staticmethod
+    def _parts(partition_dir: Path) -> List[Path]:
+        # 文件名以纳秒时间戳开头，按名称排序即按写入顺序
+        parts = list(partition_dir.glob("part-*.parquet")) + list(partition_dir.glob("part-*.csv"))
+        return sorted(parts, key=lambda path: path.name)
+
+    def _write_part(self, partition_dir: Path, df: pd.DataFrame, sequence: Optional[int] = None,
+                    tag: str = '') -> Path:
+        partition_dir.mkdir(exist_ok=True)
+
+        sequence = sequence if sequence is not None else time.time_ns()
+        path = partition_dir / f"part-{sequence:020d}-{os.getpid()}{tag}{self.suffix}"
+        tmp_path = path.with_name(path.name + '.tmp')
+
+        if self.use_parquet:
+            _to_storage_frame(df).to_parquet(tmp_path, index=False)
+        else:
+            normalize_frame(df).to_csv(tmp_path, index=False, encoding='utf-8')
+        os.replace(tmp_path, path)
+
+        return path
+
+    @staticmethod
+    def _dedupe(df: pd.DataFrame) -> pd.DataFrame:
+        """按 (池子, 时间戳) 去重，后写入的行优先"""
+
+        subset = [column for column in DEDUPE_COLUMNS if column in df.columns]
+        if subset:
+            df = df.drop_duplicates(subset=subset, keep='last')
+        if TIMESTAMP_COLUMN in df.columns:
+            df = df.sort_values(TIMESTAMP_COLUMN, kind='stable')
+        return df.reset_index(drop=True)
+
+    def append(self, df: pd.DataFrame) -> List[Path]:
+        """追加新行 (只写入新数据，不读取已有分区)，返回写入的part文件"""
+
+        missing = [column for column in DEDUPE_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"Collection rows require columns: {missing}")
+
+        if df.empty:
+            return []
+
+        df = normalize_frame(df)
+        periods = df[TIMESTAMP_COLUMN].dt.strftime(PARTITION_FORMATS[self.partition_freq])
+
+        return [self._write_part(self._partition_dir(period), self._dedupe(group.drop(columns='__period')))
+                for period, group in df.assign(__period=periods).groupby('__period', sort=True)]
+
+    def read(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             pools: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取 [start, end] 范围内的数据 (只打开相关分区)，已去重并按时间排序"""
+
+        fmt = PARTITION_FORMATS[self.partition_freq]
+        first = pd.Timestamp(start).strftime(fmt) if start is not None else None
+        last = pd.Timestamp(end).strftime(fmt) if end is not None else None
+
+        frames = []
+        for period in self.partitions():
+            if (first and period < first) or (last and period > last):
+                continue
+            frames.extend(read_historical_file(path) for path in self._parts(self._partition_dir(period)))
+
+        if not frames:
+            return pd.DataFrame(columns=list(DEDUPE_COLUMNS))
+
+        df = self._dedupe(normalize_frame(pd.concat(frames, ignore_index=True)))
+
+        if start is not None:
+            df = df[df[TIMESTAMP_COLUMN] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df[TIMESTAMP_COLUMN] <= pd.Timestamp(end)]
+        if pools is not None:
+            df = df[df['pool_name'].astype(str).isin(pools)]
+
+        return df.reset_index(drop=True)
+
+    def last_timestamp(self, pool_name: str) -> Optional[pd.Timestamp]:
+        """池子已存储的最新时间戳 (从最新的分区向前查找，通常只打开一个分区)，没有数据时返回None"""
+
+        for period in reversed(self.partitions()):
+            parts = self._parts(self._partition_dir(period))
+            if not parts:
+                continue
+            df = normalize_frame(pd.concat([read_historical_file(path, columns=list(DEDUPE_COLUMNS))
+                                            for path in parts], ignore_index=True))
+            timestamps = df.loc[df['pool_name'].astype(str) == pool_name, TIMESTAMP_COLUMN]
+            if not timestamps.empty:
+                return timestamps.max()
+
+        return None
+
+    def compact(self, min_parts: int = 2) -> int:
+        """
+        压缩: 将分区内的多个part合并去重为一个文件，返回压缩的分区数
+        合并文件沿用被合并part中最大的序号，压缩期间并发追加的新part仍排在其后
+        """
+
+        compacted = 0
+
+        for period in self.partitions():
+            partition_dir = self._partition_dir(period)
+            parts = self._parts(partition_dir)
+            if len(parts) < min_parts:
+                continue
+
+            df = self._dedupe(normalize_frame(pd.concat([read_historical_file(path) for path in parts],
+                                                        ignore_index=True)))
+            sequence = max(int(path.name.split('-')[1]) for path in parts)
+            output = self._write_part(partition_dir, df, sequence=sequence, tag='-c')
+
+            for path in parts:
+                if path != output:
+                    path.unlink()
+
+            compacted += 1
+
+        if compacted:
+            print(f"🗜️  已压缩 {compacted} 个分区: {self.root}")
+
+        return compacted
+
+    def last_compaction_period(self) -> Optional[str]:
+        """最近一次定期压缩的月份 (YYYY-MM)，从未压缩时返回None"""
+
+        try:
+            with open(self.root / COMPACTION_STATE_FILENAME, 'r', encoding='utf-8') as f:
+                return json.load(f).get('period')
+        except (OSError, ValueError):
+            return None
+
+    def compact_monthly(self, now: Optional[datetime] = None) -> Optional[int]:
+        """
+        每月最多压缩一次: 本月已压缩过时直接返回None，否则压缩并记录月份
+        调度器和cron脚本可以随意频繁调用，压缩状态在跨进程文件锁内检查和更新
+        """
+
+        period = (now or datetime.now()).strftime(COMPACTION_PERIOD_FORMAT)
+        state_path = self.root / COMPACTION_STATE_FILENAME
+
+        with _interprocess_lock(state_path.with_name(state_path.name + MANIFEST_LOCK_SUFFIX)):
+            if self.last_compaction_period() == period:
+                return None
+
+            compacted = self.compact()
+
+            tmp_path = state_path.with_name(state_path.name + f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'period': period, 'compacted_at': datetime.now().isoformat()}, f)
+            os.replace(tmp_path, state_path)
+
+        return compacted
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+数据源熔断器和截止时间预算
+连续失败的数据源 (Curve API、链上、DefiLlama、CoinGecko) 会被熔断一段时间，期间直接跳过
+截止时间在整条备用链 (Curve API → 链上 → 合成数据) 中传递，保证一次获取在有限时间内返回
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# 数据源名称
+SOURCE_CURVE_API = 'curve_api'
+SOURCE_ONCHAIN = 'onchain'
+SOURCE_DEFILLAMA = 'defillama'
+SOURCE_COINGECKO = 'coingecko'
+
+# 熔断配置: (连续失败次数阈值, 熔断时间 秒)
+CIRCUIT_SETTINGS: Dict[str, Tuple[int, float]] = {
+    SOURCE_CURVE_API: (3, 60),
+    SOURCE_ONCHAIN: (3, 30),
+    SOURCE_DEFILLAMA: (3, 120),
+    SOURCE_COINGECKO: (1, 60),      # 免费版容易被限流，失败一次即冷却，避免逐池重试
+}
+DEFAULT_CIRCUIT_SETTINGS: Tuple[int, float] = (3, 60)
+
+# 熔断器状态
+STATE_CLOSED = 'closed'         # 正常放行
+STATE_OPEN = 'open'             # 熔断中，直接跳过
+STATE_HALF_OPEN = 'half_open'   # 熔断到期，只放行一次试探请求
+
+
+class CircuitBreaker:
+    """单个数据源的熔断器 - 连续失败达到阈值后熔断，到期后半开试探"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None   # 半开试探开始时间 (None表示没有进行中的试探)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def _update_state(self):
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = STATE_HALF_OPEN
+            self._trial_started = None
+
+    def allow(self) -> bool:
+        """是否允许向该数据源发送请求 (半开状态下只有第一个调用方获得试探机会)"""
+
+        with self._lock:
+            self._update_state()
+
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN:
+                # 试探请求没有回报结果 (如被取消) 时，超过熔断时间后允许再次试探
+                now = time.monotonic()
+                if self._trial_started is None or now - self._trial_started >= self.reset_timeout:
+                    self._trial_started = now
+                    return True
+            return False
+
+    def retry_in(self) -> float:
+        """距离半开试探还有多少秒 (未熔断时为0)"""
+
+        with self._lock:
+            if self._state != STATE_OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                print(f"🟢 数据源 {self.name} 已恢复")
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_started = None
+
+            # 半开试探失败立即重新熔断
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    print(f"🔴 数据源 {self.name} 连续失败 {self._failures} 次，熔断 {self.reset_timeout:.0f}s")
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started = None
+
+
+class Deadline:
+    """截止时间预算 - 在备用链中传递，各步骤的超时和退避不会超出剩余时间"""
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self._expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数 (无截止时间时为None)"""
+
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
+
+    def clamp(self, seconds: float) -> float:
+        """把超时/等待时间限制在剩余预算之内"""
+
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(source: str) -> CircuitBreaker:
+    """获取数据源的共享熔断器 (线程安全，每个数据源一个)"""
+
+    breaker = _breakers.get(source)
+
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(source)
+            if breaker is None:
+                failure_threshold, reset_timeout = CIRCUIT_SETTINGS.get(source, DEFAULT_CIRCUIT_SETTINGS)
+                breaker = CircuitBreaker(source, failure_threshold, reset_timeout)
+                _breakers[source] = breaker
+
+    return breaker
+
+
+def circuit_status() -> Dict[str, str]:
+    """所有已创建熔断器的状态"""
+    return {name: breaker.state for name, breaker in sorted(_breakers.items())}
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Curve数据收集调度器
+单一常驻进程按 Config.UPDATE_INTERVALS 定时收集所有池子，替代每个池子一个cron脚本
+所有任务共享HTTP会话、注册表快照和异步连接池
+"""
+
+import argparse
+import asyncio
+import heapq
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+from circuit_breaker import circuit_status
+from async_data_collector import AIOHTTP_AVAILABLE, ASYNC_SWEEP_DEADLINE, collect_real_time_data
+from config import Config
+from data_manager import CurveDataManager
+from free_historical_data import FreeHistoricalDataManager, AVAILABLE_POOLS
+
+if AIOHTTP_AVAILABLE:
+    from async_data_collector import AsyncCurveRealDataCollector
+
+# 调度配置
+SCHEDULER_JITTER = 0.1          # 每次运行时间的随机抖动 (占间隔的比例)
+SCHEDULER_MAX_SLEEP = 5         # 空闲时最长睡眠时间 (秒)，保证stop()及时生效
+DAILY_COLLECTION_DAYS = 1       # 历史收集任务每次获取的天数
+
+
+@dataclass
+class JobStats:
+    """调度任务运行统计"""
+    name: str
+    interval: float
+    next_run: Optional[datetime] = None
+    last_run: Optional[datetime] = None
+    last_duration: Optional[float] = None
+    total_duration: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    missed_runs: int = 0
+    last_error: Optional[str] = None
+
+    @property
+    def avg_duration(self) -> Optional[float]:
+        return self.total_duration / self.runs if self.runs else None
+
+
+@dataclass(order=True)
+class _ScheduledRun:
+    due: float                      # time.monotonic() 到期时间 (含抖动)
+    name: str = field(compare=False)
+    slot: float = field(compare=False)   # 不含抖动的计划时间，避免抖动累积漂移
+
+
+class CollectionScheduler:
+    """数据收集调度器 - 固定频率 + 抖动，错过的运行只计数不补跑"""
+
+    def __init__(self, pools: Optional[List[str]] = None,
+                 intervals: Optional[Dict[str, float]] = None,
+                 jitter: float = SCHEDULER_JITTER,
+                 data_dir: str = "curve_data",
+                 cache_dir: str = "free_historical_cache"):
+        self.pools = pools or list(Config.CURVE_POOLS.keys())
+        self.intervals = dict(Config.UPDATE_INTERVALS if intervals is None else intervals)
+        self.jitter = jitter
+
+        # 共享的数据管理器 (HTTP会话和注册表快照在进程内共享)
+        self.data_manager = CurveDataManager(data_dir)
+        self.historical_manager = FreeHistoricalDataManager(cache_dir)
+
+        self._jobs: Dict[str, Callable[[], None]] = {}
+        self._stats: Dict[str, JobStats] = {}
+        self._queue: List[_ScheduledRun] = []
+        self._stop = threading.Event()
+
+        # 每个池子最近一次成功收集的日期，同一天内不重复收集
+        self._collected_on: Dict[str, date] = {}
+
+        # 常驻事件循环和异步收集器，复用aiohttp连接池
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._async_collector = None
+
+        self._register_default_jobs()
+
+    # ---------- 任务注册 ----------
+
+    def _register_default_jobs(self):
+        handlers = {
+            'real_time_data': self.collect_real_time,
+            'daily_collection': self.collect_historical,
+            'health_check': self.print_status,
+        }
+        for name, handler in handlers.items():
+            if name in self.intervals:
+                self.add_job(name, self.intervals[name], handler)
+
+    def add_job(self, name: str, interval: float, func: Callable[[], None], run_immediately: bool = True):
+        """注册定时任务，首次运行时间在 [0, interval*jitter] 内随机错开"""
+
+        if interval <= 0:
+            raise ValueError(f"Invalid interval for job {name}: {interval}")
+
+        self._jobs[name] = func
+        self._stats[name] = JobStats(name=name, interval=interval)
+
+        now = time.monotonic()
+        slot = now if run_immediately else now + interval
+        self._push(name, slot)
+
+    def _push(self, name: str, slot: float):
+        interval = self._stats[name].interval
+        due = slot + random.uniform(0, interval * self.jitter)
+        heapq.heappush(self._queue, _ScheduledRun(due, name, slot))
+        self._stats[name].next_run = datetime.fromtimestamp(time.time() + (due - time.monotonic()))
+
+    # ---------- 收集任务 ----------
+
+    def _ensure_async_collector(self):
+        """启动常驻事件循环线程并打开异步收集器"""
+
+        if self._loop is not None:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="collector-loop", daemon=True)
+        self._loop_thread.start()
+
+        collector = AsyncCurveRealDataCollector(Config.get_web3_provider_url())
+        asyncio.run_coroutine_threadsafe(collector.__aenter__(), self._loop).result()
+        self._async_collector = collector
+
+    def collect_real_time(self):
+        """并发获取所有池子的实时数据并保存"""
+
+        if AIOHTTP_AVAILABLE:
+            self._ensure_async_collector()
+            future = asyncio.run_coroutine_threadsafe(
+                self._async_collector.get_real_time_data_many(self.pools, ASYNC_SWEEP_DEADLINE), self._loop
+            )
+            results = future.result()
+        else:
+            results = collect_real_time_data(self.pools, Config.get_web3_provider_url())
+
+        # 一轮的所有池子写入同一个列式批量容器，只构造一次DataFrame
+        self.data_manager.save_real_time_batch({name: data for name, data in results.items() if data is not None})
+
+    def collect_historical(self):
+        """为所有池子追加最新的历史数据到分区存储 (替代 daily_collect_*.py)"""
+
+        today = date.today()
+        pools = {}
+        for pool_name in self.pools:
+            if self._collected_on.get(pool_name) == today:
+                continue
+            pool_info = AVAILABLE_POOLS.get(pool_name) or Config.CURVE_POOLS.get(pool_name)
+            if not pool_info:
+                print(f"⚠️  未知池子: {pool_name}")
+                continue
+            pools[pool_name] = pool_info
+
+        if not pools:
+            print("ℹ️  所有池子今日已收集")
+            return
+
+        # 所有池子一次归档节点回填 (每个区块一次Multicall)
+        self.historical_manager.prefetch_archive_history(
+            {name: info['address'] for name, info in pools.items()}, DAILY_COLLECTION_DAYS
+        )
+
+        for pool_name, pool_info in pools.items():
+            written = self.historical_manager.collect_daily(pool_name, pool_info['address'], DAILY_COLLECTION_DAYS)
+            if written is not None:
+                self._collected_on[pool_name] = today
+                print(f"✅ {pool_name}: 新增 {written} 条记录")
+
+        # 每月压缩一次分区 (压缩月份记录在存储目录中，重启或重复运行不会再次压缩)
+        self.historical_manager.collection_store.compact_monthly()
+
+    # ---------- 调度循环 ----------
+
+    def run_pending(self) -> int:
+        """运行所有已到期的任务，返回运行数量"""
+
+        ran = 0
+
+        while self._queue and self._queue[0].due <= time.monotonic() and not self._stop.is_set():
+            scheduled = heapq.heappop(self._queue)
+            self._run_job(scheduled.name)
+            ran += 1
+
+            # 固定频率: 下一次计划时间基于本次计划时间，跳过已错过的时段
+            stats = self._stats[scheduled.name]
+            next_slot = scheduled.slot + stats.interval
+            now = time.monotonic()
+            if next_slot <= now:
+                missed = int((now - next_slot) // stats.interval) + 1
+                stats.missed_runs += missed
+                next_slot += missed * stats.interval
+                print(f"⚠️  任务 {scheduled.name} 错过 {missed} 次运行")
+
+            self._push(scheduled.name, next_slot)
+
+        return ran
+
+    def _run_job(self, name: str):
+        stats = self._stats[name]
+        stats.last_run = datetime.now()
+        start_time = time.perf_counter()
+
+        print(f"\n[{stats.last_run.strftime('%Y-%m-%d %H:%M:%S')}] ▶️  运行任务: {name}")
+
+        try:
+            self._jobs[name]()
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e)[:200]
+            print(f"❌ 任务 {name} 失败: {str(e)[:100]}...")
+        finally:
+            stats.last_duration = time.perf_counter() - start_time
+            stats.total_duration += stats.last_duration
+            stats.runs += 1
+
+        print(f"⏱️  任务 {name} 耗时 {stats.last_duration:.2f}s")
+
+    def run_forever(self):
+        """常驻运行直到 stop() 或 Ctrl+C"""
+
+        print(f"🚀 收集调度器启动: {len(self.pools)} 个池子, {len(self._jobs)} 个任务")
+        for name, stats in self._stats.items():
+            print(f"   - {name:16} 每 {stats.interval:.0f}s")
+
+        try:
+            while not self._stop.is_set():
+                self.run_pending()
+                if not self._queue:
+                    break
+                wait = min(max(0.0, self._queue[0].due - time.monotonic()), SCHEDULER_MAX_SLEEP)
+                self._stop.wait(wait)
+        except KeyboardInterrupt:
+            print("\n👋 调度器已停止")
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        """关闭异步收集器和事件循环"""
+
+        if self._loop is None:
+            return
+
+        if self._async_collector is not None:
+            asyncio.run_coroutine_threadsafe(self._async_collector.close(), self._loop).result()
+            self._async_collector = None
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+        self._loop = None
+
+    # ---------- 状态 ----------
+
+    def stats(self) -> Dict[str, JobStats]:
+        """各任务的下次运行时间、耗时和错过次数"""
+        return dict(self._stats)
+
+    def print_status(self):
+        print("📊 调度器状态:")
+        print(f"   {'任务':16} {'下次运行':20} {'上次耗时':>8} {'平均耗时':>8} {'运行':>5} {'失败':>5} {'错过':>5}")
+        for stats in self._stats.values():
+            next_run = stats.next_run.strftime('%Y-%m-%d %H:%M:%S') if stats.next_run else '-'
+            last = f"{stats.last_duration:.2f}s" if stats.last_duration is not None else '-'
+            avg = f"{stats.avg_duration:.2f}s" if stats.avg_duration is not None else '-'
+            print(f"   {stats.name:16} {next_run:20} {last:>8} {avg:>8} "
+                  f"{stats.runs:>5} {stats.failures:>5} {stats.missed_runs:>5}")
+
+        breakers = circuit_status()
+        if breakers:
+            print("   数据源熔断: " + ", ".join(f"{name}={state}" for name, state in breakers.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Curve数据收集调度器')
+    parser.add_argument('--pools', nargs='+', default=None, help='要收集的池子 (默认: Config.CURVE_POOLS)')
+    parser.add_argument('--jitter', type=float, default=SCHEDULER_JITTER, help='调度抖动比例')
+    parser.add_argument('--once', action='store_true', help='所有任务运行一次后退出')
+    args = parser.parse_args()
+
+    scheduler = CollectionScheduler(pools=args.pools, jitter=0 if args.once else args.jitter)
+
+    if args.once:
+        try:
+            scheduler.run_pending()
+            scheduler.print_status()
+        finally:
+            scheduler.close()
+    else:
+        scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,18 @@ class Config:
         else:
             return None
     
+    @classmethod
+    def get_web3_ws_url(cls) -> Optional[str]:
+        """获取Web3 WebSocket URL (实时数据流订阅用，WEB3_WS_URL 优先)"""
+        if os.getenv('WEB3_WS_URL'):
+            return os.getenv('WEB3_WS_URL')
+        elif cls.API_KEYS['INFURA_API_KEY']:
+            return f"wss://mainnet.infura.io/ws/v3/{cls.API_KEYS['INFURA_API_KEY']}"
+        elif cls.API_KEYS['ALCHEMY_API_KEY']:
+            return f"wss://eth-mainnet.g.alchemy.com/v2/{cls.API_KEYS['ALCHEMY_API_KEY']}"
+        else:
+            return None
+    
     # Curve池配置
     CURVE_POOLS = {
         '3pool': {
@@ -123,6 +135,7 @@ class Config:
     UPDATE_INTERVALS = {
         'real_time_data': 60,        # 1分钟
         'historical_data': 3600,     # 1小时
+        'daily_collection': 86400,   # 1天 (每日历史数据收集)
         'model_prediction': 300,     # 5分钟
         'health_check': 600          # 10分钟
     }
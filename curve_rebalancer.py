@@ -6,13 +6,16 @@ import pandas as pd
 from dataclasses import dataclass
 try:
     from web3 import Web3
+    from rpc_cache import CachingHTTPProvider  # 固定区块的eth_call结果缓存
     WEB3_AVAILABLE = True
 except ImportError:
     WEB3_AVAILABLE = False
     print("Web3 not available. Install with: pip install web3")
-import requests
 import time
 
+from curve_registry import get_curve_registry
+from http_session import get_session
+
 @dataclass
 class CurvePoolState:
     """Curve池状态数据结构"""
@@ -69,7 +72,7 @@ class CurveDataCollector:
     
     def __init__(self, web3_provider: Optional[str] = None):
         if WEB3_AVAILABLE and web3_provider:
-            self.w3 = Web3(Web3.HTTPProvider(web3_provider))
+            self.w3 = Web3(CachingHTTPProvider(web3_provider, session=get_session(web3_provider)))
         else:
             self.w3 = None
         self.curve_api_base = "https://api.curve.fi/api"
@@ -87,28 +90,24 @@ class CurveDataCollector:
         
     def get_pool_info(self, pool_address: str) -> Optional[CurvePoolState]:
         """获取池子信息"""
-        # 这里应该调用Curve的API或直接与合约交互
-        # 简化示例
+        # 从共享的Curve注册表快照中按地址查询 (TTL内无网络I/O)
         try:
-            url = f"{self.curve_api_base}/getPools"
-            response = requests.get(url, timeout=10)
+            registry = get_curve_registry()
             
-            if response.status_code == 200:
-                pools_data = response.json()
-                # 解析特定池子数据
-                for pool in pools_data.get('data', {}).get('poolData', []):
-                    if pool.get('address', '').lower() == pool_address.lower():
-                        return CurvePoolState(
-                            pool_address=pool['address'],
-                            tokens=[token['symbol'] for token in pool['coins']],
-                            balances=[float(token['poolBalance']) for token in pool['coins']],
-                            total_supply=float(pool['totalSupply']),
-                            virtual_price=float(pool['virtualPrice']),
-                            admin_fee=float(pool['adminFee']),
-                            fee=float(pool['fee']),
-                            amplification=int(pool['amplificationCoefficient']),
-                            timestamp=int(time.time())
-                        )
+            if registry.ensure_fresh():
+                pool = registry.get_by_address(pool_address)
+                if pool:
+                    return CurvePoolState(
+                        pool_address=pool['address'],
+                        tokens=[token['symbol'] for token in pool['coins']],
+                        balances=[float(token['poolBalance']) for token in pool['coins']],
+                        total_supply=float(pool['totalSupply']),
+                        virtual_price=float(pool['virtualPrice']),
+                        admin_fee=float(pool['adminFee']),
+                        fee=float(pool['fee']),
+                        amplification=int(pool['amplificationCoefficient']),
+                        timestamp=int(time.time())
+                    )
         except Exception as e:
             print(f"Error fetching pool info: {e}")
         
@@ -191,12 +190,19 @@ class CurveRebalancer:
         return 0
     
     def generate_rebalance_signal(self, pool_address: str, 
-                                lookback_hours: int = 24) -> RebalanceSignal:
-        """生成重新平衡信号"""
+                                lookback_hours: int = 24,
+                                latest_row: Optional[Dict] = None) -> RebalanceSignal:
+        """生成重新平衡信号 (latest_row: 推送的最新池子状态，追加到回看窗口末尾)"""
         
         # 获取历史数据
         historical_data = self.data_collector.get_historical_data(pool_address)
         
+        # 最新状态中缺少的特征沿用上一行
+        if latest_row:
+            previous = historical_data.iloc[-1].to_dict() if not historical_data.empty else {}
+            historical_data = pd.concat([historical_data, pd.DataFrame([{**previous, **latest_row}])],
+                                        ignore_index=True)
+        
         # 准备输入数据
         features = ['usdc_balance', 'usdt_balance', 'dai_balance', 'virtual_price', 'volume_24h']
         X = historical_data[features].values[-lookback_hours:]
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Curve池子注册表快照
+一次下载 getPools 全量数据，按地址/池子名称建立索引，在TTL内供所有收集器共享
+响应体逐个池子增量解析，只保留收集器用到的字段 (紧凑记录)，不在内存中构建完整的嵌套JSON
+"""
+
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import requests
+
+from http_session import http_get
+
+# 注册表配置
+CURVE_API_BASE = "https://api.curve.fi"
+REGISTRY_URL = f"{CURVE_API_BASE}/api/getPools/ethereum/main"
+REGISTRY_TTL_SECONDS = 300   # 快照有效期 (秒)
+REGISTRY_TIMEOUT = 15
+REGISTRY_VERIFY_SSL = False
+
+# 紧凑记录保留的字段 (其余字段如 gaugeRewards、各种USD细分在解析时丢弃)
+REGISTRY_POOL_FIELDS = (
+    'id', 'name', 'address', 'lpTokenAddress', 'assetTypeName', 'totalSupply', 'virtualPrice',
+    'fee', 'adminFee', 'amplificationCoefficient', 'usdTotal', 'volumeUSD', 'totalFees24h',
+    'latestDailyApy', 'isMetaPool', 'basePoolAddress',
+)
+REGISTRY_COIN_FIELDS = ('address', 'symbol', 'decimals', 'name', 'poolBalance', 'rate', 'usdPrice')
+REGISTRY_COIN_LISTS = ('coins', 'underlyingCoins')
+
+# 代币symbol/decimals等在数百个池子中重复出现，驻留后共享同一个字符串对象
+_INTERNED_COIN_FIELDS = ('address', 'symbol', 'decimals', 'name')
+
+
+def project_pool(pool: Dict, pool_fields: Iterable[str] = REGISTRY_POOL_FIELDS,
+                 coin_fields: Iterable[str] = REGISTRY_COIN_FIELDS) -> Dict:
+    """池子条目 → 只含指定字段的紧凑记录 (coins/underlyingCoins 同样投影)"""
+
+    record = {field: pool[field] for field in pool_fields if field in pool}
+
+    for coin_list in REGISTRY_COIN_LISTS:
+        coins = pool.get(coin_list)
+        if coins is not None:
+            record[coin_list] = [_project_coin(coin, coin_fields) for coin in coins]
+
+    return record
+
+
+def _project_coin(coin: Dict, coin_fields: Iterable[str]) -> Dict:
+    entry = {field: coin[field] for field in coin_fields if field in coin}
+    for field in _INTERNED_COIN_FIELDS:
+        value = entry.get(field)
+        if isinstance(value, str):
+            entry[field] = sys.intern(value)
+    return entry
+
+
+def _iter_pool_items(content: bytes) -> Iterator[Dict]:
+    """
+    逐个产出 data.poolData 数组中的池子条目 (每次只有一个池子的完整字典在内存中)
+    用标准库C解码器的 raw_decode 逐个解析数组元素，速度与一次性 json.loads 相当
+    """
+
+    text = content.decode('utf-8')
+    key = text.find('"poolData"')
+    if key < 0:
+        raise KeyError('poolData')
+    position = text.find('[', text.find(':', key)) + 1
+    if position <= 0:
+        raise KeyError('poolData')
+
+    decoder = json.JSONDecoder()
+    length = len(text)
+    while True:
+        while position < length and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= length:
+            raise ValueError('poolData array is truncated')
+        if text[position] == ']':
+            return
+        pool, position = decoder.raw_decode(text, position)
+        yield pool
+
+
+def iter_registry_pools(content: bytes, addresses: Optional[Iterable[str]] = None,
+                        pool_fields: Iterable[str] = REGISTRY_POOL_FIELDS,
+                        coin_fields: Iterable[str] = REGISTRY_COIN_FIELDS) -> Iterator[Dict]:
+    """
+    增量解析 getPools 响应体，产出紧凑记录
+    addresses 不为空时只产出这些池子，全部找到后立即停止解析
+    """
+
+    wanted = {address.lower() for address in addresses} if addresses is not None else None
+    pool_fields, coin_fields = tuple(pool_fields), tuple(coin_fields)
+
+    for pool in _iter_pool_items(content):
+        if wanted is not None:
+            address = str(pool.get('address', '')).lower()
+            if address not in wanted:
+                continue
+            wanted.discard(address)
+
+        yield project_pool(pool, pool_fields, coin_fields)
+
+        if wanted is not None and not wanted:
+            return
+
+
+class CurveRegistrySnapshot:
+    """Curve注册表快照 - TTL内的查询均为O(1)字典命中，无网络I/O"""
+
+    def __init__(self, url: str = REGISTRY_URL, ttl: float = REGISTRY_TTL_SECONDS):
+        self.url = url
+        self.ttl = ttl
+
+        self._pools: List[Dict] = []
+        self._by_address: Dict[str, Dict] = {}
+        self._by_name: Dict[str, Dict] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        """快照是否仍在TTL内"""
+        return self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def ensure_fresh(self, fetch: Optional[Callable[[str], Optional[requests.Response]]] = None) -> bool:
+        """快照过期时刷新，返回是否有可用快照"""
+
+        if self.is_fresh():
+            return True
+
+        with self._lock:
+            # 等锁期间可能已被其他线程刷新
+            if self.is_fresh():
+                return True
+            return self._refresh(fetch)
+
+    def _refresh(self, fetch: Optional[Callable[[str], Optional[requests.Response]]] = None) -> bool:
+        try:
+            if fetch is not None:
+                response = fetch(self.url)
+            else:
+                response = http_get(self.url, timeout=REGISTRY_TIMEOUT, verify=REGISTRY_VERIFY_SSL)
+
+            if response is None or response.status_code != 200:
+                print(f"❌ 无法获取Curve注册表")
+                return bool(self._pools)
+
+            self.load_bytes(response.content)
+            return True
+
+        except Exception as e:
+            print(f"❌ Curve注册表刷新失败: {str(e)[:100]}...")
+            # 刷新失败时继续使用旧快照 (如果有)
+            return bool(self._pools)
+
+    def load(self, payload: Dict) -> int:
+        """载入已解析的 getPools 响应并重建索引，返回池子数量"""
+
+        if 'data' not in payload or 'poolData' not in payload['data']:
+            raise KeyError('poolData')
+
+        return self.load_records([project_pool(pool) for pool in payload['data']['poolData']])
+
+    def load_bytes(self, content: Union[bytes, str]) -> int:
+        """增量解析 getPools 响应体并重建索引，返回池子数量"""
+
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        # 缺少poolData时抛出KeyError，响应体损坏时抛出ValueError (与 load 相同，空列表返回0)
+        return self.load_records(list(iter_registry_pools(content)))
+
+    def load_records(self, pools: List[Dict]) -> int:
+        """载入紧凑记录并重建索引，返回池子数量"""
+
+        by_address = {}
+        by_name = {}
+
+        for pool in pools:
+            address = pool.get('address', '').lower()
+            if address:
+                by_address[address] = pool
+
+            # 同时索引池子名称和注册表id (如 '3pool')，先到先得与原线性扫描一致
+            for key in (pool.get('name'), pool.get('id')):
+                if key:
+                    by_name.setdefault(str(key).lower(), pool)
+
+        self._pools = pools
+        self._by_address = by_address
+        self._by_name = by_name
+        self._fetched_at = time.monotonic()
+
+        return len(pools)
+
+    def invalidate(self):
+        """使快照失效，下次查询时重新下载"""
+        self._fetched_at = None
+
+    def pools(self) -> List[Dict]:
+        """快照中的所有池子"""
+        return self._pools
+
+    def get_by_address(self, address: str) -> Optional[Dict]:
+        """按池子地址查询 (大小写无关)"""
+        return self._by_address.get(address.lower())
+
+    def get_by_name(self, pool_name: str) -> Optional[Dict]:
+        """按池子名称/id查询，精确匹配失败时退回子串匹配"""
+
+        key = pool_name.lower()
+        pool = self._by_name.get(key)
+        if pool is not None:
+            return pool
+
+        for pool in self._pools:
+            if key in pool.get('name', '').lower():
+                return pool
+
+        return None
+
+    def find(self, pool_name: str, address: Optional[str] = None) -> Optional[Dict]:
+        """优先按已知地址查询，其次按名称查询"""
+
+        if address:
+            pool = self.get_by_address(address)
+            if pool is not None:
+                return pool
+
+        return self.get_by_name(pool_name)
+
+
+_shared_registry: Optional[CurveRegistrySnapshot] = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_curve_registry() -> CurveRegistrySnapshot:
+    """获取进程内共享的注册表快照"""
+
+    global _shared_registry
+
+    if _shared_registry is None:
+        with _shared_registry_lock:
+            if _shared_registry is None:
+                _shared_registry = CurveRegistrySnapshot()
+
+    return _shared_registry
@@ -12,7 +12,10 @@ from typing import Dict, List, Optional, Union
 from pathlib import Path
 
 from real_data_collector import CurveRealDataCollector, CurvePoolData
+from async_data_collector import collect_real_time_data
+from cache_store import CacheManifest
 from config import Config
+from pool_snapshot import PoolSnapshotBatch, SNAPSHOT_BASE_COLUMNS
 
 class CurveDataManager:
     """Curve数据管理器"""
@@ -26,20 +29,25 @@ class CurveDataManager:
         (self.data_dir / "historical").mkdir(exist_ok=True)
         (self.data_dir / "backups").mkdir(exist_ok=True)
         
+        # 数据清单 (每次写入原子更新)
+        self.manifest = CacheManifest(self.data_dir)
+        
         # 初始化数据收集器
         web3_url = Config.get_web3_provider_url()
         self.collector = CurveRealDataCollector(web3_url)
         
         print(f"📁 数据目录: {self.data_dir.absolute()}")
     
-    def save_real_time_data(self, pool_name: str, save_csv: bool = True) -> Optional[str]:
-        """获取并保存实时数据"""
+    def save_real_time_data(self, pool_name: str, save_csv: bool = True,
+                            pool_data: Optional[CurvePoolData] = None) -> Optional[str]:
+        """获取并保存实时数据 (可传入已预取的pool_data)"""
         
         print(f"📊 获取 {pool_name} 实时数据...")
         
         try:
             # 获取实时数据
-            pool_data = self.collector.get_real_time_data(pool_name)
+            if pool_data is None:
+                pool_data = self.collector.get_real_time_data(pool_name)
             
             if not pool_data:
                 print(f"❌ 无法获取 {pool_name} 数据")
@@ -49,19 +57,7 @@ class CurveDataManager:
             df = self._pool_data_to_df(pool_data)
             
             if save_csv:
-                # 保存为CSV
-                timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{pool_name}_realtime_{timestamp_str}.csv"
-                filepath = self.data_dir / "real_time" / filename
-                
-                df.to_csv(filepath, index=False, encoding='utf-8')
-                print(f"✅ 实时数据已保存: {filepath}")
-                
-                # 同时保存最新数据 (覆盖)
-                latest_file = self.data_dir / "real_time" / f"{pool_name}_latest.csv"
-                df.to_csv(latest_file, index=False, encoding='utf-8')
-                
-                return str(filepath)
+                return self._write_real_time_csv(pool_name, df)
             else:
                 print(f"📊 数据获取成功但未保存 (save_csv=False)")
                 return None
@@ -70,6 +66,54 @@ class CurveDataManager:
             print(f"❌ 保存实时数据失败: {e}")
             return None
     
+    def save_real_time_batch(self, pool_data: Dict[str, Optional[CurvePoolData]],
+                             save_csv: bool = True) -> Dict[str, str]:
+        """
+        批量保存一轮已获取的实时数据 {pool_name: CurvePoolData}
+        所有池子先写入一个列式批量容器，只构造一次DataFrame，再按池子拆分写入各自的CSV
+        """
+        
+        fetched = {name: data for name, data in pool_data.items() if data}
+        for name in pool_data.keys() - fetched.keys():
+            print(f"❌ 无法获取 {name} 数据")
+        if not fetched or not save_csv:
+            return {}
+        
+        batch = PoolSnapshotBatch(capacity=len(fetched))
+        batch.extend(fetched.values())
+        frame = batch.to_dataframe()
+        
+        results = {}
+        for row, pool_name in enumerate(fetched):
+            try:
+                df = frame.iloc[[row]]
+                # 去掉其他池子的代币列 (该池子没有的代币在批量表中为NaN)
+                token_columns = [column for column in df.columns if column not in SNAPSHOT_BASE_COLUMNS]
+                df = df.drop(columns=[column for column in token_columns if df[column].isna().all()])
+                results[pool_name] = self._write_real_time_csv(pool_name, df)
+            except Exception as e:
+                print(f"❌ 保存实时数据失败 ({pool_name}): {e}")
+        
+        return results
+    
+    def _write_real_time_csv(self, pool_name: str, df: pd.DataFrame) -> str:
+        """写入带时间戳的实时数据CSV，并覆盖 {pool_name}_latest.csv"""
+        
+        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{pool_name}_realtime_{timestamp_str}.csv"
+        filepath = self.data_dir / "real_time" / filename
+        
+        # 带时间戳的快照每分钟每个池子一个，不记入清单 (清单只记录 latest 和历史文件，保持大小有界)
+        df.to_csv(filepath, index=False, encoding='utf-8')
+        print(f"✅ 实时数据已保存: {filepath}")
+        
+        # 同时保存最新数据 (覆盖)
+        latest_file = self.data_dir / "real_time" / f"{pool_name}_latest.csv"
+        df.to_csv(latest_file, index=False, encoding='utf-8')
+        self.manifest.record(self._manifest_key(latest_file), df, latest_file)
+        
+        return str(filepath)
+    
     def save_historical_data(self, pool_name: str, days: int = 30, save_csv: bool = True) -> Optional[str]:
         """获取并保存历史数据"""
         
@@ -90,6 +134,7 @@ class CurveDataManager:
                 filepath = self.data_dir / "historical" / filename
                 
                 df.to_csv(filepath, index=False, encoding='utf-8')
+                self.manifest.record(self._manifest_key(filepath), df, filepath)
                 print(f"✅ 历史数据已保存: {filepath} ({len(df)} 条记录)")
                 
                 return str(filepath)
@@ -111,11 +156,24 @@ class CurveDataManager:
         
         print(f"🔄 批量获取 {len(pools)} 个池子的数据...")
         
+        # 并发预取所有池子的实时数据 (约一次往返时间)，一次性批量写入
+        prefetched = collect_real_time_data(pools, Config.get_web3_provider_url())
+        realtime_files = self.save_real_time_batch({name: prefetched[name] for name in pools if prefetched.get(name)},
+                                                   save_csv)
+        
+        # 预取失败的池子会逐个重试，先为它们的代币并集批量获取一次价格
+        retry_pools = [name for name in pools if not prefetched.get(name)]
+        if retry_pools:
+            self.collector.prefetch_prices(retry_pools)
+        
         for pool_name in pools:
             print(f"\n--- 处理 {pool_name} ---")
             
             # 实时数据
-            realtime_file = self.save_real_time_data(pool_name, save_csv)
+            realtime_file = realtime_files.get(pool_name)
+            if not prefetched.get(pool_name):
+                # 预取失败的池子逐个重试
+                realtime_file = self.save_real_time_data(pool_name, save_csv)
             if realtime_file:
                 results[f"{pool_name}_realtime"] = realtime_file
             
@@ -196,6 +254,7 @@ class CurveDataManager:
         
         cutoff_date = datetime.now() - timedelta(days=days_to_keep)
         deleted_count = 0
+        recorded = self.manifest.entries()
         
         for dir_name in ['real_time', 'historical', 'backups']:
             dir_path = self.data_dir / dir_name
@@ -211,6 +270,8 @@ class CurveDataManager:
                     
                     if file_time < cutoff_date:
                         file_path.unlink()
+                        if self._manifest_key(file_path) in recorded:
+                            self.manifest.remove(self._manifest_key(file_path))
                         deleted_count += 1
         
         print(f"🗑️  已清理 {deleted_count} 个超过 {days_to_keep} 天的旧文件")
@@ -234,17 +295,28 @@ class CurveDataManager:
         report.append(f"  - 总计: {total_files} 个文件")
         report.append("")
         
-        # 最新数据状态
+        # 最新数据状态 (来自数据清单，不读取数据文件)
+        entries = self.manifest.entries()
         report.append("🔄 最新数据状态:")
         for pool_name in Config.CURVE_POOLS.keys():
-            latest_file = self.data_dir / "real_time" / f"{pool_name}_latest.csv"
-            if latest_file.exists():
-                file_time = datetime.fromtimestamp(latest_file.stat().st_mtime)
+            entry = entries.get(f"real_time/{pool_name}_latest")
+            if entry:
+                file_time = datetime.fromisoformat(entry['written_at'])
                 age = datetime.now() - file_time
                 status = "🟢 新" if age.total_seconds() < 3600 else "🟡 旧" if age.total_seconds() < 86400 else "🔴 过期"
-                report.append(f"  - {pool_name}: {status} ({age})")
+                report.append(f"  - {pool_name}: {status} ({age}) | {entry['rows']} 条记录")
             else:
                 report.append(f"  - {pool_name}: ❌ 无数据")
+        report.append("")
+        
+        # 历史数据覆盖范围
+        historical = [entry for key, entry in sorted(entries.items()) if key.startswith("historical/")]
+        report.append("📈 历史数据覆盖:")
+        if historical:
+            for entry in historical:
+                report.append(f"  - {entry['file']}: {entry['rows']} 条记录 ({entry['start']} ~ {entry['end']})")
+        else:
+            report.append("  - 无记录")
         
         report_text = "\n".join(report)
         
@@ -256,38 +328,14 @@ class CurveDataManager:
         print(f"📋 汇总报告已保存: {report_file}")
         return report_text
     
+    def _manifest_key(self, filepath: Path) -> str:
+        """清单key: 相对数据目录的路径 (不含扩展名)，如 'real_time/3pool_latest'"""
+        return filepath.relative_to(self.data_dir).with_suffix('').as_posix()
+    
     def _pool_data_to_df(self, pool_data: CurvePoolData) -> pd.DataFrame:
-        """将CurvePoolData转换为DataFrame"""
-        
-        # 基本信息
-        row = {
-            'timestamp': pool_data.timestamp,
-            'pool_address': pool_data.pool_address,
-            'pool_name': pool_data.pool_name,
-            'total_supply': pool_data.total_supply,
-            'virtual_price': pool_data.virtual_price,
-            'volume_24h': pool_data.volume_24h,
-            'fees_24h': pool_data.fees_24h,
-            'apy': pool_data.apy
-        }
-        
-        # 代币余额和汇率
-        for i, (token, balance, rate) in enumerate(zip(pool_data.tokens, pool_data.balances, pool_data.rates)):
-            row[f'{token.lower()}_balance'] = balance
-            row[f'{token.lower()}_rate'] = rate
-        
-        # 计算额外指标
-        if len(pool_data.balances) >= 3:  # 3Pool等
-            total_balance = sum(pool_data.balances)
-            for i, (token, balance) in enumerate(zip(pool_data.tokens, pool_data.balances)):
-                row[f'{token.lower()}_ratio'] = balance / total_balance if total_balance > 0 else 0
-            
-            # 不平衡度计算
-            ideal_ratio = 1.0 / len(pool_data.balances)
-            deviations = [abs(balance/total_balance - ideal_ratio) for balance in pool_data.balances]
-            row['max_imbalance'] = max(deviations) if deviations else 0
+        """将CurvePoolData转换为单行DataFrame (余额/汇率、≥3个代币时的占比和不平衡度)"""
         
-        return pd.DataFrame([row])
+        return PoolSnapshotBatch.from_pool_data([pool_data]).to_dataframe()
 
 def demo_csv_export():
     """演示CSV导出功能"""
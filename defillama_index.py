@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+DefiLlama收益池索引
+一次下载 yields.llama.fi/pools 全量列表，建立 Curve池子地址 → DefiLlama池子id (UUID) 的映射
+TTL内的APY/TVL查询均为字典命中，历史数据按池子id查询
+"""
+
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+import requests
+
+from curve_registry import get_curve_registry
+from http_session import http_get
+
+# 索引配置
+DEFILLAMA_BASE = "https://yields.llama.fi"
+DEFILLAMA_POOLS_URL = f"{DEFILLAMA_BASE}/pools"
+DEFILLAMA_TTL_SECONDS = 1800    # DefiLlama收益数据约每小时更新
+DEFILLAMA_TIMEOUT = 20          # 全量列表较大
+DEFILLAMA_VERIFY_SSL = False
+DEFILLAMA_PROJECT = 'curve-dex'
+DEFILLAMA_CHAIN = 'Ethereum'
+
+
+def _token_key(addresses: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(address.lower() for address in addresses if address)
+
+
+class DefiLlamaIndex:
+    """DefiLlama池子索引 - 按池子id、旧式地址id和Curve池子代币组合查询"""
+
+    def __init__(self, url: str = DEFILLAMA_POOLS_URL, ttl: float = DEFILLAMA_TTL_SECONDS):
+        self.url = url
+        self.ttl = ttl
+
+        self._by_id: Dict[str, Dict] = {}
+        self._by_address: Dict[str, Dict] = {}
+        self._by_tokens: Dict[FrozenSet[str], Dict] = {}
+        self._resolved: Dict[str, str] = {}   # Curve池子地址 → DefiLlama池子id
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def ensure_fresh(self, fetch: Optional[Callable[[str], Optional[requests.Response]]] = None) -> bool:
+        """索引过期时刷新，返回是否有可用索引"""
+
+        if self.is_fresh():
+            return True
+
+        with self._lock:
+            if self.is_fresh():
+                return True
+            return self._refresh(fetch)
+
+    def _refresh(self, fetch: Optional[Callable[[str], Optional[requests.Response]]] = None) -> bool:
+        try:
+            if fetch is not None:
+                response = fetch(self.url)
+            else:
+                response = http_get(self.url, timeout=DEFILLAMA_TIMEOUT, verify=DEFILLAMA_VERIFY_SSL)
+
+            if response is None or response.status_code != 200:
+                print(f"❌ 无法获取DefiLlama池子列表")
+                return bool(self._by_id)
+
+            self.load(response.json())
+            return True
+
+        except Exception as e:
+            print(f"❌ DefiLlama索引刷新失败: {str(e)[:100]}...")
+            # 刷新失败时继续使用旧索引 (如果有)
+            return bool(self._by_id)
+
+    def load(self, payload: Dict) -> int:
+        """载入 /pools 响应并重建索引，返回池子数量"""
+
+        if 'data' not in payload:
+            raise KeyError('data')
+
+        by_id = {}
+        by_address = {}
+        by_tokens = {}
+
+        for pool in payload['data']:
+            pool_id = str(pool.get('pool', '')).lower()
+            if not pool_id:
+                continue
+            by_id[pool_id] = pool
+
+            # 旧式id为 "{地址}-{链}"
+            if pool_id.startswith('0x'):
+                by_address.setdefault(pool_id.split('-', 1)[0], pool)
+
+            # Curve池子按代币组合索引，同一组合取TVL最高者
+            if pool.get('project') == DEFILLAMA_PROJECT and pool.get('chain') == DEFILLAMA_CHAIN:
+                key = _token_key(pool.get('underlyingTokens') or [])
+                if key:
+                    current = by_tokens.get(key)
+                    if current is None or (pool.get('tvlUsd') or 0) > (current.get('tvlUsd') or 0):
+                        by_tokens[key] = pool
+
+        self._by_id = by_id
+        self._by_address = by_address
+        self._by_tokens = by_tokens
+        self._resolved = {}
+        self._fetched_at = time.monotonic()
+
+        return len(by_id)
+
+    def invalidate(self):
+        self._fetched_at = None
+
+    def pools(self) -> List[Dict]:
+        """索引中的所有池子"""
+        return list(self._by_id.values())
+
+    def _candidate_token_sets(self, pool_address: str, coins: Optional[List[str]]) -> List[FrozenSet[str]]:
+        """池子的代币组合: 调用方提供的coins，或Curve注册表快照中的coins/underlyingCoins (不触发下载)"""
+
+        if coins:
+            return [_token_key(coins)]
+
+        registry_pool = get_curve_registry().get_by_address(pool_address)
+        if registry_pool is None:
+            return []
+
+        return [
+            _token_key(coin.get('address', '') for coin in registry_pool.get(field, []))
+            for field in ('coins', 'underlyingCoins')
+            if registry_pool.get(field)
+        ]
+
+    def find(self, pool_address: str, coins: Optional[List[str]] = None) -> Optional[Dict]:
+        """按Curve池子地址查询DefiLlama池子条目"""
+
+        address = pool_address.lower()
+
+        if address in self._resolved:
+            return self._by_id.get(self._resolved[address])
+
+        pool = self._by_address.get(address)
+        if pool is None:
+            for key in self._candidate_token_sets(address, coins):
+                pool = self._by_tokens.get(key)
+                if pool is not None:
+                    break
+
+        # 只缓存命中结果 (注册表快照稍后载入时可再次匹配)
+        if pool is not None:
+            self._resolved[address] = str(pool['pool']).lower()
+        return pool
+
+    def pool_id(self, pool_address: str, coins: Optional[List[str]] = None) -> Optional[str]:
+        pool = self.find(pool_address, coins)
+        return pool['pool'] if pool else None
+
+    def apy(self, pool_address: str, coins: Optional[List[str]] = None) -> Optional[float]:
+        """当前APY (小数)"""
+
+        pool = self.find(pool_address, coins)
+        if pool is None or pool.get('apy') is None:
+            return None
+        return pool['apy'] / 100
+
+    def tvl(self, pool_address: str, coins: Optional[List[str]] = None) -> Optional[float]:
+        pool = self.find(pool_address, coins)
+        return pool.get('tvlUsd') if pool else None
+
+
+_shared_index: Optional[DefiLlamaIndex] = None
+_shared_index_lock = threading.Lock()
+
+
+def get_defillama_index() -> DefiLlamaIndex:
+    """获取进程内共享的DefiLlama索引"""
+
+    global _shared_index
+
+    if _shared_index is None:
+        with _shared_index_lock:
+            if _shared_index is None:
+                _shared_index = DefiLlamaIndex()
+
+    return _shared_index
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+池子事件日志采集
+通过 eth_getLogs 拉取 TokenExchange / TokenExchangeUnderlying / AddLiquidity / RemoveLiquidity 事件，
+计算真实的交易量和手续费 (链上读取路径的 volume_24h / fees_24h 不再为0)
+- 区块范围自适应分块: 节点返回"结果过多"时减半，结果较少时加倍
+- 每个池子一个检查点，增量采集，只扫描新区块
+- 一个分块的日志按事件类型批量解码为NumPy列数组，按小时聚合后合并进历史缓存 ({pool}_event_volume)
+滚动24小时交易量/手续费由小时聚合计算，不需要重新扫描日志
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+from cache_store import HistoricalCacheStore
+from curve_registry import get_curve_registry
+from historical_backfill import BlockTimestampIndex
+from onchain_reader import OnchainPoolReader, SELECTORS, decode_uint, encode_call
+from rpc_cache import RPC_CACHE_CONFIRMATIONS
+from token_metadata import TokenMetadataCache, get_token_metadata_cache
+
+# 采集配置
+EVENT_LOG_DAYS = 7                  # 没有检查点时采集最近多少天
+EVENT_LOG_CHUNK_BLOCKS = 2000       # 初始分块大小 (区块数)
+EVENT_LOG_MIN_CHUNK = 1
+EVENT_LOG_MAX_CHUNK = 20000
+EVENT_LOG_GROW_BELOW = 1000         # 分块日志数少于此值时下一块加倍
+EVENT_LOG_FLUSH_EVERY = 16          # 每处理多少个分块写一次缓存和检查点
+EVENT_LOG_CONFIRMATIONS = RPC_CACHE_CONFIRMATIONS   # 只采集已确认的区块，避免链重组导致重复计数
+EVENT_LOG_MAX_LAG_HOURS = 2         # 采集进度落后超过此值时不提供24小时交易量
+EVENT_LOG_SOURCE = 'event_logs'
+EVENT_LOG_CHECKPOINT_DIR = 'event_checkpoints'
+
+# 节点因结果过多/范围过大拒绝 eth_getLogs 时的错误信息 (各家节点措辞不同)
+RANGE_ERROR_MARKERS = (
+    'query returned more than',         # Infura
+    'response size exceeded',           # Alchemy
+    'log response size',
+    'block range is too',               # 'block range is too large' / 'too wide'
+    'exceed maximum block range',
+    'block range too large',
+    'eth_getlogs is limited to',        # QuickNode
+    'too many results', 'too many logs',
+    'limit exceeded', '-32005',
+    'timeout', 'timed out',
+)
+
+# 事件类型
+EXCHANGE = 0
+EXCHANGE_UNDERLYING = 1
+ADD_LIQUIDITY = 2
+REMOVE_LIQUIDITY = 3
+
+# 事件主题 (keccak256(signature)) → (事件类型, 固定数组长度，0为动态数组 (StableSwap-NG))
+EVENT_TOPICS = {
+    # TokenExchange(address,int128,uint256,int128,uint256)
+    '0x8b3e96f2b889fa771c53c981b40daf005f63f637f1869f707052d15a3dd97140': (EXCHANGE, 0),
+    # TokenExchange(address,uint256,uint256,uint256,uint256)  加密货币池
+    '0xb2e76ae99761dc136e598d4a629bb347eccb9532a5f8bbd72e18467c3c34cc98': (EXCHANGE, 0),
+    # TokenExchangeUnderlying(address,int128,uint256,int128,uint256)
+    '0xd013ca23e77a65003c2c659c5442c00c805371b7fc1ebd4c206c41d1536bd90b': (EXCHANGE_UNDERLYING, 0),
+    # AddLiquidity(address,uint256[N],uint256[N],uint256,uint256)
+    '0x26f55a85081d24974e85c6c00045d0f0453991e95873f52bff0d21af4079a768': (ADD_LIQUIDITY, 2),
+    '0x423f6495a08fc652425cf4ed0d1f9e37e571d9b9529b1c1c23cce780b2e7df0d': (ADD_LIQUIDITY, 3),
+    '0x3f1915775e0c9a38a57a7bb7f1f9005f486fb904e1f84aa215364d567319a58d': (ADD_LIQUIDITY, 4),
+    '0x189c623b666b1b45b83d7178f39b8c087cb09774317ca2f53c2d3c3726f222a2': (ADD_LIQUIDITY, 0),
+    # RemoveLiquidity(address,uint256[N],uint256[N],uint256)
+    '0x7c363854ccf79623411f8995b362bce5eddff18c927edc6f5dbbb5e05819a82c': (REMOVE_LIQUIDITY, 2),
+    '0xa49d4cf02656aebf8c771f5a8585638a2a15ee6c97cf7205d4208ed7c1df252d': (REMOVE_LIQUIDITY, 3),
+    '0x9878ca375e106f2a43c3b599fc624568131c4c9a4ba66a14563715763be9d59d': (REMOVE_LIQUIDITY, 4),
+    '0x347ad828e58cbe534d8f6b67985d791360756b18f0d95fd9f197a66cc46480ea': (REMOVE_LIQUIDITY, 0),
+}
+
+FEE_DENOMINATOR = 10 ** 10          # Curve池 fee() 的精度
+
+
+def event_cache_key(pool_name: str) -> str:
+    return f"{pool_name}_event_volume"
+
+
+def _layout(kind: int, fixed: int, n_coins: int) -> Tuple[int, int, int]:
+    """事件data的布局 (字数, 数量数组起点, 手续费数组起点)，提供者地址为indexed参数不在data中"""
+
+    if kind in (EXCHANGE, EXCHANGE_UNDERLYING):
+        # sold_id, tokens_sold, bought_id, tokens_bought
+        return 4, 0, 0
+
+    # 固定数组: amounts[N], fees[N], (invariant,) token_supply
+    # 动态数组: 两个偏移, (invariant,) token_supply, N, amounts..., N, fees...
+    scalars = 2 if kind == ADD_LIQUIDITY else 1
+    if fixed:
+        return 2 * n_coins + scalars, 0, n_coins
+    head = 2 + scalars
+    return head + 2 + 2 * n_coins, head + 1, head + 2 + n_coins
+
+
+def _words_to_float(words: np.ndarray) -> np.ndarray:
+    """(..., 4) 的大端uint64字 → float64 (只取低128位，代币数量不会超过)"""
+    return words[..., 2].astype(np.float64) * 2.0 ** 64 + words[..., 3].astype(np.float64)
+
+
+def _is_range_error(error: Exception) -> bool:
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+@dataclass
+class PoolContext:
+    """解码一个池子事件所需的参数"""
+    name: str
+    address: str
+    n_coins: int
+    usd_scale: np.ndarray      # 每个代币: 价格USD / 10**decimals
+    fee_rate: float            # 交易手续费率 (如0.0001)
+
+
+@dataclass
+class EventBatch:
+    """一个池子一批事件的列数组 (按区块、日志序号排序)"""
+    block_number: np.ndarray
+    log_index: np.ndarray
+    kind: np.ndarray
+    volume_usd: np.ndarray
+    fee_usd: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.block_number)
+
+    @classmethod
+    def concat(cls, batches: List['EventBatch']) -> 'EventBatch':
+        merged = cls(*(np.concatenate([getattr(batch, column) for batch in batches]) if batches
+                       else np.empty(0) for column in ('block_number', 'log_index', 'kind',
+                                                       'volume_usd', 'fee_usd')))
+        order = np.lexsort((merged.log_index, merged.block_number))
+        return cls(merged.block_number[order], merged.log_index[order], merged.kind[order],
+                   merged.volume_usd[order], merged.fee_usd[order])
+
+
+def decode_logs(logs: List[Dict], context: PoolContext) -> EventBatch:
+    """把一个池子的原始日志按事件类型批量解码为列数组"""
+
+    groups: Dict[str, List[Dict]] = {}
+    for log in logs:
+        if log.get('topics') and log['topics'][0] in EVENT_TOPICS and not log.get('removed'):
+            groups.setdefault(log['topics'][0], []).append(log)
+
+    batches = []
+    for topic, group in groups.items():
+        kind, fixed = EVENT_TOPICS[topic]
+        if fixed and fixed != context.n_coins:
+            continue
+
+        width, _, fees_at = _layout(kind, fixed, context.n_coins)
+        payloads = [bytes.fromhex(log['data'][2:]) for log in group]
+        keep = [i for i, payload in enumerate(payloads) if len(payload) >= 32 * width]
+        if not keep:
+            continue
+
+        # (事件数, 字数, 4) 的大端uint64数组，每个32字节字拆为4个64位
+        buffer = b''.join(payloads[i][:32 * width] for i in keep)
+        words = np.frombuffer(buffer, dtype='>u8').reshape(len(keep), width, 4)
+        blocks = np.array([int(group[i]['blockNumber'], 16) for i in keep], dtype=np.int64)
+        log_indexes = np.array([int(group[i]['logIndex'], 16) for i in keep], dtype=np.int64)
+
+        if kind in (EXCHANGE, EXCHANGE_UNDERLYING):
+            volume = _exchange_volume(kind, words, context)
+            fee = volume * context.fee_rate
+        else:
+            # 流动性事件不计入交易量，不平衡添加/移除收取的手续费按代币计
+            n = context.n_coins
+            fee = (_words_to_float(words[:, fees_at:fees_at + n]) * context.usd_scale).sum(axis=1)
+            volume = np.zeros(len(keep))
+
+        batches.append(EventBatch(blocks, log_indexes, np.full(len(keep), kind, dtype=np.int8), volume, fee))
+
+    return EventBatch.concat(batches)
+
+
+def _exchange_volume(kind: int, words: np.ndarray, context: PoolContext) -> np.ndarray:
+    """交易量USD (按卖出代币计)"""
+
+    sold_id = words[:, 0, 3].astype(np.int64)
+    bought_id = words[:, 2, 3].astype(np.int64)
+    sold = _words_to_float(words[:, 1])
+    bought = _words_to_float(words[:, 3])
+    n = context.n_coins
+
+    if kind == EXCHANGE:
+        valid = sold_id < n
+        return np.where(valid, sold * context.usd_scale[np.minimum(sold_id, n - 1)], 0.0)
+
+    # 底层代币交易 (metapool): 索引0为池子自己的代币，其余为基础池代币 (精度未知)
+    # 有一边是索引0时按该边计，两边都是基础池代币时不计交易量
+    return np.where(sold_id == 0, sold * context.usd_scale[0],
+                    np.where(bought_id == 0, bought * context.usd_scale[0], 0.0))
+
+
+def hourly_aggregate(batch: EventBatch, timestamps: np.ndarray) -> pd.DataFrame:
+    """按小时聚合: 交易量、手续费、交易笔数、流动性事件数"""
+
+    hours = timestamps // 3600 * 3600
+    unique_hours, inverse = np.unique(hours, return_inverse=True)
+    is_trade = batch.kind <= EXCHANGE_UNDERLYING
+
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime([datetime.fromtimestamp(hour) for hour in unique_hours.tolist()]),
+        'volume_usd': np.bincount(inverse, weights=batch.volume_usd, minlength=len(unique_hours)),
+        'fees_usd': np.bincount(inverse, weights=batch.fee_usd, minlength=len(unique_hours)),
+        'trades': np.bincount(inverse, weights=is_trade, minlength=len(unique_hours)).astype(np.int64),
+        'liquidity_events': np.bincount(inverse, weights=~is_trade, minlength=len(unique_hours)).astype(np.int64),
+    })
+
+
+class EventLogIngestion:
+    """增量事件日志采集 (所有池子共用一次 eth_getLogs，每个池子单独检查点)"""
+
+    def __init__(self, reader: OnchainPoolReader, store: HistoricalCacheStore,
+                 token_metadata: Optional[TokenMetadataCache] = None):
+        self.reader = reader
+        self.store = store
+        self.token_metadata = token_metadata or get_token_metadata_cache()
+        self.registry = get_curve_registry()
+        self.blocks = BlockTimestampIndex(reader)
+
+        self.checkpoint_dir = Path(store.cache_dir) / EVENT_LOG_CHECKPOINT_DIR
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---------- 检查点 ----------
+
+    def load_checkpoint(self, pool_name: str, pool_address: str) -> Dict:
+        return load_event_checkpoint(self.store, pool_name, pool_address)
+
+    def _save_checkpoint(self, pool_name: str, pool_address: str, last_block: int,
+                         last_timestamp: int, chunk_size: int):
+        path = self.checkpoint_dir / f"{pool_name}.json"
+        tmp_path = path.with_name(path.name + f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'pool': pool_name,
+                'address': pool_address,
+                'last_block': last_block,
+                'last_timestamp': last_timestamp,
+                'chunk_size': chunk_size,
+                'updated_at': datetime.now().isoformat(),
+            }, f)
+        os.replace(tmp_path, path)
+
+    # ---------- 池子参数 ----------
+
+    def _pool_contexts(self, pools: Dict[str, str], block: int,
+                       prices: Optional[Dict[str, float]]) -> Dict[str, PoolContext]:
+        """读取代币、精度和手续费率 (一次Multicall)，代币价格缺失时按1美元计"""
+
+        states = self.reader.read_pools(list(pools.values()), hex(block))
+        fee_results = self.reader.aggregate(
+            [(address, encode_call(SELECTORS['fee'])) for address in pools.values()], hex(block)
+        )
+        coins = [coin for state in states.values() for coin in state.coins]
+        metadata = self.token_metadata.resolve(coins, self.registry, self.reader) if coins else {}
+
+        if prices is None:
+            from price_oracle import get_price_oracle
+            symbols = {metadata[coin].symbol for coin in coins if coin in metadata}
+            prices = get_price_oracle().get_prices(symbols)
+
+        contexts = {}
+        for (name, address), (success, fee_data) in zip(pools.items(), fee_results):
+            state = states[address]
+            if not state.coins:
+                print(f"⚠️  {name}: 无法读取池子代币 (非Curve池)，跳过")
+                continue
+
+            scale = []
+            for coin in state.coins:
+                token = metadata.get(coin)
+                decimals = token.decimals if token else 18
+                price = prices.get(token.symbol) if token else None
+                if price is None:
+                    print(f"⚠️  {name}: {token.symbol if token else coin} 没有价格，按1美元计")
+                    price = 1.0
+                scale.append(price / 10 ** decimals)
+
+            fee = decode_uint(fee_data) if success else None
+            contexts[name] = PoolContext(name, address, state.n_coins, np.array(scale),
+                                         (fee or 0) / FEE_DENOMINATOR)
+
+        return contexts
+
+    # ---------- 采集 ----------
+
+    def _get_logs(self, addresses: List[str], from_block: int, to_block: int) -> List[Dict]:
+        return self.reader._rpc('eth_getLogs', [{
+            'address': addresses,
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+            'topics': [list(EVENT_TOPICS)],
+        }])
+
+    def _log_timestamps(self, logs: List[Dict], from_block: int, to_block: int) -> Dict[int, int]:
+        """日志所在区块的时间戳: 节点返回blockTimestamp时直接使用，否则在分块两端之间插值"""
+
+        blocks = np.array(sorted({int(log['blockNumber'], 16) for log in logs}), dtype=np.int64)
+        if all('blockTimestamp' in log for log in logs):
+            return {int(log['blockNumber'], 16): int(log['blockTimestamp'], 16) for log in logs}
+
+        known = [from_block, to_block]
+        interpolated = np.interp(blocks, known, [self.blocks.timestamp(block) for block in known])
+        return dict(zip(blocks.tolist(), interpolated.astype(np.int64).tolist()))
+
+    def ingest(self, pools: Dict[str, str], days: int = EVENT_LOG_DAYS,
+               prices: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+        """
+        采集多个池子 {名称: 地址} 的新事件，返回 {名称: 新事件数}
+        有检查点时从检查点继续，否则从days天前开始；prices为 {symbol: USD}，默认使用价格预言机
+        """
+
+        head = self.blocks.head() - EVENT_LOG_CONFIRMATIONS
+        checkpoints = {name: self.load_checkpoint(name, address) for name, address in pools.items()}
+
+        window_start = None
+        starts = {}
+        for name, checkpoint in checkpoints.items():
+            if 'last_block' in checkpoint:
+                starts[name] = checkpoint['last_block'] + 1
+            else:
+                if window_start is None:
+                    start_time = datetime.fromtimestamp(self.blocks.timestamp(head)) - timedelta(days=days)
+                    window_start = self.blocks.block_at(start_time.timestamp(), head)
+                starts[name] = window_start
+
+        pending_pools = {name: address for name, address in pools.items() if starts[name] <= head}
+        if not pending_pools:
+            print(f"✅ 事件日志已是最新 (区块 {head})")
+            return {name: 0 for name in pools}
+
+        contexts = self._pool_contexts(pending_pools, head, prices)
+        chunk = min((checkpoints[name].get('chunk_size', EVENT_LOG_CHUNK_BLOCKS) for name in contexts),
+                    default=EVENT_LOG_CHUNK_BLOCKS)
+        from_block = min(starts[name] for name in contexts) if contexts else head + 1
+
+        print(f"📜 采集 {len(contexts)} 个池子的事件日志: 区块 {from_block} → {head}")
+
+        counts = {name: 0 for name in pools}
+        pending: Dict[str, List[pd.DataFrame]] = {name: [] for name in contexts}
+        progress: Dict[str, Tuple[int, int]] = {}
+        chunks_since_flush = 0
+        ceiling = EVENT_LOG_MAX_CHUNK     # 本次运行中出现过范围错误后，分块不再增长到失败的大小
+        start_time = time.perf_counter()
+
+        try:
+            while from_block <= head:
+                to_block = min(from_block + chunk - 1, head)
+                active = {name: context for name, context in contexts.items() if starts[name] <= to_block}
+
+                try:
+                    logs = self._get_logs([context.address for context in active.values()], from_block, to_block)
+                except Exception as e:
+                    if not _is_range_error(e) or chunk <= EVENT_LOG_MIN_CHUNK:
+                        raise
+                    chunk = max(EVENT_LOG_MIN_CHUNK, chunk // 2)
+                    ceiling = chunk
+                    print(f"   ✂️  区块范围过大，分块缩小为 {chunk}")
+                    continue
+
+                timestamps = self._log_timestamps(logs, from_block, to_block) if logs else {}
+                chunk_end_time = timestamps.get(to_block) or self.blocks.timestamp(to_block)
+
+                for name, context in active.items():
+                    address = context.address.lower()
+                    pool_logs = [log for log in logs if log['address'].lower() == address
+                                 and int(log['blockNumber'], 16) >= starts[name]]
+                    batch = decode_logs(pool_logs, context)
+                    if len(batch):
+                        block_times = np.array([timestamps[block] for block in batch.block_number.tolist()])
+                        pending[name].append(hourly_aggregate(batch, block_times))
+                        counts[name] += len(batch)
+                    progress[name] = (to_block, chunk_end_time)
+
+                from_block = to_block + 1
+                if len(logs) < EVENT_LOG_GROW_BELOW:
+                    chunk = min(ceiling, chunk * 2)
+
+                chunks_since_flush += 1
+                if chunks_since_flush >= EVENT_LOG_FLUSH_EVERY:
+                    self._flush(contexts, pending, progress, chunk)
+                    chunks_since_flush = 0
+                    print(f"   📦 区块 {to_block}, {sum(counts.values())} 个事件 "
+                          f"({time.perf_counter() - start_time:.1f}s)")
+        finally:
+            # 已完整处理的分块总是写入 (中断后从这里继续)
+            self._flush(contexts, pending, progress, chunk)
+
+        return counts
+
+    def _flush(self, contexts: Dict[str, PoolContext], pending: Dict[str, List[pd.DataFrame]],
+               progress: Dict[str, Tuple[int, int]], chunk: int):
+        """把小时聚合合并进历史缓存 (同一小时累加)，然后更新检查点"""
+
+        for name, (last_block, last_timestamp) in progress.items():
+            context = contexts[name]
+            if pending[name]:
+                self._merge_hourly(name, context.address, pd.concat(pending[name], ignore_index=True), last_block)
+                pending[name] = []
+            self._save_checkpoint(name, context.address, last_block, last_timestamp, chunk)
+        progress.clear()
+
+    def _merge_hourly(self, pool_name: str, pool_address: str, hourly: pd.DataFrame, last_block: int):
+        key = event_cache_key(pool_name)
+        hourly = hourly.assign(last_block=last_block)
+        if self.store.exists(key):
+            hourly = pd.concat([self.store.read(key), hourly], ignore_index=True)
+
+        merged = hourly.groupby('timestamp', as_index=False).agg({
+            'volume_usd': 'sum', 'fees_usd': 'sum', 'trades': 'sum',
+            'liquidity_events': 'sum', 'last_block': 'max',
+        })
+        merged['pool_address'] = pool_address
+        merged['pool_name'] = pool_name
+        merged['source'] = EVENT_LOG_SOURCE
+        self.store.write(key, merged.sort_values('timestamp').reset_index(drop=True))
+
+
+def load_event_checkpoint(store: HistoricalCacheStore, pool_name: str, pool_address: Optional[str] = None) -> Dict:
+    """
+    池子的采集检查点 (last_block, last_timestamp, chunk_size)，没有或地址不符时返回空字典
+    缓存中已合并的区块比检查点新时 (写入缓存后、保存检查点前中断) 以缓存为准，避免重复计数
+    """
+
+    path = Path(store.cache_dir) / EVENT_LOG_CHECKPOINT_DIR / f"{pool_name}.json"
+    if not path.exists():
+        return {}
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  检查点读取失败 {path.name}: {e}")
+        return {}
+
+    if pool_address is not None and checkpoint.get('address', '').lower() != pool_address.lower():
+        return {}
+
+    key = event_cache_key(pool_name)
+    if store.exists(key):
+        merged_block = store.read(key, columns=['last_block'])['last_block'].max()
+        if pd.notna(merged_block) and int(merged_block) > checkpoint.get('last_block', -1):
+            checkpoint['last_block'] = int(merged_block)
+    return checkpoint
+
+
+def rolling_volume(store: HistoricalCacheStore, pool_name: str, window: str = '24h') -> pd.DataFrame:
+    """由小时聚合计算滚动交易量/手续费 (每小时一行，没有事件的小时补0)"""
+
+    key = event_cache_key(pool_name)
+    if not store.exists(key):
+        return pd.DataFrame(columns=['timestamp', 'volume_24h', 'fees_24h'])
+
+    hourly = store.read(key).set_index('timestamp')[['volume_usd', 'fees_usd']]
+    hourly = hourly.reindex(pd.date_range(hourly.index.min(), hourly.index.max(), freq='1h'), fill_value=0.0)
+    rolling = hourly.rolling(window).sum()
+
+    return pd.DataFrame({
+        'timestamp': rolling.index,
+        'volume_24h': rolling['volume_usd'].to_numpy(),
+        'fees_24h': rolling['fees_usd'].to_numpy(),
+    })
+
+
+def event_volume_24h(store: HistoricalCacheStore, pool_name: str,
+                     now: Optional[datetime] = None) -> Optional[Tuple[float, float]]:
+    """
+    截至采集进度的最近24小时 (交易量USD, 手续费USD)
+    没有采集过或进度落后超过 EVENT_LOG_MAX_LAG_HOURS 时返回None
+    """
+
+    checkpoint = load_event_checkpoint(store, pool_name)
+    if not checkpoint.get('last_timestamp'):
+        return None
+
+    last_time = datetime.fromtimestamp(checkpoint['last_timestamp'])
+    if (now or datetime.now()) - last_time > timedelta(hours=EVENT_LOG_MAX_LAG_HOURS):
+        return None
+
+    # 小时桶的时间戳为整点，窗口起点所在的桶按窗口内的比例计入
+    start = last_time - timedelta(hours=24)
+    edge = start.replace(minute=0, second=0, microsecond=0)
+    window = store.read_range(event_cache_key(pool_name), start=edge)
+    if window.empty:
+        return 0.0, 0.0
+
+    edge_weight = 1.0 - (start - edge) / timedelta(hours=1)
+    weights = np.where(window['timestamp'] == edge, edge_weight, 1.0)
+    return float((window['volume_usd'] * weights).sum()), float((window['fees_usd'] * weights).sum())
+
+
+def main():
+    from config import Config
+    from free_historical_data import AVAILABLE_POOLS
+
+    parser = argparse.ArgumentParser(description='池子事件日志采集 (交易量/手续费)')
+    parser.add_argument('--pools', nargs='+', default=['3pool'], help='要采集的池子')
+    parser.add_argument('--days', type=int, default=EVENT_LOG_DAYS, help='首次采集的天数')
+    parser.add_argument('--cache-dir', default='free_historical_cache', help='历史缓存目录')
+    args = parser.parse_args()
+
+    rpc_url = Config.get_web3_provider_url()
+    if not rpc_url:
+        print("❌ 未配置Web3提供商 (设置 INFURA_API_KEY / ALCHEMY_API_KEY)")
+        return
+
+    unknown = [name for name in args.pools if name not in AVAILABLE_POOLS]
+    if unknown:
+        print(f"❌ 未知池子: {', '.join(unknown)}")
+        return
+
+    store = HistoricalCacheStore(args.cache_dir)
+    ingestion = EventLogIngestion(OnchainPoolReader(rpc_url), store)
+    counts = ingestion.ingest({name: AVAILABLE_POOLS[name]['address'] for name in args.pools}, args.days)
+
+    for name in args.pools:
+        latest = event_volume_24h(store, name)
+        summary = f"24h交易量 ${latest[0]:,.0f}, 手续费 ${latest[1]:,.0f}" if latest else "24h数据不完整"
+        print(f"✅ {name}: 新增 {counts[name]} 个事件, {summary}")
+
+
+if __name__ == "__main__":
+    main()
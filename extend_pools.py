@@ -4,9 +4,9 @@
 展示如何添加新的池子到系统中
 """
 
-import requests
 from typing import Dict, List, Optional
 from real_data_collector import CurveRealDataCollector
+from curve_registry import get_curve_registry
 
 class CurvePoolExpander:
     """Curve池子扩展器"""
@@ -20,14 +20,14 @@ class CurvePoolExpander:
         print(f"🔍 自动发现TVL超过${min_tvl_usd:,.0f}的热门池子...")
         
         try:
-            # 获取所有以太坊池子
-            response = requests.get(f"{self.curve_api_base}/api/getPools/ethereum/main", timeout=15)
+            # 获取所有以太坊池子 (共享注册表快照)
+            registry = get_curve_registry()
             
-            if response.status_code != 200:
-                print(f"❌ API请求失败: {response.status_code}")
+            if not registry.ensure_fresh():
+                print(f"❌ API请求失败")
                 return []
             
-            pools_data = response.json()['data']['poolData']
+            pools_data = registry.pools()
             
             # 筛选高TVL池子
             popular_pools = []
@@ -8,11 +8,20 @@ import requests
 import pandas as pd
 import numpy as np
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import json
+import math
+import zlib
 from pathlib import Path
 
+from cache_store import HistoricalCacheStore, PartitionedCollectionStore, normalize_frame
+from curve_registry import get_curve_registry
+from defillama_index import DEFILLAMA_BASE, get_defillama_index
+from http_session import http_get, http_post
+from rate_limiter import backoff_delay
+
 # ========================================
 # 🔧 配置參數 - 在這裡修改天數設置
 # ========================================
@@ -34,6 +43,7 @@ CURRENT_DAYS_SETTING =  FULL_YEAR_DAYS  # 🔥 暫時改為7天避免長時間
 ENABLE_THEGRAPH_API = False     # ❌ The Graph API已被移除，禁用
 ENABLE_CURVE_API = True         # ✅ Curve API (主要數據源)
 ENABLE_DEFILLAMA = True         # ✅ DefiLlama APY數據  
+ENABLE_ARCHIVE_BACKFILL = True  # ✅ 歸檔節點按區塊回填 (需配置Web3提供商)
 ENABLE_SELF_BUILT = True        # ✅ 自建數據庫 (作為最後備份)
 ENABLE_SSL_VERIFICATION = False # 🔧 禁用SSL驗證來避免證書錯誤
 
@@ -41,7 +51,10 @@ ENABLE_SSL_VERIFICATION = False # 🔧 禁用SSL驗證來避免證書錯誤
 MAX_COLLECTION_ATTEMPTS = 50   # 🔥 限制最大收集次數，避免無限循環
 COLLECTION_BATCH_SIZE = 10     # 每批次收集的數據點數量
 REQUEST_TIMEOUT = 5            # API請求超時時間 (秒)
-REQUEST_RETRY_DELAY = 2        # 請求失敗後重試延遲 (秒)
+REQUEST_RETRY_DELAY = 2        # 請求失敗後指數退避的基準延遲 (秒)
+SYNTHETIC_RANDOM_SEED = None   # 合成數據隨機種子 (None=每次不同，設為整數可重現)
+CACHE_COVERAGE_TOLERANCE_HOURS = 24  # 緩存覆蓋判斷容差 (小時)，在此範圍內視為已覆蓋
+FABRICATED_SOURCES = ('self_built', 'synthetic')  # 非真實數據來源，不寫入每日收集存儲
 
 # ========================================
 # 🎯 所有主要Curve池子配置 - 擴展版
@@ -397,10 +410,19 @@ def show_current_config():
 class FreeHistoricalDataManager:
     """免费历史數據管理器"""
     
-    def __init__(self, cache_dir: str = "free_historical_cache"):
+    def __init__(self, cache_dir: str = "free_historical_cache", seed: Optional[int] = SYNTHETIC_RANDOM_SEED):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         
+        # 合成數據隨機種子
+        self.seed = seed
+        
+        # 列式缓存存储
+        self.store = HistoricalCacheStore(self.cache_dir)
+        
+        # 每日收集的追加式分区存储
+        self.collection_store = PartitionedCollectionStore(self.cache_dir / "daily_collection")
+        
         # 免费數據源
         self.sources = {
             'thegraph': {
@@ -420,8 +442,25 @@ class FreeHistoricalDataManager:
             }
         }
         
+        # 最近一次批量獲取中每个池子的耗时 (秒)
+        self.last_batch_timings = {}
+        
+        # 歸檔節點回填引擎 (首次使用时创建) 和批量回填的暂存结果 {池子: (天数, DataFrame)}
+        self._archive_backfill = None
+        self._archive_prefetched = {}
+        
         print(f"📁 免费历史數據缓存目录: {self.cache_dir.absolute()}")
     
+    def _pool_rng(self, pool_name: str) -> np.random.Generator:
+        """
+        每个池子獨立的隨機數生成器
+        設置seed时按 (seed, 池子名) 派生，并行批量獲取时結果也可重現
+        """
+        
+        if self.seed is None:
+            return np.random.default_rng()
+        return np.random.default_rng([self.seed, zlib.crc32(pool_name.encode('utf-8'))])
+    
     def get_thegraph_historical_data(self, pool_address: str, days: int = CURRENT_DAYS_SETTING) -> pd.DataFrame:
         """
         方法1: 使用The Graph獲取历史數據 (已废弃)
@@ -463,7 +502,7 @@ class FreeHistoricalDataManager:
             # 配置SSL验证
             verify_ssl = ENABLE_SSL_VERIFICATION
             
-            response = requests.post(
+            response = http_post(
                 self.sources['thegraph']['url'],
                 json={'query': query},
                 timeout=REQUEST_TIMEOUT,
@@ -535,13 +574,24 @@ class FreeHistoricalDataManager:
         print(f"📈 [DefiLlama] 獲取APY历史數據...")
         
         try:
+            # DefiLlama历史按池子id (UUID) 查询，先从共享索引解析
+            index = get_defillama_index()
+            index.ensure_fresh()
+            pool_id = index.pool_id(pool_address)
+            if not pool_id and get_curve_registry().ensure_fresh():
+                # Curve池子按代币组合匹配，需要注册表快照中的coins
+                pool_id = index.pool_id(pool_address)
+            if not pool_id:
+                print(f"⚠️  [DefiLlama] 未找到池子 {pool_address[:10]}... 对应的池子id")
+                return pd.DataFrame()
+            
             # 獲取池子APY历史
-            url = f"https://yields.llama.fi/chart/{pool_address.lower()}"
+            url = f"{DEFILLAMA_BASE}/chart/{pool_id}"
             
             # 配置SSL验证和超时
             verify_ssl = ENABLE_SSL_VERIFICATION
             
-            response = requests.get(
+            response = http_get(
                 url, 
                 timeout=REQUEST_TIMEOUT,
                 verify=verify_ssl
@@ -575,10 +625,75 @@ class FreeHistoricalDataManager:
         
         return pd.DataFrame()
     
-    def build_historical_database(self, pool_name: str = TARGET_POOL, days_to_collect: int = CURRENT_DAYS_SETTING):
+    def _get_archive_backfill(self):
+        """歸檔節點回填引擎 (首次使用时创建)，未配置Web3提供商时返回None"""
+        
+        if self._archive_backfill is None:
+            from config import Config
+            
+            rpc_url = Config.get_web3_provider_url()
+            if not rpc_url:
+                print("⚠️  [歸檔節點] 未配置Web3提供商，跳过链上回填")
+                return None
+            
+            from historical_backfill import HistoricalBackfill
+            from onchain_reader import OnchainPoolReader
+            self._archive_backfill = HistoricalBackfill(OnchainPoolReader(rpc_url), self.store)
+        
+        return self._archive_backfill
+    
+    def prefetch_archive_history(self, pools: Dict[str, str], days: int = CURRENT_DAYS_SETTING):
+        """
+        一次回填多个池子 {名称: 地址} (每个采样區塊一次Multicall读取所有池子)
+        结果暂存，之后 get_archive_historical_data 直接切片使用，不再逐个池子回填
+        """
+        
+        if not ENABLE_ARCHIVE_BACKFILL or not pools or days <= 0:
+            return
+        
+        try:
+            engine = self._get_archive_backfill()
+            if engine is None:
+                return
+            for pool_name, df in engine.backfill(pools, days).items():
+                self._archive_prefetched[pool_name] = (days, df)
+        except Exception as e:
+            print(f"❌ [歸檔節點] 批量回填失败: {str(e)[:100]}...")
+    
+    def get_archive_historical_data(self, pool_address: str, pool_name: str,
+                                    days: int = CURRENT_DAYS_SETTING) -> pd.DataFrame:
+        """
+        方法2.5: 歸檔節點按區塊回填真实历史數據 (virtual_price / balances / totalSupply)
+        已回填的區塊保存在缓存和检查点中，重复运行只读取新的區塊
+        已通过 prefetch_archive_history 批量回填时直接使用其结果
+        """
+        
+        if not ENABLE_ARCHIVE_BACKFILL:
+            return pd.DataFrame()
+        
+        prefetched = self._archive_prefetched.pop(pool_name, None)
+        if prefetched is not None and prefetched[0] >= days:
+            df = prefetched[1]
+            if df.empty or 'timestamp' not in df.columns:
+                return df
+            return df[df['timestamp'] >= datetime.now() - timedelta(days=days)].reset_index(drop=True)
+        
+        try:
+            engine = self._get_archive_backfill()
+            if engine is None:
+                return pd.DataFrame()
+            return engine.backfill({pool_name: pool_address}, days)[pool_name]
+        
+        except Exception as e:
+            print(f"❌ [歸檔節點] 回填失败: {str(e)[:100]}...")
+            return pd.DataFrame()
+    
+    def build_historical_database(self, pool_name: str = TARGET_POOL, days_to_collect: int = CURRENT_DAYS_SETTING,
+                                  base_data=None):
         """
         方法3: 自建免费历史數據库 (优化版 - 避免无限循环)
         通过有限次数尝试獲取实时數據，然后生成合成历史數據
+        base_data: 已预取的实时數據 (CurvePoolData)，提供时跳过獲取步骤
         """
         
         if not ENABLE_SELF_BUILT:
@@ -591,74 +706,69 @@ class FreeHistoricalDataManager:
             from real_data_collector import CurveRealDataCollector
             from data_manager import CurveDataManager
             
-            collector = CurveRealDataCollector()
+            collector = CurveRealDataCollector(event_cache_dir=str(self.cache_dir))
             manager = CurveDataManager(str(self.cache_dir / "self_built"))
             
             # 🔥 限制尝试次数，避免无限循环
             max_attempts = min(MAX_COLLECTION_ATTEMPTS, days_to_collect)
-            successful_attempts = 0
-            base_data = None
             
-            print(f"🔄 尝试獲取基础數據 (最多 {max_attempts} 次)...")
-            
-            # 先尝试獲取一次有效的实时數據作为基准
-            for attempt in range(max_attempts):
-                try:
-                    pool_data = collector.get_real_time_data(pool_name)
-                    if pool_data:
-                        base_data = pool_data
-                        print(f"✅ 第 {attempt + 1} 次尝试成功獲取基础數據")
-                        break
-                    
-                    if attempt % 10 == 0 and attempt > 0:
-                        print(f"⚠️  已尝试 {attempt + 1} 次，继续重试...")
-                    
-                    time.sleep(REQUEST_RETRY_DELAY)  # 避免请求过于频繁
-                    
-                except Exception as e:
-                    if attempt % 10 == 0:
-                        print(f"⚠️  第 {attempt + 1} 次尝试失败: {str(e)[:50]}...")
-                    continue
+            if base_data is not None:
+                print(f"✅ 使用预取的基础數據")
+            else:
+                print(f"🔄 尝试獲取基础數據 (最多 {max_attempts} 次)...")
+                
+                # 先尝试獲取一次有效的实时數據作为基准
+                for attempt in range(max_attempts):
+                    try:
+                        pool_data = collector.get_real_time_data(pool_name)
+                        if pool_data:
+                            base_data = pool_data
+                            print(f"✅ 第 {attempt + 1} 次尝试成功獲取基础數據")
+                            break
+                        
+                        if attempt % 10 == 0 and attempt > 0:
+                            print(f"⚠️  已尝试 {attempt + 1} 次，继续重试...")
+                        
+                        time.sleep(backoff_delay(attempt, base=REQUEST_RETRY_DELAY))  # 带抖动的指数退避
+                        
+                    except Exception as e:
+                        if attempt % 10 == 0:
+                            print(f"⚠️  第 {attempt + 1} 次尝试失败: {str(e)[:50]}...")
+                        continue
             
             # 如果无法獲取真实數據，生成合成數據
             if not base_data:
                 print("⚠️  无法獲取真实數據，生成合成历史數據...")
                 return self._generate_synthetic_data(pool_name, days_to_collect)
             
-            # 基于真实數據生成历史數據
+            # 基于真实數據生成历史數據 (整列批量生成)
             print(f"📊 基于真实數據生成 {days_to_collect} 天历史數據...")
-            simulated_records = []
             
-            for day in range(days_to_collect):
-                # 每天生成几个數據点而不是每小时
-                points_per_day = 4  # 每6小时一个數據点
-                
-                for point in range(points_per_day):
-                    hour_offset = day * 24 + point * 6
-                    
-                    # 为每个时间点添加随机波动
-                    noise_factor = 0.02  # 2%的随机波动
-                    
-                    record = {
-                        'timestamp': datetime.now() - timedelta(hours=hour_offset),
-                        'pool_address': base_data.pool_address,
-                        'pool_name': base_data.pool_name,
-                        'virtual_price': base_data.virtual_price * (1 + np.random.normal(0, noise_factor)),
-                        'volume_24h': base_data.volume_24h * (1 + np.random.normal(0, noise_factor * 2)),
-                        'apy': max(0, base_data.apy * (1 + np.random.normal(0, noise_factor))),
-                        'total_supply': base_data.total_supply * (1 + np.random.normal(0, noise_factor * 0.5))
-                    }
-                    
-                    # 添加代币余额
-                    for i, (token, balance) in enumerate(zip(base_data.tokens, base_data.balances)):
-                        record[f'{token.lower()}_balance'] = balance * (1 + np.random.normal(0, noise_factor))
-                    
-                    simulated_records.append(record)
-                
-                # 顯示进度
-                if day % max(1, days_to_collect // 10) == 0:
-                    progress = (day / days_to_collect) * 100
-                    print(f"📈 生成进度: {progress:.0f}% ({day}/{days_to_collect} 天)")
+            points_per_day = 4   # 每6小时一个數據点
+            noise_factor = 0.02  # 2%的随机波动
+            n_points = days_to_collect * points_per_day
+            rng = self._pool_rng(pool_name)
+            
+            # 第k个點距现在 k*6 小时 (与逐日逐點循环的 day*24 + point*6 一致)
+            hour_offsets = np.arange(n_points) * (24 // points_per_day)
+            timestamps = pd.Timestamp(datetime.now()) - pd.to_timedelta(hour_offsets, unit='h')
+            
+            columns = {
+                'timestamp': timestamps,
+                'pool_address': base_data.pool_address,
+                'pool_name': base_data.pool_name,
+                'virtual_price': base_data.virtual_price * (1 + rng.normal(0, noise_factor, n_points)),
+                'volume_24h': base_data.volume_24h * (1 + rng.normal(0, noise_factor * 2, n_points)),
+                'apy': np.maximum(0, base_data.apy * (1 + rng.normal(0, noise_factor, n_points))),
+                'total_supply': base_data.total_supply * (1 + rng.normal(0, noise_factor * 0.5, n_points))
+            }
+            
+            # 添加代币余额
+            balance_noise = 1 + rng.normal(0, noise_factor, (n_points, len(base_data.balances)))
+            for i, (token, balance) in enumerate(zip(base_data.tokens, base_data.balances)):
+                columns[f'{token.lower()}_balance'] = balance * balance_noise[:, i]
+            
+            df = pd.DataFrame(columns)
         
         except ImportError as e:
             print(f"❌ 导入依赖失败: {e}")
@@ -669,13 +779,9 @@ class FreeHistoricalDataManager:
             print("💡 fallback到合成數據...")
             return self._generate_synthetic_data(pool_name, days_to_collect)
         
-        if simulated_records:
-            df = pd.DataFrame(simulated_records)
-            
+        if not df.empty:
             # 保存自建历史數據
-            filename = f"{pool_name}_self_built_historical_{days_to_collect}d.csv"
-            filepath = self.cache_dir / filename
-            df.to_csv(filepath, index=False, encoding='utf-8')
+            filepath = self.store.write(f"{pool_name}_self_built_historical_{days_to_collect}d", df)
             
             print(f"✅ 自建历史數據库完成: {filepath}")
             print(f"📊 总计 {len(df)} 条记录，时间跨度 {days_to_collect} 天")
@@ -723,48 +829,48 @@ class FreeHistoricalDataManager:
         dates = pd.date_range(
             end=datetime.now(),
             periods=days * 6,  # 每天6个數據点
-            freq='4H'  # 每4小时一个点
+            freq='4h'  # 每4小时一个点
         )
+        n_points = len(dates)
+        rng = self._pool_rng(pool_name)
+        
+        # 添加一些趋势和随机性 (整列批量生成)
+        trend_factor = 1 + 0.1 * np.sin(np.arange(n_points) / (days * 0.5))  # 长期趋势
+        noise_factor = rng.normal(1, 0.02, n_points)  # 随机波动
+        
+        columns = {
+            'timestamp': dates,
+            'pool_address': AVAILABLE_POOLS[pool_name]['address'],
+            'pool_name': AVAILABLE_POOLS[pool_name]['name'],
+            'virtual_price': 1.0 * trend_factor * noise_factor,
+            'volume_24h': config['base_volume'] * trend_factor * noise_factor,
+            'apy': np.maximum(0, config['base_apy'] * trend_factor * noise_factor),
+            'total_supply': config['base_balance'] * 3 * trend_factor
+        }
         
-        records = []
-        for i, timestamp in enumerate(dates):
-            # 添加一些趋势和随机性
-            trend_factor = 1 + 0.1 * np.sin(i / (days * 0.5))  # 长期趋势
-            noise_factor = np.random.normal(1, 0.02)  # 随机波动
-            
-            record = {
-                'timestamp': timestamp,
-                'pool_address': AVAILABLE_POOLS[pool_name]['address'],
-                'pool_name': AVAILABLE_POOLS[pool_name]['name'],
-                'virtual_price': 1.0 * trend_factor * noise_factor,
-                'volume_24h': config['base_volume'] * trend_factor * noise_factor,
-                'apy': max(0, config['base_apy'] * trend_factor * noise_factor),
-                'total_supply': config['base_balance'] * 3 * trend_factor
-            }
-            
-            # 添加代币余额
-            for j, token in enumerate(config['tokens']):
-                balance_variation = np.random.normal(1, 0.05)
-                record[f'{token.lower()}_balance'] = config['base_balance'] * balance_variation
-            
-            records.append(record)
+        # 添加代币余额
+        balance_variation = rng.normal(1, 0.05, (n_points, len(config['tokens'])))
+        for j, token in enumerate(config['tokens']):
+            columns[f'{token.lower()}_balance'] = config['base_balance'] * balance_variation[:, j]
         
-        df = pd.DataFrame(records)
+        df = pd.DataFrame(columns)
         
         # 保存合成數據
-        filename = f"{pool_name}_synthetic_historical_{days}d.csv"  
-        filepath = self.cache_dir / filename
-        df.to_csv(filepath, index=False, encoding='utf-8')
+        filepath = self.store.write(f"{pool_name}_synthetic_historical_{days}d", df)
         
         print(f"✅ 合成數據生成完成: {filepath}")
         print(f"📊 生成了 {len(df)} 条合成记录")
         
         return df
     
-    def get_comprehensive_free_data(self, pool_address: str = TARGET_POOL_ADDRESS, pool_name: str = TARGET_POOL, days: int = CURRENT_DAYS_SETTING) -> pd.DataFrame:
+    def get_comprehensive_free_data(self, pool_address: str = TARGET_POOL_ADDRESS, pool_name: str = TARGET_POOL, days: int = CURRENT_DAYS_SETTING,
+                                    base_data=None, save: bool = True, allow_self_built: bool = True) -> pd.DataFrame:
         """
         方法4: 综合免费數據策略 (优化版)
         结合多个免费源獲取最完整的历史數據，包含fallback机制
+        base_data: 已预取的实时數據，传给自建數據库
+        save: 是否写入 {pool}_comprehensive_free_historical_{days}d 缓存文件
+        allow_self_built: 真实數據不足时是否用自建 (合成) 數據补充
         """
         
         print(f"🔄 综合免费策略獲取 {pool_name} 历史數據 ({days} 天)...")
@@ -800,16 +906,24 @@ class FreeHistoricalDataManager:
                 print(f"⚠️  DefiLlama尝试失败: {str(e)[:50]}...")
                 data_sources_tried.append('DefiLlama (失败)')
         
-        # 3. 檢查是否需要自建數據库补充
+        # 3. 尝试歸檔節點回填 (真实链上序列)
+        if ENABLE_ARCHIVE_BACKFILL:
+            archive_data = self.get_archive_historical_data(pool_address, pool_name, days)
+            if not archive_data.empty:
+                all_data.append(archive_data)
+                print(f"✅ 歸檔節點: {len(archive_data)} 条记录")
+                data_sources_tried.append('歸檔節點')
+        
+        # 4. 檢查是否需要自建數據库补充
         total_records = sum(len(df) for df in all_data) if all_data else 0
         min_required_records = max(days // 10, 5)  # 至少需要的记录数
         
-        if total_records < min_required_records:
+        if total_records < min_required_records and allow_self_built:
             print(f"📊 免费API數據不足 ({total_records} < {min_required_records})，启用自建历史數據库...")
             
             if ENABLE_SELF_BUILT:
                 try:
-                    self_built_data = self.build_historical_database(pool_name, days)
+                    self_built_data = self.build_historical_database(pool_name, days, base_data=base_data)
                     if not self_built_data.empty:
                         self_built_data['source'] = 'self_built'
                         all_data.append(self_built_data)
@@ -821,7 +935,7 @@ class FreeHistoricalDataManager:
             else:
                 print("⚠️  自建數據库已禁用")
         
-        # 4. 合并所有數據源
+        # 5. 合并所有數據源
         if all_data:
             try:
                 # 按时间戳合并數據
@@ -842,13 +956,12 @@ class FreeHistoricalDataManager:
                 if len(combined_df) > 1:
                     combined_df = combined_df.drop_duplicates(subset=['timestamp'], keep='last')
                 
-                # 保存综合數據
-                filename = f"{pool_name}_comprehensive_free_historical_{days}d.csv"
-                filepath = self.cache_dir / filename
-                combined_df.to_csv(filepath, index=False, encoding='utf-8')
-                
                 print(f"🎉 综合免费历史數據獲取完成!")
-                print(f"📁 保存位置: {filepath}")
+                
+                # 保存综合數據
+                if save:
+                    filepath = self.store.write(f"{pool_name}_comprehensive_free_historical_{days}d", combined_df)
+                    print(f"📁 保存位置: {filepath}")
                 print(f"📊 总记录数: {len(combined_df)}")
                 print(f"🔄 數據来源: {', '.join([df['source'].iloc[0] for df in all_data if 'source' in df.columns and len(df) > 0])}")
                 
@@ -884,28 +997,21 @@ class FreeHistoricalDataManager:
 import sys
 sys.path.append('/path/to/your/Quantum_curve_predict')
 
-from free_historical_data import FreeHistoricalDataManager
+from free_historical_data import FreeHistoricalDataManager, AVAILABLE_POOLS
 from datetime import datetime
 
 def daily_collect():
     manager = FreeHistoricalDataManager()
+    pool_info = AVAILABLE_POOLS['{pool_name}']
     
-    # 獲取今日數據
-    df = manager.get_thegraph_historical_data('0xbebc44782c7db0a1a60cb6fe97d0b483032ff1c7', days=1)
+    # 獲取今日數據并追加到分区存储 (只写入比已存储更新的真实數據)
+    written = manager.collect_daily('{pool_name}', pool_info['address'], days=1)
     
-    if not df.empty:
-        # 追加到历史數據文件
-        filename = 'daily_collection_{pool_name}.csv'
-        filepath = manager.cache_dir / filename
-        
-        if filepath.exists():
-            existing_df = pd.read_csv(filepath)
-            combined_df = pd.concat([existing_df, df], ignore_index=True)
-        else:
-            combined_df = df
+    if written is not None:
+        print(f"✅ {{datetime.now()}}: 每日數據收集完成，新增{{written}}条记录")
         
-        combined_df.to_csv(filepath, index=False, encoding='utf-8')
-        print(f"✅ {{datetime.now()}}: 每日數據收集完成，共{{len(combined_df)}}条记录")
+        # 每月压缩一次分区 (已压缩的月份会被跳过)
+        manager.collection_store.compact_monthly()
     else:
         print(f"❌ {{datetime.now()}}: 今日數據收集失败")
 
@@ -921,108 +1027,259 @@ if __name__ == "__main__":
         print("💡 設置cron定时任务:")
         print(f"   0 1 * * * python3 {script_file.absolute()}")
         print("   (每天凌晨1点運行)")
+        print("💡 多个池子建议使用单一调度进程 (共享會話和缓存):")
+        print("   python3 collection_scheduler.py")
+
+    def collect_daily(self, pool_name: str, pool_address: str, days: int = 1) -> Optional[int]:
+        """
+        每日收集: 獲取最近days天的真实數據并追加到分区存储，返回新增行数 (所有數據源失败时返回None)
+        不使用自建數據补充，也不写入综合數據缓存文件
+        """
+        
+        df = self.get_comprehensive_free_data(pool_address, pool_name, days=days, save=False, allow_self_built=False)
+        if df.empty:
+            return None
+        return self.append_daily_collection(pool_name, df, days=days)
+    
+    def append_daily_collection(self, pool_name: str, df: pd.DataFrame, days: Optional[int] = None) -> int:
+        """
+        将每日收集的數據追加到分区存储，返回写入的行数
+        只写入比该池子已存储的最新时间戳更新的行 (days不为空时同时限制在最近days天内)
+        自建/合成數據不写入收集存储
+        首次运行时导入旧的 daily_collection_{pool}.csv 文件
+        """
+        
+        legacy_file = self.cache_dir / f"daily_collection_{pool_name}.csv"
+        if legacy_file.exists():
+            legacy_df = pd.read_csv(legacy_file)
+            legacy_df['pool_name'] = pool_name
+            self.collection_store.append(legacy_df)
+            legacy_file.rename(legacy_file.with_name(legacy_file.name + '.imported'))
+            print(f"📥 已导入旧收集文件: {legacy_file.name} ({len(legacy_df)} 条记录)")
+        
+        df = normalize_frame(df)
+        df['pool_name'] = pool_name
+        
+        if 'source' in df.columns:
+            df = df[~df['source'].astype(str).isin(FABRICATED_SOURCES)]
+        if days:
+            df = df[df['timestamp'] >= datetime.now() - timedelta(days=days)]
+        
+        last_timestamp = self.collection_store.last_timestamp(pool_name)
+        if last_timestamp is not None:
+            df = df[df['timestamp'] > last_timestamp]
+        
+        self.collection_store.append(df)
+        return len(df)
+    
+    def load_daily_collection(self, pool_name: str, days: Optional[int] = None) -> pd.DataFrame:
+        """读取每日收集的數據 (只打开相关分区)"""
+        
+        start = datetime.now() - timedelta(days=days) if days else None
+        return self.collection_store.read(start=start, pools=[pool_name])
+    
+    def _fetch_batch_pool(self, pool_name: str, pool_info: dict, days: int, base_data=None) -> pd.DataFrame:
+        """
+        批量獲取中的单个池子任务 (缓存优先)，异常只影响当前池子
+        """
+        
+        try:
+            print(f"  🔄 [{pool_name}] {pool_info['name']} (優先級:{pool_info['priority']})")
+            
+            # 檢查缓存覆盖范围 (以缓存清单为准)，已覆盖的部分直接切片
+            cache_key = self._batch_cache_key(pool_name)
+            window_start = datetime.now() - timedelta(days=days)
+            gap_days = self._batch_cache_gap(pool_name, days)
+            
+            if gap_days == 0:
+                try:
+                    df = self.store.read_range(cache_key, start=window_start)
+                    if not df.empty:
+                        print(f"  ✅ [{pool_name}] 从缓存切片 {len(df)} 条记录 ({days} 天)")
+                        return df
+                except Exception as e:
+                    print(f"  ⚠️  [{pool_name}] 缓存读取失败: {e}")
+                gap_days = days
+            elif gap_days < days:
+                print(f"  🧩 [{pool_name}] 缓存已覆盖较早范围，仅补取最近 {gap_days} 天")
+            
+            # 獲取缺口數據
+            df = self.get_comprehensive_free_data(
+                pool_info['address'], 
+                pool_name, 
+                days=gap_days,
+                base_data=base_data
+            )
+            
+            if not df.empty:
+                # 添加池子信息
+                df['pool_name'] = pool_name
+                df['pool_type'] = pool_info['type']
+                df['priority'] = pool_info['priority']
+                
+                # 合并进缓存后返回请求的时间窗口
+                combined = self.store.upsert(cache_key, df)
+                if 'timestamp' in combined.columns:
+                    combined = combined[combined['timestamp'] >= window_start].reset_index(drop=True)
+                df = combined
+                
+                print(f"  ✅ [{pool_name}] 獲取成功: {len(df)} 条记录")
+                
+                # 顯示简要统计  
+                if 'virtual_price' in df.columns:
+                    latest_vp = df['virtual_price'].iloc[-1] if len(df) > 0 else 0
+                    print(f"     Virtual Price: {latest_vp:.6f}")
+            else:
+                print(f"  ❌ [{pool_name}] 没有獲取到數據")
+            
+            return df
+            
+        except Exception as e:
+            print(f"  ❌ [{pool_name}] 獲取失败: {str(e)[:100]}...")
+            return pd.DataFrame()
+    
+    @staticmethod
+    def _batch_cache_key(pool_name: str) -> str:
+        """批量缓存按池子存储，不再按天数分文件"""
+        return f"{pool_name}_batch_historical"
+    
+    def _batch_cache_gap(self, pool_name: str, days: int) -> int:
+        """
+        计算最近 days 天中缓存未覆盖、需要补取的天数 (0 = 已完全覆盖)
+        旧的 _7d/_365d 缓存文件会先合并为按时间范围的数据集
+        """
+        
+        cache_key = self._batch_cache_key(pool_name)
+        if not self.store.exists(cache_key):
+            self.store.consolidate(cache_key)
+        
+        now = datetime.now()
+        window_start = now - timedelta(days=days)
+        tolerance = timedelta(hours=CACHE_COVERAGE_TOLERANCE_HOURS)
+        
+        # 找到覆盖窗口起点的连续区间；没有时只能整段獲取 (免费數據源均按最近N天查询)
+        for range_start, range_end in self.store.coverage(cache_key):
+            if range_start <= window_start + tolerance <= range_end + tolerance:
+                if range_end >= now - tolerance:
+                    return 0
+                return min(days, math.ceil((now - range_end).total_seconds() / 86400))
+        
+        return days
+    
+    def _timed_fetch_batch_pool(self, pool_name: str, pool_info: dict, days: int, base_data=None):
+        """执行单个池子任务并返回 (DataFrame, 耗时秒数)"""
+        
+        start_time = time.perf_counter()
+        df = self._fetch_batch_pool(pool_name, pool_info, days, base_data)
+        return df, time.perf_counter() - start_time
 
     def get_batch_historical_data(self, pools_dict: dict, days: int = CURRENT_DAYS_SETTING, 
-                                 max_concurrent: int = 3, delay_between_batches: int = 2) -> dict:
+                                 max_concurrent: int = 3, delay_between_batches: float = 0,
+                                 parallel: bool = True) -> dict:
         """
         批量獲取多个池子的历史數據
         
         Args:
             pools_dict: 池子字典 (来自 get_pools_by_priority 等函数)
             days: 獲取天数
-            max_concurrent: 最大并发数量
-            delay_between_batches: 批次间延迟(秒)
+            max_concurrent: 最大并发数量 (并行模式下同时運行的池子数)
+            delay_between_batches: 额外的批次间延迟(秒)，仅串行模式使用；请求已按主机限流，默认不等待
+            parallel: 是否使用线程池并行獲取
         
         Returns:
-            {pool_name: DataFrame} 字典
+            {pool_name: DataFrame} 字典 (按優先級排序)
+            每个池子的耗时记录在 self.last_batch_timings
         """
         
         print(f"🚀 批量獲取 {len(pools_dict)} 个池子的 {days} 天历史數據...")
         print(f"📋 池子列表: {', '.join(pools_dict.keys())}")
+        print(f"⚙️  模式: {'并行 (' + str(max_concurrent) + ' 线程)' if parallel else '串行分批'}")
         print("="*60)
         
         results = {}
-        successful = 0
-        failed = 0
+        timings = {}
         
         # 按優先級排序池子
         sorted_pools = sorted(pools_dict.items(), key=lambda x: x[1]['priority'])
         
-        # 分批處理避免API限制
-        import math
-        total_batches = math.ceil(len(sorted_pools) / max_concurrent)
+        # 并发预取未缓存池子的实时基础數據 (约一次往返时间)，供自建數據库使用
+        prefetched = {}
+        gaps = {name: self._batch_cache_gap(name, days) for name, _ in sorted_pools}
+        uncached_pools = [name for name, _ in sorted_pools if gaps[name] > 0]
+        if ENABLE_SELF_BUILT and uncached_pools:
+            try:
+                from async_data_collector import collect_real_time_data
+                print(f"⚡ 并发预取 {len(uncached_pools)} 个池子的实时數據...")
+                prefetched = collect_real_time_data(uncached_pools)
+            except Exception as e:
+                print(f"⚠️  实时數據预取失败，逐个獲取: {str(e)[:50]}...")
         
-        for batch_idx in range(total_batches):
-            start_idx = batch_idx * max_concurrent
-            end_idx = min(start_idx + max_concurrent, len(sorted_pools))
-            current_batch = sorted_pools[start_idx:end_idx]
-            
-            print(f"📦 處理批次 {batch_idx + 1}/{total_batches}")
-            print(f"   池子: {[pool[0] for pool in current_batch]}")
+        # 没有预取到基础數據的池子会在自建流程中逐个獲取，先为它们的代币并集批量獲取一次價格
+        missing_base = [name for name in uncached_pools if not prefetched.get(name)]
+        if ENABLE_SELF_BUILT and missing_base:
+            from real_data_collector import CurveRealDataCollector
+            CurveRealDataCollector(event_cache_dir=str(self.cache_dir)).prefetch_prices(missing_base)
+        
+        # 未缓存的池子一次性歸檔節點回填 (每个區塊一次Multicall读取所有池子)
+        if ENABLE_ARCHIVE_BACKFILL and uncached_pools:
+            self.prefetch_archive_history({name: pools_dict[name]['address'] for name in uncached_pools},
+                                          max(gaps[name] for name in uncached_pools))
+        
+        batch_start = time.perf_counter()
+        
+        if parallel:
+            # 按優先級顺序提交，最多 max_concurrent 个池子同时運行
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrent)) as executor:
+                futures = {
+                    pool_name: executor.submit(self._timed_fetch_batch_pool, pool_name, pool_info,
+                                               days, prefetched.get(pool_name))
+                    for pool_name, pool_info in sorted_pools
+                }
+                
+                for pool_name, _ in sorted_pools:
+                    results[pool_name], timings[pool_name] = futures[pool_name].result()
+        else:
+            # 分批處理避免API限制
+            total_batches = math.ceil(len(sorted_pools) / max_concurrent)
             
-            # 處理当前批次
-            for pool_name, pool_info in current_batch:
-                try:
-                    print(f"  🔄 [{pool_name}] {pool_info['name']} (優先級:{pool_info['priority']})")
-                    
-                    # 檢查缓存
-                    cache_file = self.cache_dir / f"{pool_name}_batch_historical_{days}d.csv"
-                    if cache_file.exists():
-                        try:
-                            df = pd.read_csv(cache_file)
-                            df['timestamp'] = pd.to_datetime(df['timestamp'])
-                            print(f"  ✅ [{pool_name}] 从缓存加载 {len(df)} 条记录")
-                            results[pool_name] = df
-                            successful += 1
-                            continue
-                        except Exception as e:
-                            print(f"  ⚠️  [{pool_name}] 缓存读取失败: {e}")
-                    
-                    # 獲取新數據  
-                    df = self.get_comprehensive_free_data(
-                        pool_info['address'], 
-                        pool_name, 
-                        days=days
+            for batch_idx in range(total_batches):
+                start_idx = batch_idx * max_concurrent
+                end_idx = min(start_idx + max_concurrent, len(sorted_pools))
+                current_batch = sorted_pools[start_idx:end_idx]
+                
+                print(f"📦 處理批次 {batch_idx + 1}/{total_batches}")
+                print(f"   池子: {[pool[0] for pool in current_batch]}")
+                
+                # 處理当前批次
+                for pool_name, pool_info in current_batch:
+                    results[pool_name], timings[pool_name] = self._timed_fetch_batch_pool(
+                        pool_name, pool_info, days, prefetched.get(pool_name)
                     )
-                    
-                    if not df.empty:
-                        # 添加池子信息
-                        df['pool_name'] = pool_name
-                        df['pool_type'] = pool_info['type']
-                        df['priority'] = pool_info['priority']
-                        
-                        # 保存到缓存
-                        df.to_csv(cache_file, index=False)
-                        
-                        results[pool_name] = df
-                        successful += 1
-                        print(f"  ✅ [{pool_name}] 獲取成功: {len(df)} 条记录")
-                        
-                        # 顯示简要统计  
-                        if 'virtual_price' in df.columns:
-                            latest_vp = df['virtual_price'].iloc[-1] if len(df) > 0 else 0
-                            print(f"     Virtual Price: {latest_vp:.6f}")
-                            
-                    else:
-                        print(f"  ❌ [{pool_name}] 没有獲取到數據")
-                        failed += 1
-                        results[pool_name] = pd.DataFrame()
-                        
-                except Exception as e:
-                    print(f"  ❌ [{pool_name}] 獲取失败: {str(e)[:100]}...")
-                    failed += 1
-                    results[pool_name] = pd.DataFrame()
-            
-            # 批次间延迟
-            if batch_idx < total_batches - 1:  # 不是最后一批次
-                print(f"  ⏳ 等待 {delay_between_batches} 秒后處理下一批次...")
-                time.sleep(delay_between_batches)
+                
+                # 批次间延迟
+                if delay_between_batches > 0 and batch_idx < total_batches - 1:  # 不是最后一批次
+                    print(f"  ⏳ 等待 {delay_between_batches} 秒后處理下一批次...")
+                    time.sleep(delay_between_batches)
+        
+        total_time = time.perf_counter() - batch_start
+        self.last_batch_timings = timings
+        self._archive_prefetched.clear()
+        
+        successful = sum(1 for df in results.values() if not df.empty)
+        failed = len(results) - successful
         
         print("\n" + "="*60)
         print(f"📊 批量獲取完成!")
         print(f"   ✅ 成功: {successful}/{len(pools_dict)}")
         print(f"   ❌ 失败: {failed}/{len(pools_dict)}")
         print(f"   成功率: {successful/len(pools_dict)*100:.1f}%")
+        print(f"   ⏱️  总耗时: {total_time:.1f}s (各池子累计 {sum(timings.values()):.1f}s)")
+        
+        # 每个池子的耗时，用于根据API限制调整并发数
+        print(f"   各池子耗时:")
+        for pool_name, elapsed in timings.items():
+            status = '✅' if not results[pool_name].empty else '❌'
+            print(f"     {status} {pool_name:12} {elapsed:6.2f}s")
         
         return results
 
@@ -1080,7 +1337,7 @@ if __name__ == "__main__":
             pools = AVAILABLE_POOLS
             print(f"🌍 獲取所有池子數據 (包含全部): {len(pools)} 个池子")
         
-        return self.get_batch_historical_data(pools, days, max_concurrent=2, delay_between_batches=3)
+        return self.get_batch_historical_data(pools, days, max_concurrent=2)
 
     def get_pools_by_type_data(self, pool_type: str, days: int = CURRENT_DAYS_SETTING) -> dict:
         """
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+归档节点历史数据回填
+在时间窗口内按均匀间隔的区块读取池子状态 (get_virtual_price / balances / totalSupply)，得到真实的历史序列
+- 时间戳 → 区块号: 插值+二分查找，区块时间戳持久化缓存 (rpc_cache)
+- 每个采样区块一次Multicall读取所有池子，多线程并行，eth_call结果同样被缓存
+- 每个池子一个检查点文件，中断后从未完成的区块继续
+结果写入历史缓存 ({pool}_archive_historical)，供预测模型使用
+需要支持历史状态查询的归档节点 (Infura/Alchemy 等均支持)
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+
+from cache_store import HistoricalCacheStore
+from curve_registry import get_curve_registry
+from onchain_reader import OnchainPoolReader, OnchainPoolState
+from token_metadata import TokenMetadataCache, get_token_metadata_cache
+
+# 回填配置
+BACKFILL_POINTS_PER_DAY = 4         # 每天采样点数 (每6小时一个)
+BACKFILL_WORKERS = 4                # 并行读取的线程数
+BACKFILL_CHECKPOINT_EVERY = 32      # 每读取多少个区块写一次缓存和检查点
+BACKFILL_SOURCE = 'onchain_archive'
+BACKFILL_CHECKPOINT_DIR = 'backfill_checkpoints'
+MULTICALL3_DEPLOY_BLOCK = 14353601  # 以太坊主网Multicall3部署区块，更早的区块无法批量读取
+AVG_BLOCK_TIME = 12.0               # 平均出块时间 (秒)，用于计算采样间隔
+
+
+def archive_cache_key(pool_name: str) -> str:
+    return f"{pool_name}_archive_historical"
+
+
+class BlockTimestampIndex:
+    """时间戳 → 区块号 (插值与二分交替的查找，探测过的区块时间戳会被缓存)"""
+
+    def __init__(self, reader: OnchainPoolReader):
+        self.reader = reader
+        self._timestamps: Dict[int, int] = {}
+
+    def timestamp(self, block: int) -> int:
+        if block not in self._timestamps:
+            if self.reader.call_cache is not None:
+                self._timestamps[block] = self.reader.call_cache.block_timestamp(block)
+            else:
+                header = self.reader._rpc('eth_getBlockByNumber', [hex(block), False])
+                self._timestamps[block] = int(header['timestamp'], 16)
+        return self._timestamps[block]
+
+    def head(self) -> int:
+        """当前链头区块号"""
+
+        head = int(self.reader._rpc('eth_blockNumber', []), 16)
+        if self.reader.call_cache is not None:
+            self.reader.call_cache.observe_head(head)
+        return head
+
+    def block_at(self, timestamp: float, head: Optional[int] = None, lower: int = 0) -> int:
+        """时间戳不晚于timestamp的最后一个区块"""
+
+        lo, hi = lower, head if head is not None else self.head()
+        t_lo, t_hi = self.timestamp(lo), self.timestamp(hi)
+
+        if timestamp >= t_hi:
+            return hi
+        if timestamp < t_lo:
+            return lo
+
+        step = 0
+        while hi - lo > 1:
+            if step % 2 == 0 and t_hi > t_lo:
+                # 插值: 出块时间基本恒定时一两步即可接近目标
+                guess = lo + int((timestamp - t_lo) / (t_hi - t_lo) * (hi - lo))
+            else:
+                # 二分: 保证最坏情况下对数次收敛
+                guess = (lo + hi) // 2
+            guess = min(max(guess, lo + 1), hi - 1)
+            step += 1
+
+            t_guess = self.timestamp(guess)
+            if t_guess <= timestamp:
+                lo, t_lo = guess, t_guess
+            else:
+                hi, t_hi = guess, t_guess
+
+        return lo
+
+
+class HistoricalBackfill:
+    """按区块采样的历史数据回填引擎 (可恢复、并行、按池子检查点)"""
+
+    def __init__(self, reader: OnchainPoolReader, store: HistoricalCacheStore,
+                 workers: int = BACKFILL_WORKERS, points_per_day: int = BACKFILL_POINTS_PER_DAY,
+                 token_metadata: Optional[TokenMetadataCache] = None):
+        self.reader = reader
+        self.store = store
+        self.workers = workers
+        self.points_per_day = points_per_day
+        self.token_metadata = token_metadata or get_token_metadata_cache()
+        self.registry = get_curve_registry()
+        self.blocks = BlockTimestampIndex(reader)
+
+        self.checkpoint_dir = Path(store.cache_dir) / BACKFILL_CHECKPOINT_DIR
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---------- 检查点 ----------
+
+    def _checkpoint_path(self, pool_name: str) -> Path:
+        return self.checkpoint_dir / f"{pool_name}.json"
+
+    def load_checkpoint(self, pool_name: str, pool_address: str) -> Set[int]:
+        """已完成的区块 (包括池子尚未部署、没有数据的区块)"""
+
+        path = self._checkpoint_path(pool_name)
+        if not path.exists():
+            return set()
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  检查点读取失败 {path.name}: {e}")
+            return set()
+
+        # 池子地址变化时检查点失效
+        if checkpoint.get('address', '').lower() != pool_address.lower():
+            return set()
+        return set(checkpoint.get('blocks_done', []))
+
+    def _save_checkpoint(self, pool_name: str, pool_address: str, blocks_done: Set[int]):
+        path = self._checkpoint_path(pool_name)
+        tmp_path = path.with_name(path.name + f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'pool': pool_name,
+                'address': pool_address,
+                'blocks_done': sorted(blocks_done),
+                'updated_at': datetime.now().isoformat(),
+            }, f)
+        os.replace(tmp_path, path)
+
+    # ---------- 采样 ----------
+
+    def sample_blocks(self, days: int, end: Optional[datetime] = None) -> List[int]:
+        """
+        时间窗口 [end - days, end] 内均匀间隔的采样区块 (每天约 points_per_day 个)，end默认为链头
+        采样区块对齐到固定网格 (区块号为间隔的整数倍)，之后的运行可以复用已回填的区块
+        """
+
+        head = self.blocks.head()
+        end_block = head if end is None else self.blocks.block_at(end.timestamp(), head)
+        start_time = datetime.fromtimestamp(self.blocks.timestamp(end_block)) - timedelta(days=days)
+        start_block = self.blocks.block_at(start_time.timestamp(), end_block, lower=MULTICALL3_DEPLOY_BLOCK)
+
+        step = max(1, int(86400 / AVG_BLOCK_TIME / self.points_per_day))
+        first = -(-start_block // step) * step
+        return list(range(first, end_block + 1, step))
+
+    def _read_block(self, block: int, addresses: List[str]) -> Dict[str, OnchainPoolState]:
+        return self.reader.read_pools(addresses, hex(block))
+
+    def _state_row(self, pool_name: str, state: OnchainPoolState, metadata) -> Dict:
+        from real_data_collector import CurveRealDataCollector
+
+        pool_data = CurveRealDataCollector._onchain_state_to_pool_data(pool_name, state, metadata)
+        row = {
+            'timestamp': pool_data.timestamp,
+            'block_number': state.block_number,
+            'pool_address': pool_data.pool_address,
+            'pool_name': pool_name,
+            'virtual_price': pool_data.virtual_price,
+            'total_supply': pool_data.total_supply,
+        }
+        for token, balance in zip(pool_data.tokens, pool_data.balances):
+            row[f'{token.lower()}_balance'] = balance
+        row['source'] = BACKFILL_SOURCE
+        return row
+
+    # ---------- 回填 ----------
+
+    def backfill(self, pools: Dict[str, str], days: int, end: Optional[datetime] = None) -> Dict[str, pd.DataFrame]:
+        """
+        回填多个池子 {名称: 地址} 最近days天的历史数据，返回 {名称: 时间窗口内的DataFrame}
+        已完成的区块会被跳过；每个区块的所有池子在一次eth_call中读取
+        """
+
+        blocks = self.sample_blocks(days, end)
+        if not blocks:
+            # 窗口短于一个采样间隔 (或days<=0)
+            print(f"⚠️  {days} 天窗口内没有采样区块，跳过回填")
+            return {name: pd.DataFrame() for name in pools}
+
+        done = {name: self.load_checkpoint(name, address) for name, address in pools.items()}
+        pending = sorted({block for block in blocks for name in pools if block not in done[name]})
+
+        print(f"⛓️  回填 {len(pools)} 个池子 {days} 天: {len(blocks)} 个采样区块 "
+              f"({blocks[0]} → {blocks[-1]}), 待读取 {len(pending)} 个")
+
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as executor:
+            for offset in range(0, len(pending), BACKFILL_CHECKPOINT_EVERY):
+                chunk = pending[offset:offset + BACKFILL_CHECKPOINT_EVERY]
+                addresses = {block: [address for name, address in pools.items() if block not in done[name]]
+                             for block in chunk}
+
+                futures = {block: executor.submit(self._read_block, block, addresses[block]) for block in chunk}
+                states = {}
+                for block, future in futures.items():
+                    try:
+                        states[block] = future.result()
+                    except Exception as e:
+                        # 失败的区块不记入检查点，下次运行时重试
+                        print(f"⚠️  区块 {block} 读取失败: {str(e)[:100]}...")
+
+                self._flush(pools, states, done)
+                print(f"   📦 {min(offset + len(chunk), len(pending))}/{len(pending)} 个区块 "
+                      f"({time.perf_counter() - start_time:.1f}s)")
+
+        window_start = datetime.fromtimestamp(self.blocks.timestamp(blocks[0]))
+        return {name: self.store.read_range(archive_cache_key(name), start=window_start, end=end)
+                for name in pools}
+
+    def _flush(self, pools: Dict[str, str], states: Dict[int, Dict[str, OnchainPoolState]],
+               done: Dict[str, Set[int]]):
+        """把一批区块的结果写入历史缓存并更新检查点"""
+
+        coins = {coin for block_states in states.values() for state in block_states.values() for coin in state.coins}
+        metadata = self.token_metadata.resolve(list(coins), self.registry, self.reader) if coins else {}
+
+        for name, address in pools.items():
+            rows = []
+            finished = set()
+            for block, block_states in states.items():
+                state = block_states.get(address)
+                if state is None:
+                    continue
+                finished.add(block)
+                # 池子尚未部署或不是Curve池: 记入检查点但没有数据
+                if state.virtual_price is not None and state.coins:
+                    rows.append(self._state_row(name, state, metadata))
+
+            if rows:
+                self.store.upsert(archive_cache_key(name), pd.DataFrame(rows))
+            if finished:
+                done[name] |= finished
+                self._save_checkpoint(name, address, done[name])
+
+
+def main():
+    from config import Config
+    from free_historical_data import AVAILABLE_POOLS
+
+    parser = argparse.ArgumentParser(description='归档节点历史数据回填')
+    parser.add_argument('--pools', nargs='+', default=['3pool'], help='要回填的池子')
+    parser.add_argument('--days', type=int, default=30, help='回填天数')
+    parser.add_argument('--points-per-day', type=int, default=BACKFILL_POINTS_PER_DAY, help='每天采样点数')
+    parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS, help='并行线程数')
+    parser.add_argument('--cache-dir', default='free_historical_cache', help='历史缓存目录')
+    args = parser.parse_args()
+
+    rpc_url = Config.get_web3_provider_url()
+    if not rpc_url:
+        print("❌ 未配置Web3提供商 (设置 INFURA_API_KEY / ALCHEMY_API_KEY)")
+        return
+
+    unknown = [name for name in args.pools if name not in AVAILABLE_POOLS]
+    if unknown:
+        print(f"❌ 未知池子: {', '.join(unknown)}")
+        return
+
+    engine = HistoricalBackfill(OnchainPoolReader(rpc_url), HistoricalCacheStore(args.cache_dir),
+                                workers=args.workers, points_per_day=args.points_per_day)
+    results = engine.backfill({name: AVAILABLE_POOLS[name]['address'] for name in args.pools}, args.days)
+
+    for name, df in results.items():
+        if df.empty:
+            print(f"⚠️  {name}: 没有数据")
+        else:
+            print(f"✅ {name}: {len(df)} 条记录, {df['timestamp'].min()} → {df['timestamp'].max()}, "
+                  f"VP {df['virtual_price'].iloc[0]:.6f} → {df['virtual_price'].iloc[-1]:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+HTTP响应磁盘缓存
+GET响应按URL缓存到磁盘，按端点设置有效期，过期后用 ETag / If-Modified-Since 条件请求重新验证
+离线模式下只从缓存读取，不访问网络 (开发时反复运行演示脚本不会重复下载相同数据)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+
+# 缓存配置
+HTTP_CACHE_DIR = Path("curve_data") / "http_cache"
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024   # 超过后按最久未更新删除
+HTTP_CACHE_ENABLED = os.getenv('CURVE_HTTP_CACHE', '1') != '0'
+HTTP_OFFLINE = os.getenv('CURVE_OFFLINE', '0') == '1'      # 离线模式: 只使用缓存
+
+# 各端点的有效期 (秒): (主机, 路径前缀) → TTL，最长前缀优先；过期后条件请求重新验证
+HTTP_CACHE_TTLS: Dict[Tuple[str, str], float] = {
+    ('api.curve.fi', '/api/getPools'): 300,
+    ('api.curve.fi', '/api'): 300,
+    ('yields.llama.fi', '/pools'): 1800,
+    ('yields.llama.fi', '/chart'): 3600,
+    ('api.coingecko.com', '/api/v3/simple'): 60,
+    ('api.coingecko.com', '/api/v3/coins'): 3600,
+}
+HTTP_CACHE_DEFAULT_TTL = 0      # 未配置的端点: 每次都重新验证 (有验证器时可得到304)
+
+# 缓存条目中保留的响应头 (响应体保存解码后的内容，不保留Content-Encoding)
+_KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Date')
+
+
+def cache_ttl(url: str) -> float:
+    """端点的缓存有效期"""
+
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    best, best_length = HTTP_CACHE_DEFAULT_TTL, -1
+
+    for (ttl_host, prefix), ttl in HTTP_CACHE_TTLS.items():
+        if host == ttl_host and parsed.path.startswith(prefix) and len(prefix) > best_length:
+            best, best_length = ttl, len(prefix)
+
+    return best
+
+
+def _no_store(headers) -> bool:
+    return 'no-store' in (headers.get('Cache-Control') or '').lower()
+
+
+class CachedEntry:
+    """单个缓存条目 (元数据 + 响应体文件)"""
+
+    def __init__(self, meta: Dict, body_path: Path):
+        self.meta = meta
+        self.body_path = body_path
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.meta['stored_at']
+
+    def is_fresh(self) -> bool:
+        return self.age < cache_ttl(self.meta['url'])
+
+    def validators(self) -> Dict[str, str]:
+        """条件请求头"""
+
+        headers = {}
+        if self.meta['headers'].get('ETag'):
+            headers['If-None-Match'] = self.meta['headers']['ETag']
+        if self.meta['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = self.meta['headers']['Last-Modified']
+        return headers
+
+    def body(self) -> bytes:
+        return self.body_path.read_bytes()
+
+    def to_response(self) -> requests.Response:
+        """还原为requests.Response (from_cache=True)"""
+
+        response = requests.Response()
+        response.status_code = self.meta['status']
+        response.url = self.meta['url']
+        response.headers.update(self.meta['headers'])
+        response._content = self.body()
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+
+class HttpResponseCache:
+    """HTTP响应磁盘缓存 - 每个URL一个元数据文件和一个响应体文件"""
+
+    def __init__(self, cache_dir: Union[str, Path] = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = self._key(url)
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def get(self, url: str) -> Optional[CachedEntry]:
+        meta_path, body_path = self._paths(url)
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if meta.get('url') != url or not body_path.exists():
+            return None
+        return CachedEntry(meta, body_path)
+
+    def _write_meta(self, meta_path: Path, meta: Dict):
+        tmp_path = meta_path.with_name(meta_path.name + f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    def store(self, url: str, status: int, headers, content: bytes) -> Optional[CachedEntry]:
+        """保存200响应 (Cache-Control: no-store 除外)，headers为不区分大小写的响应头映射"""
+
+        if status != 200 or _no_store(headers):
+            return None
+
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'status': status,
+            'headers': {key: headers[key] for key in _KEPT_HEADERS if key in headers},
+            'stored_at': time.time(),
+            'size': len(content),
+        }
+
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = body_path.with_name(body_path.name + f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, body_path)
+            self._write_meta(meta_path, meta)
+            self._prune()
+
+        return CachedEntry(meta, body_path)
+
+    def touch(self, entry: CachedEntry, headers=None):
+        """304后刷新条目的存储时间 (和服务器返回的新验证器)"""
+
+        entry.meta['stored_at'] = time.time()
+        for key in ('ETag', 'Last-Modified', 'Cache-Control', 'Date'):
+            if headers is not None and key in headers:
+                entry.meta['headers'][key] = headers[key]
+
+        meta_path, _ = self._paths(entry.meta['url'])
+        with self._lock:
+            self._write_meta(meta_path, entry.meta)
+
+    def _prune(self):
+        """总大小超过上限时删除最久未更新的条目"""
+
+        metas: List[Tuple[float, int, Path]] = []
+        total = 0
+        for meta_path in self.cache_dir.glob('*.json'):
+            try:
+                stat = meta_path.stat()
+                size = stat.st_size + meta_path.with_suffix('.body').stat().st_size
+            except OSError:
+                continue
+            metas.append((stat.st_mtime, size, meta_path))
+            total += size
+
+        for _, size, meta_path in sorted(metas):
+            if total <= self.max_bytes:
+                break
+            meta_path.unlink(missing_ok=True)
+            meta_path.with_suffix('.body').unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            for path in self.cache_dir.glob('*'):
+                if path.suffix in ('.json', '.body'):
+                    path.unlink(missing_ok=True)
+
+    def lookup(self, url: str) -> Tuple[Optional[CachedEntry], bool]:
+        """
+        查询缓存，返回 (条目, 是否可直接使用)
+        未过期或离线模式时可直接使用；离线且没有缓存时抛出 OfflineCacheMiss
+        """
+
+        entry = self.get(url)
+        if entry is not None and (entry.is_fresh() or is_offline()):
+            self.hits += 1
+            return entry, True
+        if is_offline():
+            raise OfflineCacheMiss(f"Offline mode: no cached response for {url}")
+        return entry, False
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses}
+
+
+class OfflineCacheMiss(requests.exceptions.ConnectionError):
+    """离线模式下请求了没有缓存的URL"""
+
+
+_offline = HTTP_OFFLINE
+
+
+def set_offline(offline: bool = True):
+    """开启/关闭离线模式 (只从缓存读取)"""
+
+    global _offline
+    _offline = offline
+
+
+def is_offline() -> bool:
+    return _offline
+
+
+_shared_cache: Optional[HttpResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HttpResponseCache]:
+    """获取进程内共享的HTTP缓存 (CURVE_HTTP_CACHE=0 时禁用，返回None)"""
+
+    global _shared_cache
+
+    if not HTTP_CACHE_ENABLED:
+        return None
+
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = HttpResponseCache()
+
+    return _shared_cache
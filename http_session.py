@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+共享HTTP会话层
+按主机复用keep-alive连接池，统一gzip/brotli压缩协商和重试策略
+GET响应经过磁盘缓存 (http_cache)，过期后条件请求重新验证
+同一URL的并发GET请求合并为一次 (single_flight)
+"""
+
+import copy
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import OfflineCacheMiss, get_http_cache, is_offline
+from rate_limiter import get_rate_limiter
+from single_flight import SingleFlightTimeout, get_single_flight
+
+try:
+    import brotli  # noqa: F401  urllib3检测到后会自动解码br响应
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+# 连接池配置
+HTTP_POOL_CONNECTIONS = 4      # 每个会话缓存的主机连接池数量
+HTTP_POOL_MAXSIZE = 16         # 每个主机连接池的最大连接数 (需覆盖并发收集线程数)
+HTTP_MAX_RETRIES = 2           # 适配器层重试次数 (连接错误/5xx)
+HTTP_BACKOFF_FACTOR = 0.5      # 重试退避系数
+HTTP_RETRY_STATUS = (500, 502, 503, 504)   # 429由限流器按主机统一处理
+HTTP_RATE_LIMIT_RETRIES = 3    # 被限流 (429) 后等待Retry-After再重试的次数
+HTTP_USER_AGENT = "curve-data-ai/1.0"
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _host_key(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+def _build_session() -> requests.Session:
+    """创建带连接池和重试适配器的会话"""
+
+    session = requests.Session()
+
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        read=0,                                      # 读超时不在适配器层重试，避免超时时间成倍放大 (调用方按时间预算重试)
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=HTTP_RETRY_STATUS,
+        allowed_methods=frozenset(['GET', 'POST']),  # JSON-RPC/GraphQL查询均为只读
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    session.headers.update({
+        'User-Agent': HTTP_USER_AGENT,
+        'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate',
+        'Connection': 'keep-alive'
+    })
+
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """获取目标主机的共享会话 (线程安全，每个主机一个)"""
+
+    key = _host_key(url)
+    session = _sessions.get(key)
+
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _build_session()
+                _sessions[key] = session
+
+    return session
+
+
+def http_request(method: str, url: str, use_cache: bool = True, **kwargs) -> requests.Response:
+    """
+    通过共享会话发送请求 (按主机限流，被限流时按Retry-After暂停该主机后重试)
+    GET请求先查磁盘缓存: 未过期直接返回，过期时带验证器请求，304时返回缓存内容
+    同一URL (相同参数、请求头、verify和timeout，且未设置auth) 的并发GET只发送一次，
+    加入的调用方最多等待自己的timeout，得到响应对象的独立副本
+    离线模式下只返回缓存，没有缓存时抛出 OfflineCacheMiss
+    """
+
+    method = method.upper()
+    cache = get_http_cache() if use_cache and method == 'GET' else None
+    entry = None
+    cache_url = None
+
+    if cache is not None:
+        cache_url = requests.Request(method, url, params=kwargs.get('params')).prepare().url
+        entry, usable = cache.lookup(cache_url)
+        if usable:
+            return entry.to_response()
+        if entry is not None:
+            kwargs['headers'] = {**entry.validators(), **(kwargs.get('headers') or {})}
+    elif is_offline():
+        raise OfflineCacheMiss(f"Offline mode: {method} {url} cannot be served from cache")
+
+    if method != 'GET' or kwargs.get('stream') or kwargs.get('auth') is not None:
+        return _send(method, url, kwargs, cache, cache_url, entry)
+
+    timeout = kwargs.get('timeout')
+    request_url = cache_url or requests.Request(method, url, params=kwargs.get('params')).prepare().url
+    key = ('http', request_url, tuple(sorted((kwargs.get('headers') or {}).items())),
+           kwargs.get('verify', True), timeout)
+
+    # 加入进行中的请求时最多等待自己的超时 (连接+读取)，不受发起方被限流重试的拖累
+    wait = sum(timeout) if isinstance(timeout, tuple) else timeout
+    try:
+        response, shared = get_single_flight().do(
+            key, lambda: _send(method, url, kwargs, cache, cache_url, entry), timeout=wait
+        )
+    except SingleFlightTimeout as e:
+        raise requests.exceptions.Timeout(str(e))
+
+    if shared:
+        # 响应体已读取完毕，副本之间互不影响 (请求头单独复制)
+        response = copy.copy(response)
+        response.headers = response.headers.copy()
+    return response
+
+
+def _send(method: str, url: str, kwargs: Dict, cache=None, cache_url: Optional[str] = None,
+          entry=None) -> requests.Response:
+    """发送请求并更新磁盘缓存 (http_request的网络部分)"""
+
+    limiter = get_rate_limiter()
+    session = get_session(url)
+
+    for attempt in range(HTTP_RATE_LIMIT_RETRIES + 1):
+        limiter.acquire(url)
+        response = session.request(method, url, **kwargs)
+
+        rate_limited = limiter.observe(url, response.status_code, response.headers.get('Retry-After'))
+        if not rate_limited or attempt == HTTP_RATE_LIMIT_RETRIES:
+            break
+
+    if cache is not None:
+        if response.status_code == 304 and entry is not None:
+            cache.touch(entry, response.headers)
+            cache.revalidated += 1
+            return entry.to_response()
+        cache.misses += 1
+        cache.store(cache_url, response.status_code, response.headers, response.content)
+
+    # 响应体在返回前读取完毕，共享给并发调用方时可以安全地多次解析
+    if not kwargs.get('stream'):
+        response.content
+    return response
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return http_request('GET', url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return http_request('POST', url, **kwargs)
+
+
+def close_sessions():
+    """关闭所有共享会话"""
+
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -7,10 +7,10 @@
 import pandas as pd
 import numpy as np
 from virtual_price_predictor import CurveVirtualPricePredictor
+from cache_store import HistoricalCacheStore
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
-import os
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -33,13 +33,15 @@ class MultiPoolPredictor:
         
         available_pools = []
         
+        store = HistoricalCacheStore("free_historical_cache")
+        
         for pool_name in self.pool_names:
-            file_path = f"free_historical_cache/{pool_name}_comprehensive_free_historical_365d.csv"
+            cache_key = f"{pool_name}_comprehensive_free_historical_365d"
             
-            if os.path.exists(file_path):
+            if store.exists(cache_key):
                 try:
-                    df = pd.read_csv(file_path, nrows=5)
-                    if len(df) > 0:
+                    # 行數來自快取清單 (未登記時讀取Parquet元數據)，不載入數據
+                    if store.row_count(cache_key) > 0:
                         available_pools.append(pool_name)
                         print(f"✅ {pool_name:12}: 數據可用")
                     else:
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Curve链上数据批量读取
+通过Multicall3 aggregate3把多个池子的全部状态读取合并为一次eth_call (同一区块)
+直接使用JSON-RPC，不依赖web3，可以指向本地JSON-RPC替身进行测试
+指定区块号的eth_call结果经过 rpc_cache 持久化缓存
+"""
+
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from http_session import http_post
+from rpc_cache import CachedRpcEndpoint, RpcResultCache, get_rpc_cache
+
+# Multicall3 (所有主流EVM链上地址相同)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# 函数选择器 (keccak256(signature)[:4])
+SELECTORS = {
+    'aggregate3': '82ad56cb',               # aggregate3((address,bool,bytes)[])
+    'getBlockNumber': '42cbb15c',           # getBlockNumber()
+    'getCurrentBlockTimestamp': '0f28c97d', # getCurrentBlockTimestamp()
+    'get_virtual_price': 'bb7b8b80',        # get_virtual_price()
+    'totalSupply': '18160ddd',              # totalSupply()
+    'fee': 'ddca3f43',                      # fee()  精度1e10
+    'coins_uint256': 'c6610657',            # coins(uint256)
+    'coins_int128': '23746eb8',             # coins(int128)  旧版池子
+    'balances_uint256': '4903b0d1',         # balances(uint256)
+    'balances_int128': '065a80d8',          # balances(int128)  旧版池子
+    'symbol': '95d89b41',                   # symbol()
+    'decimals': '313ce567',                 # decimals()
+    'name': '06fdde03',                     # name()
+}
+
+# 读取配置
+ONCHAIN_MAX_COINS = 8           # 每个池子探测的最大代币数 (StableSwap-NG最多8个)
+MULTICALL_MAX_CALLS = 2000      # 单次eth_call的最大子调用数，超过时分块 (固定同一区块)
+RPC_TIMEOUT = 30
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, 'big')
+
+
+def encode_call(selector: str, *args: int) -> bytes:
+    """编码只有整数参数的调用 (int128/uint256的非负值编码相同)"""
+    return bytes.fromhex(selector) + b''.join(_word(arg) for arg in args)
+
+
+def encode_aggregate3(calls: Sequence[Tuple[str, bytes]]) -> str:
+    """编码 aggregate3((address target, bool allowFailure, bytes callData)[])，所有子调用允许失败"""
+
+    tuples = []
+    for target, call_data in calls:
+        padded = call_data + b'\x00' * (-len(call_data) % 32)
+        tuples.append(
+            _word(int(target, 16)) + _word(1) + _word(0x60) + _word(len(call_data)) + padded
+        )
+
+    # 数组元素为动态类型: 先写每个元素相对偏移，再写元素内容
+    offsets = []
+    position = 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(_word(position))
+        position += len(encoded)
+
+    payload = _word(0x20) + _word(len(tuples)) + b''.join(offsets) + b''.join(tuples)
+    return '0x' + SELECTORS['aggregate3'] + payload.hex()
+
+
+def decode_aggregate3(result: str) -> List[Tuple[bool, bytes]]:
+    """解码 aggregate3 返回值 (bool success, bytes returnData)[]"""
+
+    data = bytes.fromhex(result[2:] if result.startswith('0x') else result)
+
+    def read_word(offset: int) -> int:
+        return int.from_bytes(data[offset:offset + 32], 'big')
+
+    array_start = read_word(0)
+    count = read_word(array_start)
+    elements = array_start + 32
+
+    decoded = []
+    for i in range(count):
+        tuple_start = elements + read_word(elements + 32 * i)
+        success = bool(read_word(tuple_start))
+        bytes_start = tuple_start + read_word(tuple_start + 32)
+        length = read_word(bytes_start)
+        decoded.append((success, data[bytes_start + 32:bytes_start + 32 + length]))
+
+    return decoded
+
+
+def decode_uint(data: bytes) -> Optional[int]:
+    return int.from_bytes(data[:32], 'big') if len(data) >= 32 else None
+
+
+def decode_address(data: bytes) -> Optional[str]:
+    if len(data) < 32:
+        return None
+    return '0x' + data[12:32].hex()
+
+
+def decode_string(data: bytes) -> Optional[str]:
+    """解码ERC-20的string返回值，兼容返回bytes32的旧代币 (如MKR)"""
+
+    if len(data) == 32:
+        return data.rstrip(b'\x00').decode('utf-8', errors='replace')
+    if len(data) < 64:
+        return None
+
+    offset = int.from_bytes(data[:32], 'big')
+    length = int.from_bytes(data[offset:offset + 32], 'big')
+    return data[offset + 32:offset + 32 + length].decode('utf-8', errors='replace')
+
+
+@dataclass
+class OnchainPoolState:
+    """单个池子在某一区块的原始链上状态 (整数均为未缩放的原始值)"""
+    address: str
+    block_number: int
+    block_timestamp: int
+    virtual_price: Optional[int]
+    total_supply: Optional[int]
+    coins: List[str] = field(default_factory=list)
+    balances: List[int] = field(default_factory=list)
+
+    @property
+    def n_coins(self) -> int:
+        return len(self.coins)
+
+
+class OnchainPoolReader:
+    """Multicall3批量读取器 - N个池子的完整状态只需一次eth_call"""
+
+    def __init__(self, rpc_url: str, multicall_address: str = MULTICALL3_ADDRESS,
+                 max_coins: int = ONCHAIN_MAX_COINS, timeout: float = RPC_TIMEOUT,
+                 rpc_cache: Optional[RpcResultCache] = None, use_cache: bool = True):
+        self.rpc_url = rpc_url
+        self.multicall_address = multicall_address
+        self.max_coins = max_coins
+        self.timeout = timeout
+        self._request_ids = itertools.count(1)
+
+        # 固定区块号的eth_call结果缓存 (默认使用进程内共享缓存)
+        self.call_cache = None
+        if use_cache:
+            self.call_cache = CachedRpcEndpoint(
+                rpc_url, self._rpc, rpc_cache if rpc_cache is not None else get_rpc_cache()
+            )
+
+    def _rpc(self, method: str, params: list, timeout: Optional[float] = None):
+        """发送JSON-RPC请求 (共享keep-alive会话)，timeout默认为 self.timeout，预算已耗尽 (<=0) 时直接失败"""
+
+        timeout = self.timeout if timeout is None else timeout
+        if timeout <= 0:
+            raise TimeoutError(f"{method}: 时间预算已耗尽")
+
+        payload = {'jsonrpc': '2.0', 'id': next(self._request_ids), 'method': method, 'params': params}
+        response = http_post(self.rpc_url, json=payload, timeout=timeout)
+        response.raise_for_status()
+
+        body = response.json()
+        if 'error' in body:
+            raise RuntimeError(f"JSON-RPC error: {body['error']}")
+        return body['result']
+
+    def eth_call(self, to: str, data: str, block: str = 'latest', timeout: Optional[float] = None) -> str:
+        params = [{'to': to, 'data': data}, block]
+
+        if self.call_cache is None:
+            return self._rpc('eth_call', params, timeout)
+
+        result = self.call_cache.lookup(params)
+        if result is None:
+            result = self._rpc('eth_call', params, timeout)
+            self.call_cache.store(params, result)
+        return result
+
+    def aggregate(self, calls: Sequence[Tuple[str, bytes]], block: str = 'latest',
+                  timeout: Optional[float] = None) -> List[Tuple[bool, bytes]]:
+        """执行一次Multicall3 aggregate3"""
+        return decode_aggregate3(self.eth_call(self.multicall_address, encode_aggregate3(calls), block, timeout))
+
+    def _pool_calls(self, address: str) -> List[Tuple[str, bytes]]:
+        """单个池子的子调用: virtual_price, totalSupply, 以及每个索引的coins/balances (uint256与int128两种签名)"""
+
+        calls = [
+            (address, encode_call(SELECTORS['get_virtual_price'])),
+            (address, encode_call(SELECTORS['totalSupply'])),
+        ]
+        for i in range(self.max_coins):
+            calls.extend([
+                (address, encode_call(SELECTORS['coins_uint256'], i)),
+                (address, encode_call(SELECTORS['coins_int128'], i)),
+                (address, encode_call(SELECTORS['balances_uint256'], i)),
+                (address, encode_call(SELECTORS['balances_int128'], i)),
+            ])
+        return calls
+
+    def _decode_pool(self, address: str, results: List[Tuple[bool, bytes]],
+                     block_number: int, block_timestamp: int) -> OnchainPoolState:
+        def value(index: int, decoder):
+            success, data = results[index]
+            return decoder(data) if success else None
+
+        state = OnchainPoolState(
+            address=address,
+            block_number=block_number,
+            block_timestamp=block_timestamp,
+            virtual_price=value(0, decode_uint),
+            total_supply=value(1, decode_uint),
+        )
+
+        for i in range(self.max_coins):
+            base = 2 + 4 * i
+            coin = value(base, decode_address) or value(base + 1, decode_address)
+            if coin is None:
+                break
+
+            balance = value(base + 2, decode_uint)
+            if balance is None:
+                balance = value(base + 3, decode_uint)
+
+            state.coins.append(coin)
+            state.balances.append(balance or 0)
+
+        return state
+
+    def read_pools(self, addresses: Sequence[str], block: str = 'latest',
+                   timeout: Optional[float] = None) -> Dict[str, OnchainPoolState]:
+        """
+        读取多个池子的完整状态 (同一区块)，返回 {地址: OnchainPoolState}
+        子调用数不超过 MULTICALL_MAX_CALLS 时只有一次eth_call
+        """
+
+        header = [
+            (self.multicall_address, encode_call(SELECTORS['getBlockNumber'])),
+            (self.multicall_address, encode_call(SELECTORS['getCurrentBlockTimestamp'])),
+        ]
+        calls = list(header)
+        spans = []
+        for address in addresses:
+            pool_calls = self._pool_calls(address)
+            spans.append((address, len(calls), len(pool_calls)))
+            calls.extend(pool_calls)
+
+        # 分块时第一块确定区块号，其余块固定在同一区块读取
+        results = self.aggregate(calls[:MULTICALL_MAX_CALLS], block, timeout)
+        block_number = decode_uint(results[0][1]) or 0
+        block_timestamp = decode_uint(results[1][1]) or 0
+
+        if block == 'latest' and self.call_cache is not None:
+            self.call_cache.observe_head(block_number)
+
+        pinned_block = hex(block_number) if block == 'latest' else block
+        for start in range(MULTICALL_MAX_CALLS, len(calls), MULTICALL_MAX_CALLS):
+            results.extend(self.aggregate(calls[start:start + MULTICALL_MAX_CALLS], pinned_block, timeout))
+
+        return {
+            address: self._decode_pool(address, results[offset:offset + length], block_number, block_timestamp)
+            for address, offset, length in spans
+        }
+
+    def read_pool(self, address: str, block: str = 'latest') -> OnchainPoolState:
+        """读取单个池子的完整状态 (一次eth_call)"""
+        return self.read_pools([address], block)[address]
+
+
+def _demo():
+    """读取 AVAILABLE_POOLS 中所有池子的链上状态 (一次eth_call)"""
+
+    import time
+    from config import Config
+    from free_historical_data import AVAILABLE_POOLS
+
+    rpc_url = Config.get_web3_provider_url()
+    if not rpc_url:
+        print("❌ 未配置Web3提供商 (设置 INFURA_API_KEY / ALCHEMY_API_KEY)")
+        return
+
+    reader = OnchainPoolReader(rpc_url)
+    addresses = {name: info['address'] for name, info in AVAILABLE_POOLS.items()}
+
+    start_time = time.perf_counter()
+    states = reader.read_pools(list(addresses.values()))
+    elapsed = time.perf_counter() - start_time
+
+    print(f"📦 {len(states)} 个池子, 区块 {next(iter(states.values())).block_number}, 耗时 {elapsed:.2f}s")
+    for name, address in addresses.items():
+        state = states[address]
+        vp = f"{state.virtual_price / 1e18:.6f}" if state.virtual_price else "N/A"
+        print(f"  {name:12} VP {vp:>10} | {state.n_coins} coins")
+
+
+if __name__ == "__main__":
+    _demo()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+紧凑的池子快照与列式批量容器
+PoolSnapshot: 带__slots__的单次快照 (代币为元组，余额/汇率为float64数组，时间戳为int64纳秒)
+PoolSnapshotBatch: 按列预分配、倍增扩容的NumPy缓冲区，累积多个快照后一次性转换为DataFrame / Arrow表
+数值列和时间戳列直接以视图交给pandas/pyarrow，不逐行构造对象、不复制数据
+列与 CurveDataManager 原先逐行生成的格式一致: 基本字段、{token}_balance/_rate、(≥3个代币时) {token}_ratio 和 max_imbalance
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+from real_data_collector import CurvePoolData
+
+# 批量容器配置
+SNAPSHOT_BATCH_CAPACITY = 64        # 初始容量 (行)，不足时倍增
+IMBALANCE_MIN_TOKENS = 3            # 代币数不少于此值时计算占比和不平衡度 (3Pool等)
+
+SNAPSHOT_STRING_COLUMNS = ('pool_address', 'pool_name')
+SNAPSHOT_FLOAT_COLUMNS = ('total_supply', 'virtual_price', 'volume_24h', 'fees_24h', 'apy')
+SNAPSHOT_BASE_COLUMNS = ('timestamp',) + SNAPSHOT_STRING_COLUMNS + SNAPSHOT_FLOAT_COLUMNS
+
+
+def _timestamp_ns(timestamp: Union[datetime, pd.Timestamp, int]) -> int:
+    """时间戳 → int64纳秒 (无时区的本地时间按墙上时间存储，与pandas一致)"""
+
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    return pd.Timestamp(timestamp).value
+
+
+class PoolSnapshot:
+    """单个池子在某一时刻的快照 (不可变的紧凑表示)"""
+
+    __slots__ = ('pool_address', 'pool_name', 'tokens', 'balances', 'rates',
+                 'total_supply', 'virtual_price', 'volume_24h', 'fees_24h', 'apy', 'timestamp_ns')
+
+    def __init__(self, pool_address: str, pool_name: str, tokens: Sequence[str],
+                 balances: Sequence[float], rates: Sequence[float], total_supply: float, virtual_price: float,
+                 volume_24h: float, fees_24h: float, apy: float, timestamp: Union[datetime, int]):
+        self.pool_address = pool_address
+        self.pool_name = pool_name
+        self.tokens = tuple(tokens)
+        self.balances = np.asarray(balances, dtype=np.float64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.total_supply = float(total_supply)
+        self.virtual_price = float(virtual_price)
+        self.volume_24h = float(volume_24h)
+        self.fees_24h = float(fees_24h)
+        self.apy = float(apy)
+        self.timestamp_ns = _timestamp_ns(timestamp)
+
+    @classmethod
+    def from_pool_data(cls, pool_data: CurvePoolData) -> 'PoolSnapshot':
+        return cls(pool_data.pool_address, pool_data.pool_name, pool_data.tokens,
+                   pool_data.balances, pool_data.rates, pool_data.total_supply, pool_data.virtual_price,
+                   pool_data.volume_24h, pool_data.fees_24h, pool_data.apy, pool_data.timestamp)
+
+    @property
+    def timestamp(self) -> datetime:
+        return pd.Timestamp(self.timestamp_ns).to_pydatetime()
+
+    def to_pool_data(self) -> CurvePoolData:
+        return CurvePoolData(
+            pool_address=self.pool_address,
+            pool_name=self.pool_name,
+            tokens=list(self.tokens),
+            balances=self.balances.tolist(),
+            rates=self.rates.tolist(),
+            total_supply=self.total_supply,
+            virtual_price=self.virtual_price,
+            volume_24h=self.volume_24h,
+            fees_24h=self.fees_24h,
+            apy=self.apy,
+            timestamp=self.timestamp
+        )
+
+    def __repr__(self) -> str:
+        return (f"PoolSnapshot({self.pool_name}, VP={self.virtual_price:.6f}, "
+                f"tokens={'/'.join(self.tokens)}, t={self.timestamp})")
+
+
+class PoolSnapshotBatch:
+    """
+    列式快照批量容器
+    每列一个预分配的NumPy数组，append只写入标量；代币相关列在首次出现时创建 (之前的行填NaN)
+    池子地址/名称按字典编码存储 (int32编码 + 去重后的字符串表)
+    """
+
+    def __init__(self, capacity: int = SNAPSHOT_BATCH_CAPACITY):
+        self._capacity = max(1, capacity)
+        self._allocate()
+
+    def _allocate(self):
+        self._size = 0
+        self._timestamps = np.empty(self._capacity, dtype=np.int64)
+        self._codes: Dict[str, np.ndarray] = {name: np.empty(self._capacity, dtype=np.int32)
+                                              for name in SNAPSHOT_STRING_COLUMNS}
+        self._categories: Dict[str, Dict[str, int]] = {name: {} for name in SNAPSHOT_STRING_COLUMNS}
+        self._floats: Dict[str, np.ndarray] = {name: np.empty(self._capacity, dtype=np.float64)
+                                               for name in SNAPSHOT_FLOAT_COLUMNS}
+        # 代币相关列 (按首次出现的顺序)
+        self._token_columns: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_pool_data(cls, pool_data: Iterable[Union[CurvePoolData, PoolSnapshot]]) -> 'PoolSnapshotBatch':
+        items = list(pool_data)
+        batch = cls(capacity=len(items))
+        batch.extend(items)
+        return batch
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """已分配的列缓冲区大小 (字节)"""
+
+        arrays = [self._timestamps, *self._codes.values(), *self._floats.values(), *self._token_columns.values()]
+        return sum(array.nbytes for array in arrays)
+
+    # ---------- 写入 ----------
+
+    def _grow(self, needed: int):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+
+        def resized(array: np.ndarray, fill=None) -> np.ndarray:
+            grown = np.empty(capacity, dtype=array.dtype) if fill is None else np.full(capacity, fill, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            return grown
+
+        self._timestamps = resized(self._timestamps)
+        self._codes = {name: resized(array) for name, array in self._codes.items()}
+        self._floats = {name: resized(array) for name, array in self._floats.items()}
+        self._token_columns = {name: resized(array, np.nan) for name, array in self._token_columns.items()}
+        self._capacity = capacity
+
+    def _token_column(self, name: str) -> np.ndarray:
+        column = self._token_columns.get(name)
+        if column is None:
+            column = self._token_columns[name] = np.full(self._capacity, np.nan)
+        return column
+
+    def _encode(self, name: str, value: str) -> int:
+        categories = self._categories[name]
+        code = categories.get(value)
+        if code is None:
+            code = categories[value] = len(categories)
+        return code
+
+    def append(self, snapshot: Union[CurvePoolData, PoolSnapshot]):
+        """追加一个快照 (也接受CurvePoolData)"""
+
+        if not isinstance(snapshot, PoolSnapshot):
+            snapshot = PoolSnapshot.from_pool_data(snapshot)
+
+        self._grow(self._size + 1)
+        row = self._size
+
+        self._timestamps[row] = snapshot.timestamp_ns
+        for name in SNAPSHOT_STRING_COLUMNS:
+            self._codes[name][row] = self._encode(name, getattr(snapshot, name))
+        for name in SNAPSHOT_FLOAT_COLUMNS:
+            self._floats[name][row] = getattr(snapshot, name)
+
+        tokens = [token.lower() for token in snapshot.tokens]
+        balances, rates = snapshot.balances, snapshot.rates
+
+        for token, balance, rate in zip(tokens, balances, rates):
+            self._token_column(f'{token}_balance')[row] = balance
+            self._token_column(f'{token}_rate')[row] = rate
+
+        # 占比和不平衡度
+        if len(balances) >= IMBALANCE_MIN_TOKENS:
+            total_balance = balances.sum()
+            ratios = balances / total_balance if total_balance > 0 else np.zeros_like(balances)
+            for token, ratio in zip(tokens, ratios):
+                self._token_column(f'{token}_ratio')[row] = ratio
+            imbalance = np.abs(ratios - 1.0 / len(balances)).max() if total_balance > 0 else 0.0
+            self._token_column('max_imbalance')[row] = imbalance
+
+        self._size += 1
+
+    def extend(self, snapshots: Iterable[Union[CurvePoolData, PoolSnapshot]]):
+        for snapshot in snapshots:
+            self.append(snapshot)
+
+    def clear(self):
+        """清空 (重新分配缓冲区，之前返回的DataFrame / Arrow表仍然有效)"""
+        self._allocate()
+
+    # ---------- 读取 ----------
+
+    def _ordered_token_columns(self) -> List[str]:
+        """代币列顺序: 余额/汇率在前，占比其次，max_imbalance最后 (与单行格式一致)"""
+
+        names = list(self._token_columns)
+        ratios = [name for name in names if name.endswith('_ratio')]
+        others = [name for name in names if not name.endswith('_ratio') and name != 'max_imbalance']
+        return others + ratios + (['max_imbalance'] if 'max_imbalance' in self._token_columns else [])
+
+    def _categorical(self, name: str) -> pd.Categorical:
+        return pd.Categorical.from_codes(self._codes[name][:self._size], list(self._categories[name]))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """转换为DataFrame (数值列与时间戳列为缓冲区视图，之后的append不会影响已返回的结果)"""
+
+        n = self._size
+        columns = {'timestamp': self._timestamps[:n].view('datetime64[ns]')}
+        for name in SNAPSHOT_STRING_COLUMNS:
+            columns[name] = self._categorical(name)
+        for name in SNAPSHOT_FLOAT_COLUMNS:
+            columns[name] = self._floats[name][:n]
+        for name in self._ordered_token_columns():
+            columns[name] = self._token_columns[name][:n]
+
+        # append只写入 [_size, capacity) 区间，已返回的视图不会被修改
+        return pd.DataFrame(columns, copy=False)
+
+    def to_arrow(self) -> 'pa.Table':
+        """转换为Arrow表 (数值列与时间戳列零拷贝，池子地址/名称为字典编码列)"""
+
+        if not ARROW_AVAILABLE:
+            raise ImportError("pyarrow not available. Install with: pip install pyarrow")
+
+        n = self._size
+        arrays = {'timestamp': pa.array(self._timestamps[:n].view('datetime64[ns]'))}
+        for name in SNAPSHOT_STRING_COLUMNS:
+            arrays[name] = pa.DictionaryArray.from_arrays(
+                pa.array(self._codes[name][:n]), pa.array(list(self._categories[name]), type=pa.string())
+            )
+        for name in SNAPSHOT_FLOAT_COLUMNS:
+            arrays[name] = pa.array(self._floats[name][:n])
+        for name in self._ordered_token_columns():
+            arrays[name] = pa.array(self._token_columns[name][:n])
+
+        return pa.table(arrays)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+CoinGecko价格预言机
+合并一次收集中所有池子的代币，每个TTL窗口只发一次批量 simple/price 请求
+价格缓存在内存和磁盘中，并提供每个代币的数据新鲜度
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from circuit_breaker import SOURCE_COINGECKO, get_circuit_breaker
+from config import Config
+from http_session import http_get
+
+# 价格配置
+COINGECKO_BASE = "https://api.coingecko.com/api/v3"
+PRICE_TTL_SECONDS = 300         # 价格有效期 (秒)
+PRICE_TIMEOUT = 10
+PRICE_CACHE_PATH = Path("curve_data") / "price_cache.json"
+
+# 代币symbol → CoinGecko id (不在表中的0x地址按合约地址查询)
+COINGECKO_IDS = {
+    'USDC': 'usd-coin',
+    'USDT': 'tether',
+    'DAI': 'dai',
+    'FRAX': 'frax',
+    'MIM': 'magic-internet-money',
+    'LUSD': 'liquity-usd',
+    'SUSD': 'nusd',
+    'BUSD': 'binance-usd',
+    'TUSD': 'true-usd',
+    'USDP': 'paxos-standard',
+    'PAX': 'paxos-standard',
+    'GUSD': 'gemini-dollar',
+    'HUSD': 'husd',
+    'USDN': 'neutrino',
+    'MUSD': 'musd',
+    'DUSD': 'defidollar',
+    'RSV': 'reserve',
+    'EURS': 'stasis-eurs',
+    'SEUR': 'seur',
+    'LINK': 'chainlink',
+    'SLINK': 'slink',
+    'ETH': 'ethereum',
+    'WETH': 'weth',
+    'STETH': 'staked-ether',
+    'RETH': 'rocket-pool-eth',
+    'ANKRETH': 'ankreth',
+    'SETH': 'seth',
+    'WBTC': 'wrapped-bitcoin',
+    'RENBTC': 'renbtc',
+    'SBTC': 'sbtc',
+    'HBTC': 'huobi-btc',
+    'TBTC': 'tbtc',
+    'OBTC': 'boringdao-btc',
+    'PBTC': 'ptokens-btc',
+    'BBTC': 'binance-wrapped-btc',
+    '3CRV': 'lp-3pool-curve',
+    'CRV': 'curve-dao-token',
+}
+
+
+def _token_key(token: str) -> str:
+    """地址统一小写，symbol统一大写"""
+    return token.lower() if token.startswith('0x') else token.upper()
+
+
+class PriceOracle:
+    """CoinGecko批量价格缓存 - 同一TTL窗口内所有池子共享一次请求"""
+
+    def __init__(self, ttl: float = PRICE_TTL_SECONDS, cache_path: Optional[Union[str, Path]] = PRICE_CACHE_PATH):
+        self.ttl = ttl
+        self.cache_path = Path(cache_path) if cache_path else None
+
+        self._prices: Dict[str, Tuple[float, float]] = {}   # key → (价格USD, 获取时间epoch)
+        self._misses: Dict[str, float] = {}                  # CoinGecko未返回价格的key → 查询时间 (TTL内不再请求)
+        self.breaker = get_circuit_breaker(SOURCE_COINGECKO)   # 请求失败后冷却，避免逐池重试
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def _load(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return
+
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self._prices = {key: (entry['usd'], entry['fetched_at']) for key, entry in json.load(f).items()}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️  价格缓存读取失败: {str(e)[:100]}...")
+
+    def _save(self):
+        if not self.cache_path:
+            return
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({key: {'usd': price, 'fetched_at': fetched_at}
+                       for key, (price, fetched_at) in sorted(self._prices.items())}, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def staleness(self, token: str) -> Optional[float]:
+        """代币价格距上次获取的秒数，从未获取时返回None"""
+
+        entry = self._prices.get(_token_key(token))
+        return time.time() - entry[1] if entry else None
+
+    def staleness_report(self) -> Dict[str, float]:
+        now = time.time()
+        return {key: now - fetched_at for key, (_, fetched_at) in sorted(self._prices.items())}
+
+    def _stale_keys(self, keys: Iterable[str]) -> List[str]:
+        now = time.time()
+        stale = {key for key in keys if key not in self._prices or now - self._prices[key][1] >= self.ttl}
+        # 最近查询过但CoinGecko没有价格的代币 (负缓存)，TTL内跳过
+        return sorted(key for key in stale if now - self._misses.get(key, float('-inf')) >= self.ttl)
+
+    def _request(self, path: str, params: Dict) -> Dict:
+        headers = {}
+        if Config.API_KEYS.get('COINGECKO_API_KEY'):
+            headers['x-cg-demo-api-key'] = Config.API_KEYS['COINGECKO_API_KEY']
+
+        response = http_get(f"{COINGECKO_BASE}{path}", params=params, headers=headers, timeout=PRICE_TIMEOUT)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return response.json()
+
+    def _fetch(self, keys: List[str]) -> int:
+        """批量获取价格: symbol走 simple/price，合约地址走 simple/token_price (各一次请求)"""
+
+        fetched_at = time.time()
+        updated = 0
+
+        symbols = {key: COINGECKO_IDS[key] for key in keys if key in COINGECKO_IDS}
+        addresses = [key for key in keys if key.startswith('0x')]
+
+        if symbols:
+            data = self._request('/simple/price', {'ids': ','.join(sorted(set(symbols.values()))),
+                                                   'vs_currencies': 'usd'})
+            for key, coin_id in symbols.items():
+                if 'usd' in data.get(coin_id, {}):
+                    self._prices[key] = (float(data[coin_id]['usd']), fetched_at)
+                    updated += 1
+
+        if addresses:
+            data = self._request('/simple/token_price/ethereum', {'contract_addresses': ','.join(addresses),
+                                                                 'vs_currencies': 'usd'})
+            data = {address.lower(): value for address, value in data.items()}
+            for key in addresses:
+                if 'usd' in data.get(key, {}):
+                    self._prices[key] = (float(data[key]['usd']), fetched_at)
+                    updated += 1
+
+        # 请求成功但没有返回价格的代币记为负缓存
+        for key in keys:
+            if key in self._prices and self._prices[key][1] == fetched_at:
+                self._misses.pop(key, None)
+            else:
+                self._misses[key] = fetched_at
+
+        return updated
+
+    def prefetch(self, tokens: Iterable[str]) -> int:
+        """刷新一批代币中已过期或缺失的价格 (一次收集的全部代币并集)，返回更新数量"""
+
+        # 没有CoinGecko id的symbol无法查询，直接跳过
+        keys = {_token_key(token) for token in tokens if token}
+        keys = {key for key in keys if key in COINGECKO_IDS or key.startswith('0x')}
+
+        with self._lock:
+            stale = self._stale_keys(keys)
+            if not stale:
+                return 0
+
+            # 熔断期间暂不重试，继续使用旧价格
+            if not self.breaker.allow():
+                return 0
+
+            try:
+                updated = self._fetch(stale)
+                self.breaker.record_success()
+            except Exception as e:
+                self.breaker.record_failure()
+                print(f"Error fetching CoinGecko prices: {str(e)[:100]}")
+                return 0
+
+            if updated:
+                self._save()
+            return updated
+
+    def get_prices(self, tokens: Iterable[str]) -> Dict[str, float]:
+        """返回 {token: 价格USD}，过期时先批量刷新；刷新失败时返回旧价格"""
+
+        tokens = [token for token in tokens if token]
+        self.prefetch(tokens)
+
+        result = {}
+        for token in tokens:
+            entry = self._prices.get(_token_key(token))
+            if entry is not None:
+                result[token] = entry[0]
+        return result
+
+
+_shared_oracle: Optional[PriceOracle] = None
+_shared_oracle_lock = threading.Lock()
+
+
+def get_price_oracle() -> PriceOracle:
+    """获取进程内共享的价格预言机"""
+
+    global _shared_oracle
+
+    if _shared_oracle is None:
+        with _shared_oracle_lock:
+            if _shared_oracle is None:
+                _shared_oracle = PriceOracle()
+
+    return _shared_oracle
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+按主机的令牌桶限流器
+每个数据源按自身限额发送请求，429/Retry-After 会暂停该主机的所有请求，失败重试使用带抖动的指数退避
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# 各主机限额: (每秒请求数, 突发容量)
+HOST_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    'api.curve.fi': (5.0, 10),
+    'yields.llama.fi': (5.0, 10),
+    'coins.llama.fi': (5.0, 10),
+    'api.coingecko.com': (0.5, 5),      # 免费版约30次/分钟
+    'api.thegraph.com': (2.0, 5),
+}
+DEFAULT_RATE_LIMIT: Tuple[float, float] = (10.0, 20)
+
+# 退避配置
+BACKOFF_BASE = 0.5              # 首次重试的最大等待 (秒)
+BACKOFF_CAP = 30.0              # 单次等待上限 (秒)
+RATE_LIMITED_STATUS = (429, 503)
+DEFAULT_RETRY_AFTER = 5.0       # 429响应没有Retry-After时的暂停时间 (秒)
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """带完全抖动的指数退避: uniform(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After头 (秒数或HTTP日期)，返回等待秒数"""
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """令牌桶 - 预约式，令牌可以透支，透支部分转换为调用方的等待时间"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数"""
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def block_for(self, seconds: float):
+        """暂停该桶 (Retry-After)，并清空已积累的令牌"""
+
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = now
+
+
+class RateLimiter:
+    """按主机分配令牌桶的共享限流器"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default: Tuple[float, float] = DEFAULT_RATE_LIMIT):
+        self.limits = dict(HOST_RATE_LIMITS if limits is None else limits)
+        self.default = default
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc.lower()
+        bucket = self._buckets.get(host)
+
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    rate, capacity = self.limits.get(host, self.default)
+                    bucket = TokenBucket(rate, capacity)
+                    self._buckets[host] = bucket
+
+        return bucket
+
+    def acquire(self, url: str) -> float:
+        """阻塞直到可以向该主机发送请求，返回实际等待秒数"""
+
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        """acquire 的asyncio版本"""
+
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def observe(self, url: str, status: int, retry_after: Optional[str] = None) -> bool:
+        """记录响应，被限流时暂停该主机，返回是否被限流"""
+
+        if status not in RATE_LIMITED_STATUS:
+            return False
+
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            if status != 429:
+                return False
+            delay = DEFAULT_RETRY_AFTER
+
+        self.bucket(url).block_for(min(delay, BACKOFF_CAP * 4))
+        print(f"🚦 {urlparse(url).netloc} 限流 (HTTP {status})，暂停 {delay:.1f}s")
+        return True
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取进程内共享的限流器"""
+
+    global _shared_limiter
+
+    if _shared_limiter is None:
+        with _shared_limiter_lock:
+            if _shared_limiter is None:
+                _shared_limiter = RateLimiter()
+
+    return _shared_limiter
@@ -5,15 +5,34 @@ Curve真实数据获取模块
 添加SSL错误处理和超时机制
 """
 
+import copy
 import requests
 import json
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from pathlib import Path
 import urllib3
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_store import HistoricalCacheStore
+from circuit_breaker import (
+    Deadline, get_circuit_breaker, SOURCE_CURVE_API, SOURCE_DEFILLAMA, SOURCE_ONCHAIN
+)
+from curve_registry import get_curve_registry
+from defillama_index import get_defillama_index
+from event_log_ingestion import event_volume_24h
+from price_oracle import get_price_oracle
+from rate_limiter import backoff_delay
+from request_hedging import HEDGE_ENABLED, get_latency_tracker, hedged_call
+from single_flight import SingleFlightTimeout, get_single_flight
+from http_cache import OfflineCacheMiss
+from http_session import get_session, http_post, http_request
+from onchain_reader import OnchainPoolReader, OnchainPoolState
+from token_metadata import TokenMetadata, get_token_metadata_cache
 
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -22,10 +41,14 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 DEFAULT_TIMEOUT = 5
 DEFAULT_VERIFY_SSL = False  # 🔧 默认禁用SSL验证避免证书错误
 MAX_RETRIES = 3
-RETRY_DELAY = 1
+RETRY_DELAY = 1  # 指数退避的基准延迟 (秒)
+REAL_TIME_DEADLINE = 20  # get_real_time_data 整条备用链的时间预算 (秒)，超出后直接使用合成数据
+HEDGE_MAX_WORKERS = 4    # 对冲模式的线程数 (主数据源 + 备用数据源)
+EVENT_CACHE_DIR = "free_historical_cache"  # 事件日志采集的缓存目录 (event_log_ingestion 写入)
 
 try:
     from web3 import Web3
+    from rpc_cache import CachingHTTPProvider  # 固定区块的eth_call结果缓存
     from web3.contract import Contract
     WEB3_AVAILABLE = True
 except ImportError:
@@ -50,9 +73,15 @@ class CurvePoolData:
 class CurveRealDataCollector:
     """Curve真实数据收集器 - 优化版"""
     
-    def __init__(self, web3_provider_url: Optional[str] = None):
+    def __init__(self, web3_provider_url: Optional[str] = None, hedged: bool = HEDGE_ENABLED,
+                 event_cache_dir: str = EVENT_CACHE_DIR):
         self.web3_provider_url = web3_provider_url
         
+        # 对冲模式: Curve API 超过其分位延迟仍未返回时并发直读链上
+        self.hedged = hedged
+        self.latency = get_latency_tracker()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        
         # API端点
         self.curve_api_base = "https://api.curve.fi"
         self.defillama_base = "https://yields.llama.fi"
@@ -66,9 +95,18 @@ class CurveRealDataCollector:
         self.verify_ssl = DEFAULT_VERIFY_SSL
         self.max_retries = MAX_RETRIES
         
+        # Curve注册表快照和DefiLlama索引 (进程内共享)
+        self.registry = get_curve_registry()
+        self.defillama = get_defillama_index()
+        self.price_oracle = get_price_oracle()
+        
+        # 事件日志采集的小时交易量 (event_log_ingestion 写入)，首次使用时才打开
+        self.event_cache_dir = event_cache_dir
+        self._event_store: Optional[HistoricalCacheStore] = None
+        
         # Web3连接
         if WEB3_AVAILABLE and web3_provider_url:
-            self.w3 = Web3(Web3.HTTPProvider(web3_provider_url))
+            self.w3 = Web3(CachingHTTPProvider(web3_provider_url, session=get_session(web3_provider_url)))
             if self.w3.is_connected():
                 print(f"✅ Web3 connected to {web3_provider_url}")
             else:
@@ -77,6 +115,12 @@ class CurveRealDataCollector:
         else:
             self.w3 = None
         
+        # 链上批量读取 (Multicall3 JSON-RPC，不依赖web3)
+        self.onchain_reader = OnchainPoolReader(web3_provider_url) if web3_provider_url else None
+        
+        # 代币元数据缓存 (进程内共享，持久化到磁盘)
+        self.token_metadata = get_token_metadata_cache()
+        
         # 常用池子地址
         self.pool_addresses = {
             '3pool': '0xbEbc44782C7dB0a1A60Cb6fe97d0b483032FF1C7',
@@ -85,34 +129,43 @@ class CurveRealDataCollector:
             'lusd': '0xEd279fDD11cA84bEef15AF5D39BB4d4bEE23F0cA'
         }
     
-    def _make_request(self, url: str, method: str = 'GET', **kwargs) -> Optional[requests.Response]:
-        """统一的HTTP请求方法，包含错误处理和重试"""
+    def _make_request(self, url: str, method: str = 'GET', deadline: Optional[Deadline] = None,
+                      **kwargs) -> Optional[requests.Response]:
+        """统一的HTTP请求方法，包含错误处理和重试 (提供deadline时超时和退避不超出剩余预算)"""
         
         # 设置默认参数
-        kwargs.setdefault('timeout', self.timeout)
+        timeout = kwargs.pop('timeout', self.timeout)
         kwargs.setdefault('verify', self.verify_ssl)
         
+        if method.upper() not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported method: {method}")
+        
         for attempt in range(self.max_retries):
+            if deadline is not None and deadline.expired():
+                print(f"⏰ 超出时间预算 {deadline.seconds}s，放弃请求 {url}")
+                break
+            
             try:
-                if method.upper() == 'GET':
-                    response = requests.get(url, **kwargs)
-                elif method.upper() == 'POST':
-                    response = requests.post(url, **kwargs)
-                else:
-                    raise ValueError(f"Unsupported method: {method}")
+                # 共享会话 (keep-alive连接池 + 按主机限流)
+                request_timeout = deadline.clamp(timeout) if deadline is not None else timeout
+                response = http_request(method, url, timeout=request_timeout, **kwargs)
                 
                 if response.status_code == 200:
                     return response
                 else:
                     print(f"⚠️  HTTP {response.status_code} from {url}")
                     
+            except OfflineCacheMiss as e:
+                print(f"📴 {e}")
+                return None
+                
             except requests.exceptions.SSLError as e:
                 print(f"❌ SSL错误 (尝试 {attempt + 1}/{self.max_retries}): {str(e)[:100]}...")
                 if attempt == self.max_retries - 1:
                     print("💡 建议: 设置 ENABLE_SSL_VERIFICATION = False")
                     
             except requests.exceptions.Timeout as e:
-                print(f"⏰ 超时错误 (尝试 {attempt + 1}/{self.max_retries}): {self.timeout}s")
+                print(f"⏰ 超时错误 (尝试 {attempt + 1}/{self.max_retries}): {request_timeout:.1f}s")
                 
             except requests.exceptions.ConnectionError as e:
                 print(f"🔌 连接错误 (尝试 {attempt + 1}/{self.max_retries}): {str(e)[:100]}...")
@@ -121,60 +174,73 @@ class CurveRealDataCollector:
                 print(f"❌ 请求失败 (尝试 {attempt + 1}/{self.max_retries}): {str(e)[:100]}...")
             
             if attempt < self.max_retries - 1:
-                time.sleep(RETRY_DELAY * (attempt + 1))  # 递增延迟
+                delay = backoff_delay(attempt, base=RETRY_DELAY)  # 带抖动的指数退避
+                time.sleep(deadline.clamp(delay) if deadline is not None else delay)
         
         return None
     
-    def get_curve_api_data(self, pool_name: str = '3pool') -> Optional[CurvePoolData]:
+    @staticmethod
+    def _parse_registry_pool(target_pool: Dict) -> CurvePoolData:
+        """将Curve注册表中的池子条目解析为CurvePoolData"""
+        
+        tokens = [coin['symbol'] for coin in target_pool['coins']]
+        balances = [float(coin['poolBalance']) / (10 ** int(coin['decimals'])) 
+                   for coin in target_pool['coins']]
+        rates = [float(coin.get('rate', 1.0)) for coin in target_pool['coins']]
+        
+        return CurvePoolData(
+            pool_address=target_pool['address'],
+            pool_name=target_pool['name'],
+            tokens=tokens,
+            balances=balances,
+            rates=rates,
+            total_supply=float(target_pool.get('totalSupply', 0)) / 1e18,
+            virtual_price=float(target_pool.get('virtualPrice', 1.0)) / 1e18,
+            volume_24h=float(target_pool.get('volumeUSD', 0)),
+            fees_24h=float(target_pool.get('totalFees24h', 0)),
+            apy=float(target_pool.get('latestDailyApy', 0)) / 100,
+            timestamp=datetime.now()
+        )
+    
+    def _refresh_shared(self, snapshot, source: str, deadline: Optional[Deadline] = None) -> bool:
+        """刷新共享快照/索引 (注册表或DefiLlama)，数据源熔断时跳过下载，返回是否有可用数据"""
+        
+        if snapshot.is_fresh():
+            return True
+        
+        breaker = get_circuit_breaker(source)
+        if not breaker.allow():
+            print(f"⚡ {source} 熔断中 ({breaker.retry_in():.0f}s 后重试)，跳过刷新")
+            # 熔断期间继续使用旧数据 (如果有)
+            return bool(snapshot.pools())
+        
+        available = snapshot.ensure_fresh(fetch=lambda url: self._make_request(url, deadline=deadline))
+        
+        # 刷新失败时快照可能仍返回旧数据，以是否已更新为准
+        if snapshot.is_fresh():
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        return available
+    
+    def get_curve_api_data(self, pool_name: str = '3pool',
+                           deadline: Optional[Deadline] = None) -> Optional[CurvePoolData]:
         """从Curve官方API获取数据 - 优化版"""
         
         try:
-            # 获取所有池子信息
-            url = f"{self.curve_api_base}/api/getPools/ethereum/main"
-            response = self._make_request(url)
-            
-            if not response:
+            # 共享注册表快照 (TTL内不会重复下载)
+            if not self._refresh_shared(self.registry, SOURCE_CURVE_API, deadline):
                 print(f"❌ 无法连接到Curve API")
                 return None
             
-            pools_data = response.json()
-            
-            if 'data' not in pools_data or 'poolData' not in pools_data['data']:
-                print(f"❌ Curve API响应格式异常")
-                return None
-            
             # 查找目标池子
-            target_pool = None
-            for pool in pools_data['data']['poolData']:
-                if (pool_name.lower() in pool['name'].lower() or 
-                    pool_name in self.pool_addresses and 
-                    pool['address'].lower() == self.pool_addresses[pool_name].lower()):
-                    target_pool = pool
-                    break
+            target_pool = self.registry.find(pool_name, self.pool_addresses.get(pool_name))
             
             if not target_pool:
                 print(f"❌ 池子 {pool_name} 未在Curve API中找到")
                 return None
             
-            # 解析数据
-            tokens = [coin['symbol'] for coin in target_pool['coins']]
-            balances = [float(coin['poolBalance']) / (10 ** int(coin['decimals'])) 
-                       for coin in target_pool['coins']]
-            rates = [float(coin.get('rate', 1.0)) for coin in target_pool['coins']]
-            
-            return CurvePoolData(
-                pool_address=target_pool['address'],
-                pool_name=target_pool['name'],
-                tokens=tokens,
-                balances=balances,
-                rates=rates,
-                total_supply=float(target_pool.get('totalSupply', 0)) / 1e18,
-                virtual_price=float(target_pool.get('virtualPrice', 1.0)) / 1e18,
-                volume_24h=float(target_pool.get('volumeUSD', 0)),
-                fees_24h=float(target_pool.get('totalFees24h', 0)),
-                apy=float(target_pool.get('latestDailyApy', 0)) / 100,
-                timestamp=datetime.now()
-            )
+            return self._parse_registry_pool(target_pool)
             
         except KeyError as e:
             print(f"❌ Curve API数据格式错误: {e}")
@@ -183,68 +249,46 @@ class CurveRealDataCollector:
             print(f"❌ Curve API获取失败: {str(e)[:100]}...")
             return None
     
-    def get_defillama_apy(self, pool_address: str) -> Optional[float]:
-        """从DefiLlama获取APY数据"""
+    def get_defillama_apy(self, pool_address: str, deadline: Optional[Deadline] = None) -> Optional[float]:
+        """从DefiLlama获取APY数据 (共享索引，TTL内不会重复下载全量列表)"""
         
         try:
-            response = requests.get(f"{self.defillama_base}/pools", timeout=10)
-            
-            if response.status_code != 200:
+            if not self._refresh_shared(self.defillama, SOURCE_DEFILLAMA, deadline):
                 return None
             
-            pools = response.json()['data']
-            
-            for pool in pools:
-                if pool.get('pool', '').lower() == pool_address.lower():
-                    return pool.get('apy', 0) / 100
-            
-            return None
+            return self.defillama.apy(pool_address)
             
         except Exception as e:
             print(f"Error fetching DefiLlama data: {e}")
             return None
     
     def get_coingecko_prices(self, tokens: List[str]) -> Dict[str, float]:
-        """从CoinGecko获取代币价格"""
+        """从CoinGecko获取代币价格 (共享价格缓存，TTL内不会重复请求)"""
         
         try:
-            # Token ID映射
-            token_ids = {
-                'USDC': 'usd-coin',
-                'USDT': 'tether',
-                'DAI': 'dai',
-                'FRAX': 'frax',
-                'MIM': 'magic-internet-money',
-                'LUSD': 'liquity-usd'
-            }
-            
-            ids = [token_ids.get(token.upper(), token.lower()) for token in tokens]
-            ids_str = ','.join(ids)
-            
-            response = requests.get(
-                f"{self.coingecko_base}/simple/price",
-                params={'ids': ids_str, 'vs_currencies': 'usd'},
-                timeout=10
-            )
-            
-            if response.status_code != 200:
-                return {}
-            
-            prices_data = response.json()
-            
-            # 转换回token symbol格式
-            result = {}
-            for i, token in enumerate(tokens):
-                token_id = ids[i]
-                if token_id in prices_data:
-                    result[token] = prices_data[token_id]['usd']
-            
-            return result
-            
+            return self.price_oracle.get_prices(tokens)
         except Exception as e:
             print(f"Error fetching CoinGecko prices: {e}")
             return {}
     
+    def prefetch_prices(self, pool_names: Iterable[str]) -> int:
+        """一轮收集开始前按注册表中各池子代币的并集批量获取价格，之后逐池查询直接命中缓存"""
+        
+        try:
+            if not self._refresh_shared(self.registry, SOURCE_CURVE_API):
+                return 0
+            
+            tokens = set()
+            for pool_name in pool_names:
+                target_pool = self.registry.find(pool_name, self.pool_addresses.get(pool_name))
+                if target_pool:
+                    tokens.update(coin['symbol'] for coin in target_pool.get('coins', []))
+            
+            return self.price_oracle.prefetch(tokens) if tokens else 0
+        except Exception as e:
+            print(f"Error prefetching CoinGecko prices: {str(e)[:100]}")
+            return 0
+    
     def query_subgraph(self, pool_address: str, days: int = 7) -> Optional[pd.DataFrame]:
         """从The Graph子图查询历史数据"""
         
@@ -274,7 +318,7 @@ class CurveRealDataCollector:
         """ % (pool_address.lower(), days)
         
         try:
-            response = requests.post(
+            response = http_post(
                 self.curve_subgraph,
                 json={'query': query},
                 timeout=15
@@ -327,90 +371,106 @@ class CurveRealDataCollector:
             print(f"Error querying subgraph: {e}")
             return None
     
-    def get_onchain_data(self, pool_address: str) -> Optional[CurvePoolData]:
-        """直接从区块链读取数据"""
+    def get_onchain_data(self, pool_address: str, block: str = 'latest',
+                         deadline: Optional[Deadline] = None) -> Optional[CurvePoolData]:
+        """直接从区块链读取数据 (Multicall3，一次eth_call读取全部代币)"""
         
-        if not self.w3:
-            print("Web3 not connected")
-            return None
+        results = self.get_onchain_data_many({self._pool_name_for(pool_address): pool_address}, block, deadline)
+        return next(iter(results.values()), None)
+    
+    def get_onchain_data_many(self, pools: Optional[Dict[str, str]] = None,
+                              block: str = 'latest',
+                              deadline: Optional[Deadline] = None) -> Dict[str, CurvePoolData]:
+        """
+        批量读取多个池子的链上数据 (同一区块，一次eth_call)
+        pools: {池子名称: 地址}，默认为 self.pool_addresses
+        """
+        
+        if not self.onchain_reader:
+            print("Web3 provider not configured")
+            return {}
         
-        # Curve池通用ABI（简化版）
-        pool_abi = [
-            {
-                "name": "balances",
-                "outputs": [{"type": "uint256", "name": ""}],
-                "inputs": [{"type": "uint256", "name": "i"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "name": "coins",
-                "outputs": [{"type": "address", "name": ""}],
-                "inputs": [{"type": "uint256", "name": "arg0"}],
-                "stateMutability": "view", 
-                "type": "function"
-            },
-            {
-                "name": "get_virtual_price",
-                "outputs": [{"type": "uint256", "name": ""}],
-                "inputs": [],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "name": "totalSupply",
-                "outputs": [{"type": "uint256", "name": ""}],
-                "inputs": [],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+        pools = pools or self.pool_addresses
         
+        breaker = get_circuit_breaker(SOURCE_ONCHAIN)
+        if not breaker.allow():
+            print(f"⚡ {SOURCE_ONCHAIN} 熔断中 ({breaker.retry_in():.0f}s 后重试)，跳过链上读取")
+            return {}
+        
+        timeout = deadline.clamp(self.onchain_reader.timeout) if deadline is not None else None
         try:
-            # 创建合约实例
-            contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(pool_address),
-                abi=pool_abi
-            )
-            
-            # 读取基本信息
-            virtual_price = contract.functions.get_virtual_price().call() / 1e18
-            total_supply = contract.functions.totalSupply().call() / 1e18
-            
-            # 读取余额和代币信息
-            balances = []
-            tokens = []
-            
-            for i in range(3):  # 假设最多3个代币
-                try:
-                    balance = contract.functions.balances(i).call()
-                    coin_address = contract.functions.coins(i).call()
-                    
-                    # 这里需要根据代币地址获取symbol和decimals
-                    # 简化处理，假设都是18位精度
-                    balances.append(balance / 1e18)
-                    tokens.append(f"Token{i}")  # 需要实际获取symbol
-                    
-                except:
-                    break
-            
-            return CurvePoolData(
-                pool_address=pool_address,
-                pool_name="Unknown",
-                tokens=tokens,
-                balances=balances,
-                rates=[1.0] * len(tokens),  # 需要实际计算
-                total_supply=total_supply,
-                virtual_price=virtual_price,
-                volume_24h=0.0,  # 需要从事件日志计算
-                fees_24h=0.0,
-                apy=0.0,
-                timestamp=datetime.now()
-            )
-            
+            states = self.onchain_reader.read_pools(list(pools.values()), block, timeout)
+            breaker.record_success()
         except Exception as e:
+            breaker.record_failure()
             print(f"Error reading on-chain data: {e}")
-            return None
+            return {}
+        
+        # 代币symbol/decimals (缓存预热后无额外RPC)
+        coins = [coin for state in states.values() for coin in state.coins]
+        metadata = self.token_metadata.resolve(coins, self.registry, self.onchain_reader)
+        
+        event_store = self.event_store
+        
+        results = {}
+        for pool_name, pool_address in pools.items():
+            state = states[pool_address]
+            if state.virtual_price is None or not state.coins:
+                print(f"⚠️  {pool_name}: 链上读取失败 (非Curve池或不支持的接口)")
+                continue
+            results[pool_name] = self._onchain_state_to_pool_data(pool_name, state, metadata)
+            
+            # 事件日志已采集到最近时，填入真实的24小时交易量和手续费
+            volume = event_volume_24h(event_store, pool_name) if event_store else None
+            if volume is not None:
+                results[pool_name].volume_24h, results[pool_name].fees_24h = volume
+        
+        return results
+    
+    @property
+    def event_store(self) -> Optional[HistoricalCacheStore]:
+        """事件日志缓存 (目录不存在说明从未采集过事件日志，返回None，不在当前目录创建缓存)"""
+        
+        if self._event_store is None and Path(self.event_cache_dir).is_dir():
+            self._event_store = HistoricalCacheStore(self.event_cache_dir)
+        return self._event_store
+    
+    def _pool_name_for(self, pool_address: str) -> str:
+        for pool_name, address in self.pool_addresses.items():
+            if address.lower() == pool_address.lower():
+                return pool_name
+        return "Unknown"
+    
+    @staticmethod
+    def _onchain_state_to_pool_data(pool_name: str, state: OnchainPoolState,
+                                    metadata: Dict[str, TokenMetadata]) -> CurvePoolData:
+        """将链上原始状态转换为CurvePoolData (按代币decimals缩放余额)"""
+        
+        tokens = []
+        balances = []
+        for i, (coin, balance) in enumerate(zip(state.coins, state.balances)):
+            token = metadata.get(coin)
+            if token is None:
+                # 元数据缺失时退回18位精度
+                tokens.append(f"Token{i}")
+                balances.append(balance / 1e18)
+            else:
+                tokens.append(token.symbol)
+                balances.append(balance / (10 ** token.decimals))
+        
+        return CurvePoolData(
+            pool_address=state.address,
+            pool_name=pool_name,
+            tokens=tokens,
+            balances=balances,
+            rates=[1.0] * state.n_coins,  # 需要实际计算
+            total_supply=(state.total_supply or 0) / 1e18,
+            virtual_price=state.virtual_price / 1e18,
+            volume_24h=0.0,  # 由事件日志采集填入 (event_log_ingestion)
+            fees_24h=0.0,
+            apy=0.0,
+            timestamp=datetime.fromtimestamp(state.block_timestamp) if state.block_timestamp else datetime.now()
+        )
     
     def get_historical_data(self, pool_name: str = '3pool', days: int = 30) -> pd.DataFrame:
         """获取历史数据的综合方法"""
@@ -474,33 +534,63 @@ class CurveRealDataCollector:
         print(f"✅ Generated {len(df)} synthetic historical records")
         return df
     
-    def get_real_time_data(self, pool_name: str = '3pool') -> Optional[CurvePoolData]:
-        """获取实时数据的综合方法 - 优化版"""
-        
+    def get_real_time_data(self, pool_name: str = '3pool',
+                           deadline: Optional[float] = REAL_TIME_DEADLINE) -> Optional[CurvePoolData]:
+        """
+        获取实时数据的综合方法 - 优化版
+        deadline: 整条备用链的时间预算 (秒)，None表示不限制；熔断中的数据源直接跳过
+        同一池子的并发调用 (进程内任意收集器实例、任意线程) 合并为一次获取，共享调用方得到结果的副本
+        只合并对冲模式和时间预算都相同的调用；加入进行中调用的等待同样受预算限制，超时后使用合成数据
+        """
+        
+        budget = Deadline(deadline)
+        try:
+            data, shared = get_single_flight().do(
+                ('real_time_data', self.web3_provider_url, self.hedged, deadline, pool_name),
+                lambda: self._get_real_time_data(pool_name, deadline),
+                timeout=budget.remaining()
+            )
+        except SingleFlightTimeout:
+            print(f"⏰ 等待进行中的 {pool_name} 请求超出时间预算 {deadline}s，生成合成数据...")
+            return self._generate_synthetic_pool_data(pool_name)
+        return copy.deepcopy(data) if shared else data
+    
+    def _get_real_time_data(self, pool_name: str, deadline: Optional[float]) -> Optional[CurvePoolData]:
         print(f"Fetching real-time data for {pool_name}...")
+        budget = Deadline(deadline)
+        pool_address = self.pool_addresses.get(pool_name)
+        
+        # 对冲模式只在注册表需要下载时生效 (快照命中时Curve API没有网络延迟)
+        if self.hedged and self.onchain_reader and pool_address and not self.registry.is_fresh():
+            data, source = self._get_real_time_data_hedged(pool_name, pool_address, budget)
+            if data:
+                print(f"✅ Got data from {source} (hedged)")
+                return data
+            print("⚠️  所有真实数据源失败，生成合成数据...")
+            return self._generate_synthetic_pool_data(pool_name)
         
         # 方法1: Curve官方API（推荐）
-        data = self.get_curve_api_data(pool_name)
+        data = self._timed_curve_api_data(pool_name, budget)
         if data:
             print("✅ Got data from Curve API")
             
             # 可选：补充价格信息 (不影响主流程)
             try:
-                prices = self.get_coingecko_prices(data.tokens)
-                if prices:
-                    print(f"✅ Got prices: {list(prices.keys())}")
+                if not budget.expired():
+                    prices = self.get_coingecko_prices(data.tokens)
+                    if prices:
+                        print(f"✅ Got prices: {list(prices.keys())}")
             except:
                 pass  # 价格获取失败不影响主流程
             
             return data
         
-        # 方法2: 区块链直读 (如果有Web3连接)
-        if self.w3:
-            pool_address = self.pool_addresses.get(pool_name)
+        # 方法2: 区块链直读 (如果配置了Web3提供商)
+        if self.onchain_reader and not budget.expired():
             if pool_address:
                 print("⚠️  API failed, trying on-chain data...")
                 try:
-                    data = self.get_onchain_data(pool_address)
+                    data = self._timed_onchain_data(pool_address, budget)
                     if data:
                         print("✅ Got on-chain data")
                         return data
@@ -511,6 +601,42 @@ class CurveRealDataCollector:
         print("⚠️  所有真实数据源失败，生成合成数据...")
         return self._generate_synthetic_pool_data(pool_name)
     
+    def _timed_curve_api_data(self, pool_name: str, budget: Deadline) -> Optional[CurvePoolData]:
+        """获取Curve API数据，并记录需要下载注册表时的延迟"""
+        
+        refreshing = not self.registry.is_fresh()
+        start_time = time.perf_counter()
+        data = self.get_curve_api_data(pool_name, budget)
+        if data and refreshing:
+            self.latency.record(SOURCE_CURVE_API, time.perf_counter() - start_time)
+        return data
+    
+    def _timed_onchain_data(self, pool_address: str, budget: Deadline) -> Optional[CurvePoolData]:
+        """获取链上数据，并记录成功读取的延迟"""
+        
+        start_time = time.perf_counter()
+        data = self.get_onchain_data(pool_address, deadline=budget)
+        if data:
+            self.latency.record(SOURCE_ONCHAIN, time.perf_counter() - start_time)
+        return data
+    
+    def _get_real_time_data_hedged(self, pool_name: str, pool_address: str,
+                                   budget: Deadline) -> Tuple[Optional[CurvePoolData], Optional[str]]:
+        """Curve API与链上直读对冲: 等待Curve API的分位延迟后并发直读链上，取先返回的有效数据"""
+        
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        
+        delay = self.latency.hedge_delay(SOURCE_CURVE_API)
+        data, winner = hedged_call(
+            lambda: self._timed_curve_api_data(pool_name, budget),
+            lambda: self._timed_onchain_data(pool_address, budget),
+            delay,
+            self._hedge_executor,
+            timeout=budget.remaining()
+        )
+        return data, {'primary': 'Curve API', 'secondary': 'on-chain'}.get(winner)
+    
     def _generate_synthetic_pool_data(self, pool_name: str) -> CurvePoolData:
         """生成合成池子数据 - 当所有真实数据源都失败时使用"""
         
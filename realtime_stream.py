@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+推送式实时数据流
+通过WebSocket JSON-RPC订阅新区块 (newHeads) 或池子事件日志 (logs)，只刷新在该区块中发出事件的池子，
+并把 CurvePoolData 推送到进程内队列，替代固定间隔轮询 (数据不再滞后一个轮询周期，空闲时没有请求)
+- 断线后指数退避重连，并用 eth_getLogs 补齐断线期间错过的区块
+- 池子状态通过 OnchainPoolReader 在事件所在区块读取 (一次Multicall)
+"""
+
+import argparse
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Set, Union
+
+from curve_registry import get_curve_registry
+from onchain_reader import OnchainPoolReader
+from rate_limiter import backoff_delay
+from real_data_collector import CurvePoolData, CurveRealDataCollector
+from token_metadata import TokenMetadataCache, get_token_metadata_cache
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    print("aiohttp not available. Install with: pip install aiohttp")
+
+# 订阅模式
+STREAM_MODE_LOGS = 'logs'           # 订阅池子事件日志 (池子不活跃时没有任何消息)
+STREAM_MODE_HEADS = 'heads'         # 订阅新区块，每个区块用 eth_getLogs 查询哪些池子发出了事件
+
+# 数据流配置
+STREAM_LOG_DEBOUNCE = 0.25          # logs模式: 区块最后一条日志之后等待多久刷新 (秒)
+STREAM_REQUEST_TIMEOUT = 15         # WebSocket上单个JSON-RPC请求的超时 (秒)
+STREAM_HEARTBEAT = 30               # WebSocket心跳间隔 (秒)
+STREAM_MAX_CATCH_UP_BLOCKS = 2000   # 重连后最多补齐的区块数
+
+
+class WebSocketRpc:
+    """单个WebSocket连接上的JSON-RPC: 请求按id匹配响应，订阅通知放入队列"""
+
+    def __init__(self, ws_url: str, timeout: float = STREAM_REQUEST_TIMEOUT):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self.notifications: asyncio.Queue = asyncio.Queue()
+
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._ws = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'WebSocketRpc':
+        self._session = aiohttp.ClientSession()
+        try:
+            self._ws = await self._session.ws_connect(self.ws_url, heartbeat=STREAM_HEARTBEAT,
+                                                      timeout=self.timeout)
+        except Exception:
+            await self._session.close()
+            raise
+        self._reader_task = asyncio.create_task(self._read_loop())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        if self._ws is not None:
+            await self._ws.close()
+        await self._session.close()
+
+    async def _read_loop(self):
+        try:
+            async for message in self._ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    if message.type == aiohttp.WSMsgType.ERROR:
+                        break
+                    continue
+
+                body = message.json()
+                if body.get('method') == 'eth_subscription':
+                    params = body['params']
+                    self.notifications.put_nowait((params['subscription'], params['result']))
+                    continue
+
+                future = self._pending.pop(body.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in body:
+                    future.set_exception(RuntimeError(f"JSON-RPC error: {body['error']}"))
+                else:
+                    future.set_result(body.get('result'))
+        finally:
+            # 连接断开: 未完成的请求失败，通知消费者重连
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("WebSocket closed"))
+            self._pending.clear()
+            self.notifications.put_nowait(None)
+
+    async def request(self, method: str, params: list):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        await self._ws.send_json({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params})
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def subscribe(self, kind: str, *params) -> str:
+        return await self.request('eth_subscribe', [kind, *params])
+
+
+class RealtimePoolStream:
+    """
+    池子实时更新数据流
+    run(out_queue) 在事件循环中运行直到 stop()；start(out_queue) 在后台线程中运行，供同步代码使用
+    out_queue 可以是 asyncio.Queue 或 queue.Queue，队列满时丢弃该更新
+    """
+
+    def __init__(self, ws_url: str, reader: OnchainPoolReader, pools: Dict[str, str],
+                 mode: str = STREAM_MODE_LOGS, token_metadata: Optional[TokenMetadataCache] = None,
+                 debounce: float = STREAM_LOG_DEBOUNCE):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp is required for RealtimePoolStream")
+        if mode not in (STREAM_MODE_LOGS, STREAM_MODE_HEADS):
+            raise ValueError(f"Unsupported stream mode: {mode}")
+
+        self.ws_url = ws_url
+        self.reader = reader
+        self.pools = pools
+        self.mode = mode
+        self.debounce = debounce
+        self.token_metadata = token_metadata or get_token_metadata_cache()
+        self.registry = get_curve_registry()
+
+        self._names = {address.lower(): name for name, address in pools.items()}
+        self.last_block: Optional[int] = None   # 已处理的最新区块
+        self.updates = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        # stop() 可能在后台线程创建事件循环之前调用
+        self._stop_requested = threading.Event()
+        self._attempt = 0
+
+    # ---------- 运行控制 ----------
+
+    async def run(self, out_queue: Union[asyncio.Queue, queue.Queue]):
+        """订阅并推送更新，断线后退避重连，直到 stop()"""
+
+        # 先创建 _stop 再设置 _loop: stop() 看到 _loop 时 _stop 一定已存在
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._stop_requested.is_set():
+            self._stop.set()
+
+        while not self._stop.is_set():
+            try:
+                await self._stream(out_queue)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                delay = backoff_delay(self._attempt)
+                self._attempt += 1
+                print(f"⚠️  实时数据流断开 ({str(e)[:80]}), {delay:.1f}s 后重连...")
+                try:
+                    await asyncio.wait_for(self._stop.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        """停止数据流 (可以从其他线程调用，在 run() 开始之前调用也有效)"""
+
+        self._stop_requested.set()
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def start(self, out_queue: queue.Queue) -> threading.Thread:
+        """在后台线程的事件循环中运行，更新推送到线程安全的 queue.Queue"""
+
+        thread = threading.Thread(target=asyncio.run, args=(self.run(out_queue),),
+                                  name="realtime-stream", daemon=True)
+        thread.start()
+        return thread
+
+    # ---------- 订阅 ----------
+
+    async def _stream(self, out_queue):
+        async with WebSocketRpc(self.ws_url) as rpc:
+            addresses = list(self.pools.values())
+            if self.mode == STREAM_MODE_HEADS:
+                await rpc.subscribe('newHeads')
+            else:
+                await rpc.subscribe('logs', {'address': addresses})
+
+            self._attempt = 0
+            print(f"📡 实时数据流已连接 ({self.mode}, {len(addresses)} 个池子)")
+
+            # 首次连接以当前链头为起点 (之后断线时从这里补齐)；重连时补齐断线期间错过的区块
+            head = int(await rpc.request('eth_blockNumber', []), 16)
+            if self.last_block is None:
+                self.last_block = head
+            elif head > self.last_block:
+                await self._catch_up(rpc, out_queue, head)
+
+            if self.mode == STREAM_MODE_HEADS:
+                await self._consume_heads(rpc, out_queue)
+            else:
+                await self._consume_logs(rpc, out_queue)
+
+    async def _next_notification(self, rpc: WebSocketRpc, timeout: Optional[float] = None):
+        """下一条订阅通知；超时返回 ()，连接断开或 stop() 时抛出ConnectionError"""
+
+        get_task = asyncio.ensure_future(rpc.notifications.get())
+        stop_task = asyncio.ensure_future(self._stop.wait())
+        done, _ = await asyncio.wait({get_task, stop_task}, timeout=timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        for task in (get_task, stop_task):
+            if task not in done:
+                task.cancel()
+
+        if stop_task in done:
+            raise ConnectionError("stream stopped")
+        if get_task not in done:
+            return ()
+
+        notification = get_task.result()
+        if notification is None:
+            raise ConnectionError("WebSocket closed")
+        return notification
+
+    async def _consume_heads(self, rpc: WebSocketRpc, out_queue):
+        addresses = list(self.pools.values())
+
+        while True:
+            _, head = await self._next_notification(rpc)
+            block = int(head['number'], 16)
+            logs = await rpc.request('eth_getLogs', [{'blockHash': head['hash'], 'address': addresses}])
+            changed = {log['address'].lower() for log in logs if not log.get('removed')}
+            if changed:
+                await self._refresh(changed, block, out_queue)
+            self.last_block = max(block, self.last_block or 0)
+
+    async def _consume_logs(self, rpc: WebSocketRpc, out_queue):
+        # 同一区块的日志分多条通知到达: 出现更新的区块或静默debounce秒后再刷新
+        pending: Dict[int, Set[str]] = {}
+
+        while True:
+            notification = await self._next_notification(rpc, self.debounce if pending else None)
+            if not notification:
+                for block in sorted(pending):
+                    await self._refresh(pending.pop(block), block, out_queue)
+                continue
+
+            _, log = notification
+            if log.get('removed'):
+                continue
+
+            block = int(log['blockNumber'], 16)
+            pending.setdefault(block, set()).add(log['address'].lower())
+            for earlier in sorted(b for b in pending if b < block):
+                await self._refresh(pending.pop(earlier), earlier, out_queue)
+
+    async def _catch_up(self, rpc: WebSocketRpc, out_queue, head: int):
+        """断线期间 (last_block, head] 发出事件的池子，在head区块读取一次"""
+
+        from_block = max(self.last_block + 1, head - STREAM_MAX_CATCH_UP_BLOCKS + 1)
+        logs = await rpc.request('eth_getLogs', [{
+            'address': list(self.pools.values()), 'fromBlock': hex(from_block), 'toBlock': hex(head),
+        }])
+        changed = {log['address'].lower() for log in logs if not log.get('removed')}
+        print(f"🔄 补齐区块 {from_block} → {head}: {len(changed)} 个池子有事件")
+        if changed:
+            await self._refresh(changed, head, out_queue)
+        self.last_block = head
+
+    # ---------- 刷新和推送 ----------
+
+    def _read_pool_data(self, addresses: List[str], block: int) -> List[CurvePoolData]:
+        states = self.reader.read_pools(addresses, hex(block))
+        coins = [coin for state in states.values() for coin in state.coins]
+        metadata = self.token_metadata.resolve(coins, self.registry, self.reader)
+
+        updates = []
+        for address, state in states.items():
+            if state.virtual_price is None or not state.coins:
+                continue
+            updates.append(CurveRealDataCollector._onchain_state_to_pool_data(
+                self._names[address.lower()], state, metadata
+            ))
+        return updates
+
+    async def _refresh(self, changed: Set[str], block: int, out_queue):
+        """在block读取发出事件的池子 (一次Multicall，在线程中执行)，推送CurvePoolData"""
+
+        addresses = [address for address in self.pools.values() if address.lower() in changed]
+        if not addresses:
+            return
+
+        try:
+            updates = await asyncio.to_thread(self._read_pool_data, addresses, block)
+        except Exception as e:
+            print(f"⚠️  区块 {block} 池子刷新失败: {str(e)[:100]}...")
+            return
+
+        for pool_data in updates:
+            self._publish(out_queue, pool_data)
+        self.last_block = max(block, self.last_block or 0)
+
+    def _publish(self, out_queue, pool_data: CurvePoolData):
+        try:
+            out_queue.put_nowait(pool_data)
+            self.updates += 1
+        except (asyncio.QueueFull, queue.Full):
+            print(f"⚠️  更新队列已满，丢弃 {pool_data.pool_name} 的更新")
+
+
+def main():
+    from config import Config
+    from free_historical_data import AVAILABLE_POOLS
+
+    parser = argparse.ArgumentParser(description='Curve池子实时数据流 (WebSocket订阅)')
+    parser.add_argument('--pools', nargs='+', default=['3pool'], help='要订阅的池子')
+    parser.add_argument('--mode', choices=[STREAM_MODE_LOGS, STREAM_MODE_HEADS], default=STREAM_MODE_LOGS,
+                        help='订阅事件日志或新区块')
+    args = parser.parse_args()
+
+    rpc_url, ws_url = Config.get_web3_provider_url(), Config.get_web3_ws_url()
+    if not rpc_url or not ws_url:
+        print("❌ 未配置Web3提供商 (设置 INFURA_API_KEY / ALCHEMY_API_KEY 或 WEB3_WS_URL)")
+        return
+
+    pools = {name: AVAILABLE_POOLS[name]['address'] for name in args.pools if name in AVAILABLE_POOLS}
+    stream = RealtimePoolStream(ws_url, OnchainPoolReader(rpc_url), pools, mode=args.mode)
+    updates: queue.Queue = queue.Queue()
+    stream.start(updates)
+
+    try:
+        while True:
+            pool_data = updates.get()
+            print(f"[{time.strftime('%H:%M:%S')}] {pool_data.pool_name:10} VP {pool_data.virtual_price:.6f} "
+                  f"| 区块时间 {pool_data.timestamp}")
+    except KeyboardInterrupt:
+        stream.stop()
+        print(f"\n👋 数据流已停止 (共 {stream.updates} 次更新)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+对冲请求 (hedged requests)
+主数据源在其历史延迟的指定分位数内没有返回时，并发启动备用数据源，取先返回的有效结果
+每个数据源的延迟记录在滑动窗口直方图中，用于决定对冲等待时间
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar('T')
+
+# 对冲配置
+HEDGE_ENABLED = False           # 默认关闭，CurveRealDataCollector(hedged=True) 开启
+HEDGE_PERCENTILE = 95           # 主数据源超过该分位延迟仍未返回时启动备用数据源
+HEDGE_MIN_SAMPLES = 20          # 样本不足时使用默认等待时间
+HEDGE_DEFAULT_DELAY = 1.0       # 默认对冲等待时间 (秒)
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MAX_DELAY = 10.0
+
+# 直方图配置: 5ms ~ 60s 对数分桶，只统计最近的样本
+LATENCY_BUCKETS = np.geomspace(0.005, 60, 64)
+LATENCY_WINDOW = 500
+
+
+class LatencyHistogram:
+    """滑动窗口延迟直方图 - 对数分桶，记录和分位数查询均为O(桶数)"""
+
+    def __init__(self, bounds: np.ndarray = LATENCY_BUCKETS, window: int = LATENCY_WINDOW):
+        self.bounds = bounds
+        self._counts = np.zeros(len(bounds) + 1, dtype=np.int64)   # 最后一桶为超出上界
+        self._samples = deque(maxlen=window)                        # 窗口内样本的桶编号
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        bucket = int(np.searchsorted(self.bounds, seconds))
+
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                self._counts[self._samples[0]] -= 1
+            self._samples.append(bucket)
+            self._counts[bucket] += 1
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """分位延迟 (秒，取所在桶的上界)，没有样本时返回None"""
+
+        with self._lock:
+            total = len(self._samples)
+            if total == 0:
+                return None
+            cumulative = np.cumsum(self._counts)
+            bucket = int(np.searchsorted(cumulative, total * p / 100))
+
+        return float(self.bounds[min(bucket, len(self.bounds) - 1)])
+
+
+class LatencyTracker:
+    """按数据源记录延迟直方图，并计算对冲等待时间"""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, source: str) -> LatencyHistogram:
+        histogram = self._histograms.get(source)
+
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(source, LatencyHistogram())
+
+        return histogram
+
+    def record(self, source: str, seconds: float):
+        self.histogram(source).record(seconds)
+
+    def hedge_delay(self, source: str, percentile: float = HEDGE_PERCENTILE) -> float:
+        """数据源的对冲等待时间: 样本足够时为其分位延迟，否则为默认值"""
+
+        histogram = self.histogram(source)
+        if histogram.count < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+
+        delay = histogram.percentile(percentile)
+        return min(max(delay, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各数据源的样本数和 p50/p95/p99 延迟"""
+
+        return {
+            source: {
+                'count': histogram.count,
+                'p50': histogram.percentile(50),
+                'p95': histogram.percentile(95),
+                'p99': histogram.percentile(99),
+            }
+            for source, histogram in sorted(self._histograms.items())
+        }
+
+
+def _valid(result) -> bool:
+    return result is not None
+
+
+def hedged_call(primary: Callable[[], T], secondary: Callable[[], T], delay: float,
+                executor: Executor, timeout: Optional[float] = None) -> Tuple[Optional[T], Optional[str]]:
+    """
+    同步对冲调用，返回 (结果, 'primary'/'secondary')，都没有有效结果时返回 (None, None)
+    主调用在delay内失败则立即启动备用调用；线程中的落后调用无法中断，其结果会被丢弃
+    """
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def remaining() -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    futures = {executor.submit(primary): 'primary'}
+    done, _ = wait(futures, timeout=delay if timeout is None else min(delay, timeout))
+
+    # 主调用在对冲等待时间内已完成 (成功或失败)
+    if done:
+        future = next(iter(done))
+        if future.exception() is None and _valid(future.result()):
+            return future.result(), 'primary'
+
+    futures[executor.submit(secondary)] = 'secondary'
+    pending = {future for future in futures if not future.done()}
+    finished = [future for future in futures if future.done()]
+
+    while True:
+        for future in finished:
+            if future.exception() is None and _valid(future.result()):
+                for other in pending:
+                    other.cancel()
+                return future.result(), futures[future]
+
+        if not pending:
+            return None, None
+
+        finished, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+        if not finished:
+            # 超出时间预算
+            for other in pending:
+                other.cancel()
+            return None, None
+
+
+async def hedged_call_async(primary: Callable[[], Awaitable[T]], secondary: Callable[[], Awaitable[T]],
+                            delay: float, timeout: Optional[float] = None) -> Tuple[Optional[T], Optional[str]]:
+    """hedged_call 的asyncio版本，先返回有效结果后取消落后的任务"""
+
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+
+    def remaining() -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - loop.time())
+
+    tasks = {asyncio.ensure_future(primary()): 'primary'}
+    done, _ = await asyncio.wait(tasks, timeout=delay if timeout is None else min(delay, timeout))
+
+    if done:
+        task = next(iter(done))
+        if task.exception() is None and _valid(task.result()):
+            return task.result(), 'primary'
+
+    tasks[asyncio.ensure_future(secondary())] = 'secondary'
+    pending = {task for task in tasks if not task.done()}
+    finished = [task for task in tasks if task.done()]
+
+    try:
+        while True:
+            for task in finished:
+                if task.exception() is None and _valid(task.result()):
+                    return task.result(), tasks[task]
+
+            if not pending:
+                return None, None
+
+            finished, pending = await asyncio.wait(pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+            if not finished:
+                return None, None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+_shared_tracker: Optional[LatencyTracker] = None
+_shared_tracker_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """获取进程内共享的延迟统计"""
+
+    global _shared_tracker
+
+    if _shared_tracker is None:
+        with _shared_tracker_lock:
+            if _shared_tracker is None:
+                _shared_tracker = LatencyTracker()
+
+    return _shared_tracker
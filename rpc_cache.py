@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+区块固定的JSON-RPC结果缓存
+指定区块号的 eth_call 结果不可变，按 (链ID, 区块, 合约地址, calldata) 持久化到SQLite (同时缓存区块时间戳)
+OnchainPoolReader 和 Web3 提供商共用，重复回填/重新训练时已读过的区块不再消耗RPC
+只缓存已确认足够深的区块 (避免链重组)，条目数超过上限时按最久未使用淘汰
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    from web3 import Web3
+    WEB3_AVAILABLE = True
+except ImportError:
+    WEB3_AVAILABLE = False
+
+# 缓存配置
+RPC_CACHE_PATH = Path("curve_data") / "rpc_cache.sqlite"
+RPC_CACHE_MAX_ENTRIES = 500_000     # 超过后淘汰最久未使用的条目
+RPC_CACHE_EVICT_FRACTION = 0.1      # 每次淘汰的比例
+RPC_CACHE_CONFIRMATIONS = 64        # 距链头至少这么多区块才缓存 (约2个epoch，已最终确定)
+RPC_HEAD_REFRESH = 60               # 链头区块号的刷新间隔 (秒)，只在需要写入缓存时查询
+
+_BLOCK_TAGS = ('latest', 'pending', 'earliest', 'safe', 'finalized')
+
+
+def block_number(block: Union[str, int, None]) -> Optional[int]:
+    """区块参数 → 区块号，标签 ('latest' 等) 或其他形式返回None"""
+
+    if isinstance(block, int):
+        return block
+    if isinstance(block, str) and block not in _BLOCK_TAGS:
+        try:
+            return int(block, 16) if block.startswith('0x') else int(block)
+        except ValueError:
+            return None
+    return None
+
+
+def _endpoint_key(endpoint: str) -> str:
+    """端点URL的哈希 (URL中可能包含API密钥，不直接落盘)"""
+    return hashlib.sha256(endpoint.encode('utf-8')).hexdigest()
+
+
+class RpcResultCache:
+    """eth_call结果的SQLite缓存 (线程安全)"""
+
+    def __init__(self, path: Union[str, Path] = RPC_CACHE_PATH, max_entries: int = RPC_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS eth_call (
+                chain_id INTEGER NOT NULL,
+                block INTEGER NOT NULL,
+                target TEXT NOT NULL,
+                data_hash BLOB NOT NULL,
+                result BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (chain_id, block, target, data_hash)
+            );
+            CREATE INDEX IF NOT EXISTS eth_call_last_used ON eth_call (last_used);
+            CREATE TABLE IF NOT EXISTS block_timestamps (
+                chain_id INTEGER NOT NULL,
+                block INTEGER NOT NULL,
+                timestamp INTEGER NOT NULL,
+                PRIMARY KEY (chain_id, block)
+            );
+            CREATE TABLE IF NOT EXISTS endpoints (
+                endpoint_hash TEXT PRIMARY KEY,
+                chain_id INTEGER NOT NULL
+            );
+        """)
+        self._lock = threading.Lock()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM eth_call").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(chain_id: int, block: int, to: str, data: str) -> tuple:
+        data = data[2:] if data.startswith('0x') else data
+        return chain_id, block, to.lower(), hashlib.sha256(bytes.fromhex(data)).digest()
+
+    def get(self, chain_id: int, block: int, to: str, data: str) -> Optional[str]:
+        key = self._key(chain_id, block, to, data)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM eth_call WHERE chain_id=? AND block=? AND target=? AND data_hash=?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE eth_call SET last_used=? WHERE chain_id=? AND block=? AND target=? AND data_hash=?",
+                (time.time(), *key)
+            )
+
+        return '0x' + bytes(row[0]).hex()
+
+    def put(self, chain_id: int, block: int, to: str, data: str, result: str):
+        key = self._key(chain_id, block, to, data)
+        result_bytes = bytes.fromhex(result[2:] if result.startswith('0x') else result)
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO eth_call VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, result_bytes, time.time())
+            )
+            self._entries += cursor.rowcount
+            if self._entries > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的条目 (调用方持有锁)"""
+
+        count = max(1, int(self.max_entries * RPC_CACHE_EVICT_FRACTION) + self._entries - self.max_entries)
+        self._conn.execute(
+            "DELETE FROM eth_call WHERE rowid IN (SELECT rowid FROM eth_call ORDER BY last_used LIMIT ?)",
+            (count,)
+        )
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM eth_call").fetchone()[0]
+
+    def get_block_timestamp(self, chain_id: int, block: int) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT timestamp FROM block_timestamps WHERE chain_id=? AND block=?", (chain_id, block)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_block_timestamp(self, chain_id: int, block: int, timestamp: int):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO block_timestamps VALUES (?, ?, ?)", (chain_id, block, timestamp))
+
+    def chain_id(self, endpoint: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chain_id FROM endpoints WHERE endpoint_hash=?", (_endpoint_key(endpoint),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_chain_id(self, endpoint: str, chain_id: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO endpoints VALUES (?, ?)", (_endpoint_key(endpoint), chain_id)
+            )
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': self._entries, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedRpcEndpoint:
+    """
+    单个RPC端点的eth_call缓存层
+    send(method, params) 为实际发送JSON-RPC请求的函数；链ID按端点持久化，命中缓存时不需要任何RPC
+    """
+
+    def __init__(self, endpoint: str, send: Callable[[str, list], Any], cache: RpcResultCache,
+                 confirmations: int = RPC_CACHE_CONFIRMATIONS):
+        self.endpoint = endpoint
+        self.send = send
+        self.cache = cache
+        self.confirmations = confirmations
+
+        self._chain_id: Optional[int] = None
+        self._head: Optional[int] = None
+        self._head_checked_at = 0.0
+
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            chain_id = self.cache.chain_id(self.endpoint)
+            if chain_id is None:
+                chain_id = int(self.send('eth_chainId', []), 16)
+                self.cache.set_chain_id(self.endpoint, chain_id)
+            self._chain_id = chain_id
+        return self._chain_id
+
+    def observe_head(self, head: int):
+        """记录已知的链头区块号 (如 'latest' 读取返回的区块)"""
+
+        if self._head is None or head > self._head:
+            self._head = head
+        self._head_checked_at = time.monotonic()
+
+    def _is_final(self, block: int) -> bool:
+        # 已知链头足够新时不再查询
+        if self._head is not None and block <= self._head - self.confirmations:
+            return True
+
+        if self._head is None or time.monotonic() - self._head_checked_at >= RPC_HEAD_REFRESH:
+            self.observe_head(int(self.send('eth_blockNumber', []), 16))
+        return block <= self._head - self.confirmations
+
+    def block_timestamp(self, block: int) -> int:
+        """区块时间戳 (eth_getBlockByNumber)，已确认的区块持久化缓存"""
+
+        timestamp = self.cache.get_block_timestamp(self.chain_id, block)
+        if timestamp is not None:
+            return timestamp
+
+        header = self.send('eth_getBlockByNumber', [hex(block), False])
+        if header is None:
+            raise ValueError(f"Block {block} not found")
+
+        timestamp = int(header['timestamp'], 16)
+        if self._is_final(block):
+            self.cache.put_block_timestamp(self.chain_id, block, timestamp)
+        return timestamp
+
+    @staticmethod
+    def _cache_key(params: list) -> Optional[tuple]:
+        """eth_call参数 [{'to','data'}, block] → (区块号, 地址, calldata)，不可缓存时返回None"""
+
+        call = params[0] if params else None
+        block = block_number(params[1]) if len(params) > 1 else None
+        if block is None or not isinstance(call, dict) or not call.get('to'):
+            return None
+        # from/gas/value 等字段可能影响结果，只缓存纯读取调用
+        if not set(call) <= {'to', 'data', 'input'}:
+            return None
+        return block, call['to'], call.get('data') or call.get('input') or '0x'
+
+    def lookup(self, params: list) -> Optional[str]:
+        key = self._cache_key(params)
+        return self.cache.get(self.chain_id, *key) if key else None
+
+    def store(self, params: list, result: Any):
+        key = self._cache_key(params)
+        if key and isinstance(result, str) and self._is_final(key[0]):
+            self.cache.put(self.chain_id, *key, result)
+
+
+if WEB3_AVAILABLE:
+    class CachingHTTPProvider(Web3.HTTPProvider):
+        """带eth_call结果缓存的Web3 HTTP提供商"""
+
+        def __init__(self, endpoint_uri: str, cache: Optional[RpcResultCache] = None, **kwargs):
+            super().__init__(endpoint_uri, **kwargs)
+            cache = cache if cache is not None else get_rpc_cache()
+            self.call_cache = CachedRpcEndpoint(str(endpoint_uri), self._send, cache)
+
+        def _send(self, method: str, params: list) -> Any:
+            response = super().make_request(method, params)
+            if 'error' in response:
+                raise RuntimeError(f"JSON-RPC error: {response['error']}")
+            return response['result']
+
+        def make_request(self, method, params):
+            if method != 'eth_call':
+                return super().make_request(method, params)
+
+            params = list(params)
+            result = self.call_cache.lookup(params)
+            if result is not None:
+                return {'jsonrpc': '2.0', 'id': next(self.request_counter), 'result': result}
+
+            # 未命中时返回原始响应 (错误响应交给web3按原方式处理)
+            response = super().make_request(method, params)
+            if 'result' in response:
+                self.call_cache.store(params, response['result'])
+            return response
+
+
+_shared_cache: Optional[RpcResultCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_rpc_cache() -> RpcResultCache:
+    """获取进程内共享的eth_call缓存"""
+
+    global _shared_cache
+
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = RpcResultCache()
+
+    return _shared_cache
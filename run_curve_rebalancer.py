@@ -8,8 +8,12 @@ import argparse
 import time
 from datetime import datetime
 import json
+import queue
+
+from typing import Dict, Optional
 
 from curve_rebalancer import CurvePoolPredictor, CurveDataCollector, CurveRebalancer
+from real_data_collector import CurvePoolData
 
 def load_trained_model(model_path: str = 'best_curve_model.pth', input_dim: int = 5) -> tuple:
     """加载训练好的模型"""
@@ -109,11 +113,59 @@ def run_single_prediction(args):
         print(f"Error during prediction: {e}")
         return False
 
+def start_pool_stream(args):
+    """启动WebSocket实时数据流 (只订阅监控的池子)，返回 (数据流, 更新队列)，无法启动时返回 (None, None)"""
+    
+    from config import Config
+    from onchain_reader import OnchainPoolReader
+    from realtime_stream import AIOHTTP_AVAILABLE, RealtimePoolStream
+    
+    rpc_url = args.web3_provider or Config.get_web3_provider_url()
+    ws_url = Config.get_web3_ws_url()
+    if not AIOHTTP_AVAILABLE or not rpc_url or not ws_url:
+        print("⚠️  无法启动实时数据流 (需要aiohttp和Web3 WebSocket URL)，使用定时轮询")
+        return None, None
+    
+    updates = queue.Queue()
+    stream = RealtimePoolStream(ws_url, OnchainPoolReader(rpc_url), {'monitored': args.pool_address})
+    stream.start(updates)
+    return stream, updates
+
+def wait_for_pool_update(updates, timeout: float) -> Optional[CurvePoolData]:
+    """等待池子的推送更新 (最多timeout秒)，取出积压的更新并返回最新的一个；超时返回None"""
+    
+    try:
+        latest = updates.get(timeout=timeout)
+    except queue.Empty:
+        return None
+    
+    while True:
+        try:
+            latest = updates.get_nowait()
+        except queue.Empty:
+            return latest
+
+def pool_update_row(pool_data: CurvePoolData) -> Dict:
+    """推送的池子状态 → 与历史数据相同列名的一行特征"""
+    
+    row = {
+        'timestamp': pool_data.timestamp,
+        'virtual_price': pool_data.virtual_price,
+        'volume_24h': pool_data.volume_24h,
+        'apy': pool_data.apy,
+    }
+    for token, balance in zip(pool_data.tokens, pool_data.balances):
+        row[f'{token.lower()}_balance'] = balance
+    return row
+
 def run_monitoring_mode(args):
     """运行监控模式"""
     
     print("=== Curve智能重新平衡 - 监控模式 ===")
-    print(f"监控间隔: {args.interval} 分钟")
+    if args.stream:
+        print(f"推送模式: 池子发出事件时检查 (最长间隔 {args.interval} 分钟)")
+    else:
+        print(f"监控间隔: {args.interval} 分钟")
     print("按 Ctrl+C 停止监控")
     
     # 加载模型
@@ -125,15 +177,19 @@ def run_monitoring_mode(args):
     data_collector = CurveDataCollector(web3_provider=args.web3_provider)
     rebalancer = CurveRebalancer(model, data_collector)
     
+    stream, updates = start_pool_stream(args) if args.stream else (None, None)
+    latest = None
+    
     try:
         while True:
             print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 检查池子状态...")
             
             try:
-                # 生成重新平衡信号
+                # 生成重新平衡信号 (推送模式下用最新推送的池子状态作为回看窗口的最后一行)
                 signal = rebalancer.generate_rebalance_signal(
                     args.pool_address, 
-                    args.lookback_hours
+                    args.lookback_hours,
+                    pool_update_row(latest) if latest is not None else None
                 )
                 
                 print(f"Action: {signal.action}, Token: {signal.token}, "
@@ -155,10 +211,17 @@ def run_monitoring_mode(args):
             except Exception as e:
                 print(f"监控循环中出错: {e}")
             
-            # 等待下一次检查
-            time.sleep(args.interval * 60)
+            # 等待下一次检查: 推送模式下池子有新事件立即检查，否则按间隔
+            if stream is not None:
+                latest = wait_for_pool_update(updates, args.interval * 60)
+                if latest is not None:
+                    print(f"📡 收到推送: VP {latest.virtual_price:.6f} @ {latest.timestamp}")
+            else:
+                time.sleep(args.interval * 60)
             
     except KeyboardInterrupt:
+        if stream is not None:
+            stream.stop()
         print("\n👋 监控已停止")
         return True
 
@@ -181,6 +244,8 @@ def main():
                        default='single', help='运行模式: single (单次预测) 或 monitor (持续监控)')
     parser.add_argument('--interval', type=int, default=15,
                        help='监控模式下的检查间隔（分钟）')
+    parser.add_argument('--stream', action='store_true',
+                       help='监控模式下订阅池子事件 (WebSocket)，有新事件时立即检查')
     
     # 执行选项
     parser.add_argument('--execute', action='store_true',
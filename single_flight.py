@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+单飞请求合并 (single-flight)
+同一时刻对同一键的并发请求只执行一次，所有等待者得到同一个结果 (或同一个异常)
+线程版本用于同步收集器和共享HTTP会话，asyncio版本用于异步收集器
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlightTimeout(TimeoutError):
+    """等待进行中的调用超时 (调用本身仍在继续，结果交给其他等待者)"""
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """线程版单飞: 第一个调用者执行，其余调用者等待并共享结果"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable[[], T], timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """
+        执行或加入进行中的调用，返回 (结果, 是否为共享结果)；调用出错时所有等待者抛出同一异常
+        timeout: 加入进行中的调用时最多等待的秒数 (None表示一直等待)，超时抛出 SingleFlightTimeout
+        """
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise SingleFlightTimeout(f"waited {timeout:.1f}s for in-flight call {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # 先移除再通知: 之后到达的调用者会发起新的调用，不会拿到过期结果
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {'executed': self.executed, 'shared': self.shared, 'in_flight': self.in_flight()}
+
+
+class AsyncSingleFlight:
+    """
+    asyncio版单飞: 进行中的调用为共享任务，单个等待者被取消不影响其他等待者
+    所有等待者都被取消时 (如批量收集超过截止时间) 取消共享任务
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, List] = {}     # 键 → [共享任务, 等待者数]
+
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """执行或加入进行中的调用，返回 (结果, 是否为共享结果)"""
+
+        call = self._calls.get(key)
+        shared = call is not None
+
+        if shared:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(func())
+            call = self._calls[key] = [task, 0]
+            self.executed += 1
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+
+        task = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            call[1] -= 1
+            if call[1] == 0 and not task.done():
+                task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        # 所有等待者都已离开时避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {'executed': self.executed, 'shared': self.shared, 'in_flight': self.in_flight()}
+
+
+_shared_flight: Optional[SingleFlight] = None
+_shared_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取进程内共享的 (线程版) 单飞合并器"""
+
+    global _shared_flight
+
+    if _shared_flight is None:
+        with _shared_flight_lock:
+            if _shared_flight is None:
+                _shared_flight = SingleFlight()
+
+    return _shared_flight
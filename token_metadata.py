@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+ERC-20代币元数据缓存
+地址 → symbol/decimals/name，首次从Curve注册表或链上 (Multicall3) 获取后持久化到磁盘并常驻内存
+"""
+
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from curve_registry import CurveRegistrySnapshot
+from onchain_reader import OnchainPoolReader, SELECTORS, decode_string, decode_uint, encode_call
+
+# 缓存配置
+TOKEN_METADATA_PATH = Path("curve_data") / "token_metadata.json"
+
+# Curve ETH池使用的原生ETH占位地址
+ETH_PLACEHOLDER = "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee"
+
+
+@dataclass
+class TokenMetadata:
+    """代币元数据"""
+    address: str
+    symbol: str
+    decimals: int
+    name: str = ""
+
+
+class TokenMetadataCache:
+    """代币元数据缓存 - 预热后解码链上余额不再产生额外RPC调用"""
+
+    def __init__(self, path: Union[str, Path] = TOKEN_METADATA_PATH):
+        self.path = Path(path)
+        self._tokens: Dict[str, TokenMetadata] = {
+            ETH_PLACEHOLDER: TokenMetadata(ETH_PLACEHOLDER, 'ETH', 18, 'Ether')
+        }
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for address, entry in json.load(f).items():
+                    self._tokens[address.lower()] = TokenMetadata(**entry)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️  代币元数据缓存读取失败: {str(e)[:100]}...")
+
+    def _save(self):
+        """原子写入磁盘 (调用方持有锁)"""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({address: asdict(token) for address, token in sorted(self._tokens.items())},
+                      f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, address: str) -> Optional[TokenMetadata]:
+        return self._tokens.get(address.lower())
+
+    def missing(self, addresses: Iterable[str]) -> list:
+        return sorted({address.lower() for address in addresses} - set(self._tokens))
+
+    def add(self, tokens: Iterable[TokenMetadata]) -> int:
+        """加入新的代币元数据并持久化，返回新增数量"""
+
+        with self._lock:
+            added = 0
+            for token in tokens:
+                address = token.address.lower()
+                if address not in self._tokens:
+                    self._tokens[address] = TokenMetadata(address, token.symbol, int(token.decimals), token.name)
+                    added += 1
+            if added:
+                self._save()
+        return added
+
+    def update_from_registry(self, registry: CurveRegistrySnapshot) -> int:
+        """从已下载的Curve注册表快照中提取代币元数据 (不触发下载)"""
+
+        tokens = []
+        for pool in registry.pools():
+            for coin in pool.get('coins', []):
+                try:
+                    tokens.append(TokenMetadata(coin['address'], coin['symbol'], int(coin['decimals']),
+                                                coin.get('name', '')))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return self.add(tokens)
+
+    def fetch_onchain(self, addresses: Iterable[str], reader: OnchainPoolReader) -> int:
+        """通过一次Multicall3读取缺失代币的 symbol/decimals/name"""
+
+        missing = self.missing(addresses)
+        if not missing:
+            return 0
+
+        calls = []
+        for address in missing:
+            calls.extend([
+                (address, encode_call(SELECTORS['symbol'])),
+                (address, encode_call(SELECTORS['decimals'])),
+                (address, encode_call(SELECTORS['name'])),
+            ])
+        results = reader.aggregate(calls)
+
+        tokens = []
+        for i, address in enumerate(missing):
+            (symbol_ok, symbol), (decimals_ok, decimals), (name_ok, name) = results[3 * i:3 * i + 3]
+            decimals = decode_uint(decimals) if decimals_ok else None
+            if decimals is None:
+                print(f"⚠️  无法读取代币 {address} 的decimals")
+                continue
+            tokens.append(TokenMetadata(
+                address=address,
+                symbol=(decode_string(symbol) if symbol_ok else None) or address[:10],
+                decimals=decimals,
+                name=(decode_string(name) if name_ok else None) or ""
+            ))
+
+        return self.add(tokens)
+
+    def resolve(self, addresses: Iterable[str], registry: Optional[CurveRegistrySnapshot] = None,
+                reader: Optional[OnchainPoolReader] = None) -> Dict[str, TokenMetadata]:
+        """
+        返回地址对应的元数据，缺失时依次尝试注册表快照和链上读取
+        全部命中缓存时没有任何网络I/O
+        """
+
+        addresses = [address.lower() for address in addresses]
+
+        if self.missing(addresses) and registry is not None:
+            self.update_from_registry(registry)
+
+        if self.missing(addresses) and reader is not None:
+            try:
+                self.fetch_onchain(addresses, reader)
+            except Exception as e:
+                print(f"⚠️  链上读取代币元数据失败: {str(e)[:100]}...")
+
+        return {address: self._tokens[address] for address in addresses if address in self._tokens}
+
+
+_shared_cache: Optional[TokenMetadataCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_token_metadata_cache() -> TokenMetadataCache:
+    """获取进程内共享的代币元数据缓存"""
+
+    global _shared_cache
+
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = TokenMetadataCache()
+
+    return _shared_cache
@@ -14,6 +14,8 @@ from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+from cache_store import HistoricalCacheStore, read_historical_file
+
 class CurveVirtualPricePredictor:
     """Curve池子Virtual Price預測器"""
     
@@ -26,12 +28,15 @@ class CurveVirtualPricePredictor:
     def load_data(self, file_path=None):
         """載入歷史數據"""
         
-        if file_path is None:
-            file_path = f"free_historical_cache/{self.pool_name}_comprehensive_free_historical_365d.csv"
-        
         try:
-            self.data = pd.read_csv(file_path)
-            self.data['timestamp'] = pd.to_datetime(self.data['timestamp'])
+            if file_path is None:
+                # 列式缓存 (旧CSV自动迁移)
+                store = HistoricalCacheStore("free_historical_cache")
+                self.data = store.read(f"{self.pool_name}_comprehensive_free_historical_365d")
+                if self.data.empty:
+                    raise FileNotFoundError(f"{self.pool_name} 歷史數據不存在")
+            else:
+                self.data = read_historical_file(file_path)
             
             print(f"✅ 數據載入成功: {len(self.data)} 條記錄")
             print(f"📅 時間範圍: {self.data['timestamp'].min()} 到 {self.data['timestamp'].max()}")